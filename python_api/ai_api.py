@@ -1,27 +1,73 @@
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 import json
-from flask import Flask, request, jsonify
+import threading
+from flask import (Blueprint, Flask, Response, current_app, request, jsonify,
+                   stream_with_context)
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
-from sklearn.decomposition import TruncatedSVD
-from scipy.sparse import csr_matrix
-import uuid
-from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-app = Flask(__name__)
-CORS(app)
-
-# Firebase initialization
-try:
-    cred = credentials.Certificate('firebase_service_account.json')
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    print("Firebase initialized successfully")
-except Exception as e:
-    print(f"Firebase initialization failed: {e}")
-    db = None
+import os
+from analytics import AnalyticsStore
+import compact_codec
+from content import build_content_model
+from duplicates import DuplicateDetector
+from event_log import EventLog
+from friends import MAX_SUGGESTIONS, FriendSuggestionStore, load_social_data
+from ingest import IngestionQueue, QueueFullError, firestore_events_sink, validate_user_data
+from instrumentation import instrument_app
+from leaderboard import METRICS, MAX_PAGE_SIZE, LeaderboardStore, load_leaderboard_users
+from metrics import registry, stage
+from question_sampler import QuestionSampler
+from question_store import (DEFAULT_SYNC_PAGE_SIZE, MAX_SYNC_PAGE_SIZE, VIEWS, QuestionCache,
+                            apply_view, delete_questions, encode_ndjson, fetch_question_changes,
+                            get_questions_by_ids, parse_page_params, snapshot_cursor,
+                            stream_questions, write_questions, write_questions_async)
+from recommender import ModelStore, top_k_indices
+from response_cache import InProcessBackend, RecommendationCache, RedisBackend
+from trainers import get_trainer
+
+# pandas, scikit-learn, scipy ve firebase_admin modül yüklenirken içe aktarılmaz;
+# ilk kullanıldıkları istekte yüklenir (sıfırdan ölçeklenen örneklerde soğuk başlangıç)
+api = Blueprint('api', __name__)
+
+# app.extensions altında uygulamanın ApiServices örneğinin anahtarı
+EXTENSION_NAME = 'ai_api'
+
+DEFAULT_CONFIG = {
+    'FIREBASE_CREDENTIALS': os.environ.get('FIREBASE_CREDENTIALS', 'firebase_service_account.json'),
+    'FIRESTORE_CLIENT': None,
+    'FIRESTORE_ASYNC_CLIENT': None,
+    # Diske yazan bileşenler; aynı dizin tek bir uygulamaya (ve sürece) verilmelidir
+    'EVENT_LOG_DIR': os.environ.get('EVENT_LOG_DIR'),
+    'LEADERBOARD_SNAPSHOT_DIR': os.environ.get('LEADERBOARD_SNAPSHOT_DIR'),
+    # Soru yazmalarında eşzamanlı WriteBatch commit sayısı (okumalar havuz kullanmaz)
+    'FIRESTORE_IO_THREADS': int(os.environ.get('FIRESTORE_IO_THREADS', 4)),
+}
+
+EVENT_LOG_COMPACT_EVERY = int(os.environ.get('EVENT_LOG_COMPACT_EVERY', 100000))
+DUPLICATE_MODES = ('flag', 'skip', 'allow')
+SYNC_FORMATS = ('json', 'compact')
+DEFAULT_DUPLICATE_GROUPS = 100
+MAX_DUPLICATE_GROUPS = 1000
+
+def init_firestore(credentials_path):
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    try:
+        # Firebase uygulaması kimlik dosyası adıyla kaydedilir; aynı dosyayı kullanan
+        # ikinci uygulama örneği mevcut kaydı paylaşır
+        try:
+            firebase_app = firebase_admin.get_app(credentials_path)
+        except ValueError:
+            firebase_app = firebase_admin.initialize_app(
+                credentials.Certificate(credentials_path), name=credentials_path)
+        client = firestore.client(firebase_app)
+        print("Firebase initialized successfully")
+        return client
+    except Exception as e:
+        print(f"Firebase initialization failed: {e}")
+        return None
 
 # Kullanıcı quiz geçmişi verileri (örnek veri)
 user_quiz_data = {
@@ -44,138 +90,710 @@ user_quiz_data = {
 
 # Quiz meta verileri (örnek veri)
 quiz_metadata = {
-    "quiz1": {"title": "Türkiye Coğrafyası", "category": "Coğrafya", "difficulty": "Orta"},
-    "quiz2": {"title": "Osmanlı Tarihi", "category": "Tarih", "zorluk": "Zor"},
-    "quiz3": {"title": "Temel Matematik", "category": "Matematik", "difficulty": "Kolay"},
-    "quiz4": {"title": "Dünya Başkentleri", "category": "Coğrafya", "difficulty": "Kolay"},
-    "quiz5": {"title": "Antik Roma", "category": "Tarih", "difficulty": "Orta"},
-    "quiz6": {"title": "Cebir", "category": "Matematik", "difficulty": "Zor"},
+    "quiz1": {"title": "Türkiye Coğrafyası", "category": "Coğrafya", "difficulty": "Orta",
+              "tags": ["türkiye", "coğrafya"]},
+    "quiz2": {"title": "Osmanlı Tarihi", "category": "Tarih", "zorluk": "Zor",
+              "tags": ["osmanlı", "tarih"]},
+    "quiz3": {"title": "Temel Matematik", "category": "Matematik", "difficulty": "Kolay",
+              "tags": ["matematik", "aritmetik"]},
+    "quiz4": {"title": "Dünya Başkentleri", "category": "Coğrafya", "difficulty": "Kolay",
+              "tags": ["dünya", "coğrafya"]},
+    "quiz5": {"title": "Antik Roma", "category": "Tarih", "difficulty": "Orta",
+              "tags": ["roma", "tarih"]},
+    "quiz6": {"title": "Cebir", "category": "Matematik", "difficulty": "Zor",
+              "tags": ["matematik", "cebir"]},
+}
+
+# Sosyal graf verileri (örnek veri; Firestore bağlıysa users, friends, games, blocked
+# ve friend_requests koleksiyonlarından okunur)
+social_data = {
+    "users": {
+        "user1": {"nickname": "Ayşe", "totalWins": 12},
+        "user2": {"nickname": "Mehmet", "totalWins": 4},
+        "user3": {"nickname": "Zeynep", "totalWins": 20},
+        "user4": {"nickname": "Can", "totalWins": 7},
+        "user5": {"nickname": "Elif", "totalWins": 1},
+        "user6": {"nickname": "Deniz", "totalWins": 9},
+    },
+    "friendships": [("user1", "user2"), ("user2", "user3"), ("user2", "user4"), ("user3", "user4")],
+    "games": [["user1", "user5"], ["user1", "user5"], ["user3", "user6"]],
+    "blocked": [("user6", "user1")],
+    "pending": [("user5", "user4")],
+}
+
+# Liderlik tablosu örnek verisi (users dokümanlarındaki sayaçlar)
+leaderboard_users = {
+    "user1": {"nickname": "Ayşe", "quizCount": 42, "duelWins": 12, "friendCount": 1, "longestStreak": 9},
+    "user2": {"nickname": "Mehmet", "quizCount": 17, "duelWins": 4, "friendCount": 3, "longestStreak": 3},
+    "user3": {"nickname": "Zeynep", "quizCount": 42, "duelWins": 20, "friendCount": 2, "longestStreak": 14},
+    "user4": {"nickname": "Can", "quizCount": 8, "duelWins": 7, "friendCount": 2, "longestStreak": 2},
+    "user5": {"nickname": "Elif", "quizCount": 3, "duelWins": 1, "friendCount": 0, "longestStreak": 1},
+    "user6": {"nickname": "Deniz", "quizCount": 25, "duelWins": 9, "friendCount": 0, "longestStreak": 6},
 }
 
-@app.route('/recommendations', methods=['GET'])
+class ApiServices:
+    """
+    Bir uygulama örneğinin Firestore istemcileri ve bellek içi depoları.
+
+    create_app() her uygulama için yenisini kurup app.extensions['ai_api'] altına
+    koyar; route'lar current_services() ile erişir. Aynı süreçteki iki uygulama
+    (ör. testler) model, önbellek ya da kuyruk paylaşmaz.
+    """
+
+    def __init__(self, config):
+        # Firestore istemcisi ilk kullanımda oluşturulur (get_db)
+        self.firebase_credentials = config['FIREBASE_CREDENTIALS']
+        self.db = config['FIRESTORE_CLIENT']
+        self.async_db = config['FIRESTORE_ASYNC_CLIENT']
+        self._firebase_initialized = False
+        self._firebase_lock = threading.Lock()
+        # Yazma havuzu fork sonrası ilk kullanımda oluşturulur; işçiler arasında paylaşılmaz
+        self.io_threads = int(config['FIRESTORE_IO_THREADS'])
+        self._io_executor = None
+        self.quiz_metadata = quiz_metadata
+        self.content_models = {}
+
+        # Soru bankası sayfaları için süreç içi önbellek
+        self.question_cache = QuestionCache(
+            max_entries=int(os.environ.get('QUESTION_CACHE_SIZE', 256)),
+            ttl_seconds=int(os.environ.get('QUESTION_CACHE_TTL', 300))
+        )
+        # /quiz/next_questions için (kategori, zorluk) indeksleri ve kullanıcı bitmap'leri
+        self.question_sampler = QuestionSampler(self.load_question_bank)
+        # Toplu eklemelerde yakın kopya kontrolü için MinHash/LSH indeksi
+        self.duplicate_detector = DuplicateDetector(
+            self.load_question_bank, threshold=float(os.environ.get('DUPLICATE_THRESHOLD', 0.7)))
+
+        # Puan olayları için yerel log (EVENT_LOG_DIR verilirse); açılışta son anlık görüntü
+        # mmap ile açılır ve sadece log kuyruğu oynatılır
+        self.event_log = EventLog(config['EVENT_LOG_DIR']) if config['EVENT_LOG_DIR'] else None
+        self._initial_history = []
+
+        # Faktör modeli bir kez eğitilir, yeni puanlar fold-in ile eklenir; eğitim motoru
+        # RECOMMENDER_TRAINER ile seçilir (svd: randomized SVD, als: örtük geri bildirimli ALS)
+        self.model_store = ModelStore(
+            self.load_rating_history,
+            n_components=int(os.environ.get('RECOMMENDER_COMPONENTS', 5)),
+            trainer=get_trainer(os.environ.get('RECOMMENDER_TRAINER', 'svd'))
+        )
+        # Arkadaş önerileri tüm kullanıcılar için arka planda hesaplanır, istekler bellekten okunur
+        self.friend_store = FriendSuggestionStore(self.load_friend_graph_data)
+        # Liderlik tabloları bellekte sıralı tutulur; LEADERBOARD_SNAPSHOT_DIR verilirse
+        # periyodik olarak diske yazılır ve yeniden başlatmada oradan yüklenir
+        self.leaderboard_store = LeaderboardStore(self.load_leaderboard_data,
+                                                  config['LEADERBOARD_SNAPSHOT_DIR'])
+        # Kullanıcı analizleri bir kez toplu hesaplanır, yeni olaylarla artımlı güncellenir
+        self.analytics_store = AnalyticsStore(
+            self.load_rating_history,
+            lambda quiz_id: self.quiz_metadata.get(quiz_id, {}).get("category", "Genel")
+        )
+
+        # /recommendations yanıt önbelleği; RECOMMENDATION_CACHE_URL verilirse Redis uyumlu
+        # sunucu (işçiler arasında paylaşılır), yoksa süreç içi LRU + TTL
+        cache_url = os.environ.get('RECOMMENDATION_CACHE_URL')
+        cache_ttl = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 600))
+        self.recommendation_cache = RecommendationCache(
+            RedisBackend.from_url(cache_url, cache_ttl) if cache_url else
+            InProcessBackend(int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 10000)), cache_ttl)
+        )
+
+        # /user_data olayları için sınırlı kuyruk ve arka plan işçisi
+        self.ingestion_queue = IngestionQueue(
+            [self.append_to_event_log, firestore_events_sink(self.get_db), self.apply_events],
+            max_size=int(os.environ.get('INGEST_QUEUE_SIZE', 10000)),
+            batch_size=int(os.environ.get('INGEST_BATCH_SIZE', 500)),
+            flush_interval=float(os.environ.get('INGEST_FLUSH_INTERVAL', 1.0))
+        )
+
+    def get_db(self):
+        if self.db is None and not self._firebase_initialized:
+            with self._firebase_lock:
+                if self.db is None and not self._firebase_initialized:
+                    self.db = init_firestore(self.firebase_credentials)
+                    self._firebase_initialized = True
+        return self.db
+
+    def get_async_db(self):
+        # gRPC aio kanalları olay döngüsüne bağlıdır; Flask her async view'ı ayrı bir döngüde
+        # çalıştırdığından gerçek AsyncClient istek başına oluşturulur
+        if self.async_db is not None:
+            return self.async_db
+        if self.get_db() is None:
+            return None
+        import firebase_admin
+        from google.cloud import firestore
+
+        try:
+            firebase_app = firebase_admin.get_app(self.firebase_credentials)
+        except ValueError:
+            return None
+        return firestore.AsyncClient(project=firebase_app.project_id,
+                                     credentials=firebase_app.credential.get_credential())
+
+    def load_question_bank(self):
+        # Soru bankası açılışta bir kez okunur; yeni sorular /add_questions ile eklenir
+        db = self.get_db()
+        if db is not None:
+            return list(stream_questions(db))
+        from add_sample_questions import sample_questions
+        return sample_questions
+
+    def load_rating_history(self):
+        # Başlangıç geçmişi bir kez yüklenir; model ve analiz deposu aynı kopyayı kullanır
+        if not self._initial_history:
+            if self.event_log is None:
+                history = user_quiz_data
+            else:
+                if self.event_log.is_empty():
+                    # İlk açılış: mevcut geçmiş log'a yazılır, yoksa log'a geçişte kaybolurdu
+                    self.event_log.append(list(user_quiz_data.items()))
+                # mmap'li anlık görüntü + log kuyruğu; sözlüklere çevrilmez
+                history = self.event_log.load_history()
+            self._initial_history.append(history)
+        return self._initial_history[0]
+
+    def append_to_event_log(self, batch):
+        if self.event_log is None:
+            return
+        self.event_log.append(batch)
+        if self.event_log.tail_records >= EVENT_LOG_COMPACT_EVERY:
+            self.event_log.compact()
+
+    def load_friend_graph_data(self):
+        db = self.get_db()
+        return load_social_data(db) if db is not None else social_data
+
+    def load_leaderboard_data(self):
+        db = self.get_db()
+        return load_leaderboard_users(db) if db is not None else leaderboard_users
+
+    def apply_events(self, batch):
+        # Toplu olaylar kullanıcı bazında öneri modeline ve analiz tablosuna uygulanır
+        events_by_user = {}
+        for user_id, events in batch:
+            events_by_user.setdefault(user_id, []).extend(events)
+        for user_id, events in events_by_user.items():
+            if events:
+                self.model_store.add_ratings(user_id, events)
+                self.analytics_store.add_events(user_id, events)
+                self.recommendation_cache.invalidate_user(user_id)
+
+    def collect_metrics(self):
+        # Önbellek ve kuyruk sayaçları kendi sınıflarında tutulur; /metrics kazımasında okunur
+        for cache_name, stats in (('questions', self.question_cache.stats()),
+                                  ('recommendations', self.recommendation_cache.stats())):
+            labels = {'cache': cache_name}
+            yield ('ai_api_cache_hits_total', 'counter', 'Cache hits', labels, stats['hits'])
+            yield ('ai_api_cache_misses_total', 'counter', 'Cache misses', labels, stats['misses'])
+            if 'entries' in stats:
+                yield ('ai_api_cache_entries', 'gauge', 'Entries held in the cache', labels,
+                       stats['entries'])
+                yield ('ai_api_cache_evictions_total', 'counter',
+                       'Entries evicted by the LRU bound', labels, stats['evictions'])
+        queue = self.ingestion_queue.metrics()
+        yield ('ai_api_ingest_queue_depth', 'gauge', 'Events waiting in the ingestion queue', {},
+               queue['queueDepth'])
+        yield ('ai_api_ingest_rejected_total', 'counter',
+               'Events rejected because the queue was full', {}, queue['rejected'])
+        yield ('ai_api_ingest_sink_errors_total', 'counter', 'Ingestion sink failures', {},
+               queue['sinkErrors'])
+        model = self.model_store.current_model()
+        if model is not None:
+            yield ('ai_api_model_version', 'gauge', 'Version of the served factor model', {},
+                   model.version)
+
+    def io_executor(self):
+        # Soru yazmalarının WriteBatch parçalarını commit eden havuz
+        if self._io_executor is None:
+            with self._firebase_lock:
+                if self._io_executor is None:
+                    self._io_executor = ThreadPoolExecutor(max_workers=self.io_threads,
+                                                           thread_name_prefix='firestore-io')
+        return self._io_executor
+
+    def close(self):
+        # Kuyruktaki olaylar yazılır, liderlik tablosu diske alınır, arka plan işleri durur
+        atexit.unregister(self.close)
+        self.ingestion_queue.stop()
+        self.leaderboard_store.close()
+        self.model_store.stop_background_refit()
+        self.friend_store.stop_background_refresh()
+        self.question_cache.stop_watch()
+        if self.event_log is not None:
+            self.event_log.close()
+        if self._io_executor is not None:
+            self._io_executor.shutdown()
+
+def create_app(config=None):
+    """
+    Flask uygulamasını ve ona ait ApiServices örneğini oluşturur.
+
+    config, Flask ayarlarına ek olarak FIREBASE_CREDENTIALS (servis hesabı dosyası),
+    FIRESTORE_CLIENT / FIRESTORE_ASYNC_CLIENT (hazır istemciler, ör. testlerde
+    FakeFirestoreClient / FakeAsyncFirestoreClient), FIRESTORE_IO_THREADS (soru
+    yazmalarının eşzamanlılığı), EVENT_LOG_DIR, LEADERBOARD_SNAPSHOT_DIR ve PROFILE_* profil ayarlarını
+    (instrumentation.DEFAULT_CONFIG) alır.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    CORS(app)
+    instrument_app(app)
+    app.register_blueprint(api)
+
+    services = ApiServices(app.config)
+    app.extensions[EXTENSION_NAME] = services
+    atexit.register(services.close)
+    return app
+
+def current_services(app=None):
+    """Uygulamanın ApiServices örneği; app verilmezse istekteki uygulamanınki."""
+    return (app or current_app).extensions[EXTENSION_NAME]
+
+DEFAULT_RECOMMENDATION_COUNT = 3
+MAX_RECOMMENDATION_COUNT = 50
+MAX_BATCH_USERS = 100000
+BATCH_CHUNK_SIZE = 1024
+# Puanlama parçası başına yoğun skor dizilerinin bellek bütçesi; satır sayısı katalog boyutundan çıkar
+BATCH_SCORE_BUDGET = int(os.environ.get('BATCH_SCORE_BUDGET_MB', 256)) * 2**20
+DEFAULT_SIMILAR_COUNT = 5
+DEFAULT_FRIEND_SUGGESTION_COUNT = 10
+DEFAULT_QUESTION_COUNT = 10
+MAX_QUESTION_COUNT = 50
+MAX_ANSWERS_PER_REQUEST = 500
+MAX_QUESTION_IDS = 1000
+DEFAULT_LEADERBOARD_LIMIT = 50
+MAX_LEADERBOARD_EVENTS = 1000
+# Karma skorda içerik benzerliğinin ağırlığı (kalanı SVD skoru)
+CONTENT_WEIGHT = float(os.environ.get('HYBRID_CONTENT_WEIGHT', 0.3))
+PERSONALIZED_REASON = "Based on your quiz history and similar user preferences"
+POPULAR_REASON = "Popular with other players in this category"
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    services = current_services()
+    # Prometheus metin biçimi (işçi başına; çok işçili kurulumda her işçi ayrı kazınır)
+    return Response(registry.render(services.collect_metrics), mimetype='text/plain; version=0.0.4')
+
+@api.route('/recommendations', methods=['GET'])
 def get_recommendations():
+    services = current_services()
     user_id = request.args.get('user_id')
     
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
-    
-    # Kullanıcı verilerini al
-    user_data = get_user_data(user_id)
-    
-    if not user_data:
-        return jsonify({'recommendations': []}), 200
-    
-    # Matris ayrıştırma tabanlı öneri sistemi kullanarak öneriler hesapla
-    recommendations = generate_recommendations(user_data)
-    
-    return jsonify({'recommendations': recommendations})
 
-def get_user_data(user_id):
-    # Kullanıcı quiz geçmişini al (örnek veri)
-    if user_id in user_quiz_data:
-        return user_quiz_data[user_id]
+    try:
+        k, categories = parse_recommendation_params(
+            request.args.get('k'), request.args.getlist('category'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Kullanıcı verisi yoksa boş liste döndür
-    return []
+    # Önbellek anahtarı ve ETag, skorlamadan önce model kimliği + kullanıcı revizyonundan
+    # türetilir; ikisi de süreç ve eğitim başına tekildir, yeniden başlatmada eski ETag eşleşmez
+    model = services.model_store.get_model()
+    model_version = model.version
+    cache_key = services.recommendation_cache.key(
+        user_id, model.model_id, services.model_store.user_revision(user_id), k, categories)
+    etag = services.recommendation_cache.etag(cache_key)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
 
-def generate_recommendations(user_data):
-    # Matris ayrıştırma tabanlı öneri sistemi
-    all_quizzes = set()
-    all_users = set()
-    
-    for user, quizzes in user_quiz_data.items():
-        all_users.add(user)
-        for quiz in quizzes:
-            all_quizzes.add(quiz["quiz_id"])
-    
-    # Kullanıcı-quiz matrisi oluştur
-    user_index = {user: i for i, user in enumerate(all_users)}
-    quiz_index = {quiz: i for i, quiz in enumerate(all_quizzes)}
-    
-    matrix = np.zeros((len(all_users), len(all_quizzes)))
-    
-    for user, quizzes in user_quiz_data.items():
-        for quiz_data in quizzes:
-            user_idx = user_index[user]
-            quiz_idx = quiz_index[quiz_data["quiz_id"]]
-            matrix[user_idx][quiz_idx] = quiz_data["rating"]
-    
-    # Matris ayrıştırma (SVD)
-    svd = TruncatedSVD(n_components=min(5, min(matrix.shape) - 1), random_state=42)
-    user_factors = svd.fit_transform(matrix)
-    quiz_factors = svd.components_.T
-    
-    # Kullanıcı için öneriler hesapla
-    user_id = list(all_users)[0]  # İlk kullanıcıyı örnek olarak al
-    user_idx = user_index[user_id]
-    
-    # Kullanıcının henüz yapmadığı quizleri bul
-    user_ratings = matrix[user_idx]
-    not_rated_quizzes = [i for i, rating in enumerate(user_ratings) if rating == 0]
-    
-    # Öneri puanlarını hesapla
-    recommendations = []
-    for quiz_idx in not_rated_quizzes:
-        # Kullanıcı faktörleri ile quiz faktörlerini çarp
-        score = np.dot(user_factors[user_idx], quiz_factors[quiz_idx])
-        
-        # Quiz meta verilerini al
-        quiz_id = list(all_quizzes)[quiz_idx]
-        quiz_info = quiz_metadata.get(quiz_id, {})
-        
-        # Öneri oluştur
-        recommendation = {
-            "quizId": quiz_id,
+    body = services.recommendation_cache.get(cache_key)
+    if body is None:
+        # Matris ayrıştırma + içerik tabanlı karma skor; geçmişi olmayanlara popüler quizler
+        recommendations = generate_recommendations(services, user_id, k, categories)
+        body = {
+            'recommendations': recommendations,
+            'modelVersion': model_version
+        }
+        services.recommendation_cache.set(cache_key, body)
+
+    with stage('serialize'):
+        response = jsonify(body)
+    response.set_etag(etag)
+    # İstemci her seferinde ETag ile doğrulamalı; yanıt kişiye özel
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api.route('/recommendations/cache', methods=['GET'])
+def get_recommendation_cache_stats():
+    services = current_services()
+    return jsonify(services.recommendation_cache.stats())
+
+@api.route('/recommendations/cache', methods=['DELETE'])
+def invalidate_recommendation_cache():
+    services = current_services()
+    removed = services.recommendation_cache.invalidate()
+    return jsonify({'status': 'success', 'removed': removed})
+
+def get_user_data(services, user_id):
+    # Kullanıcı quiz geçmişini al (model deposundaki güncel geçmiş)
+    return services.model_store.get_history(user_id)
+
+def content_model(services, model):
+    # İçerik özellikleri ve kategori popülerliği model sürümü başına bir kez hesaplanır
+    content = services.content_models.get(model.version)
+    if content is None:
+        content = build_content_model(model.quiz_mapping, services.quiz_metadata, model.ratings)
+        services.content_models.clear()
+        services.content_models[model.version] = content
+    return content
+
+def category_mask(content, categories):
+    if not categories:
+        return None
+    return np.isin(content.categories, list(categories))
+
+def build_recommendation(metadata, content, quiz_idx, score, reason=PERSONALIZED_REASON):
+    quiz_id = content.quiz_ids[quiz_idx]
+    quiz_info = metadata.get(quiz_id, {})
+    return {
+        "quizId": quiz_id,
+        "quizTitle": quiz_info.get("title", "Bilinmeyen Quiz"),
+        "category": quiz_info.get("category", "Genel"),
+        "confidenceScore": float(score),
+        "reason": reason
+    }
+
+def hybrid_scores(model_store, model, content, user_ids, rated):
+    """
+    SVD ve içerik skorlarının karışımı, (kullanıcı, katalog quizi) boyutunda.
+
+    SVD skorları satır başına [-1, 1] aralığına ölçeklenir; model quizleri katalog
+    indekslerinin öneki olduğundan yeni quizler yalnızca içerik skoru alır. Skorlar
+    float32 tutulur; SVD skorları kullanıcı başına hesaplanıp yerinde eklenir, böylece
+    ikinci bir (kullanıcı, quiz) dizisi kurulmaz ve sonuç parça boyutundan bağımsızdır.
+    """
+    scores = content.scores(rated)
+    scores *= CONTENT_WEIGHT
+    if not model.is_empty:
+        quiz_factors = model.quiz_factors.astype(np.float32)
+        svd_row = np.empty(quiz_factors.shape[0], dtype=np.float32)
+        for row, user_id in enumerate(user_ids):
+            user_vector = model_store.user_vector(model, user_id).astype(np.float32)
+            np.matmul(quiz_factors, user_vector, out=svd_row)
+            svd_row *= (1 - CONTENT_WEIGHT) / (np.abs(svd_row).max() or 1.0)
+            scores[row, :len(svd_row)] += svd_row
+    return scores
+
+def score_chunk_size(n_quizzes):
+    # Parçanın float32 skor dizisi (satır başına 4 * n_quizzes bayt) bütçeye sığar
+    return max(1, min(BATCH_CHUNK_SIZE, BATCH_SCORE_BUDGET // (4 * max(n_quizzes, 1))))
+
+def generate_recommendations_batch(services, user_ids, k=DEFAULT_RECOMMENDATION_COUNT,
+                                   categories=None):
+    # Önbellekteki faktör modelini kullan; her istekte yeniden eğitme
+    with stage('model_load'):
+        model = services.model_store.get_model()
+    with stage('content_model'):
+        content = content_model(services, model)
+    results = [[] for _ in user_ids]
+    if not len(content) or not user_ids:
+        return results
+
+    with stage('history_fetch'):
+        histories = [get_user_data(services, user_id) for user_id in user_ids]
+    warm = [row for row, history in enumerate(histories) if history]
+    cold = [row for row, history in enumerate(histories) if not history]
+
+    allowed = category_mask(content, categories)
+    chunk_size = score_chunk_size(len(content))
+    for start in range(0, len(warm), chunk_size):
+        chunk = warm[start:start + chunk_size]
+        # Parçadaki kullanıcı-quiz puanları tek matris çarpımıyla hesaplanır
+        with stage('score'):
+            rated = content.encode_history([histories[row] for row in chunk])
+            scores = hybrid_scores(services.model_store, model, content,
+                                   [user_ids[row] for row in chunk], rated)
+
+        # Yapılan quizler seyrek maskeyle yerinde dışlanır, en iyi k tanesi argpartition ile seçilir
+        with stage('top_k'):
+            excluded = rated.copy()
+            excluded.data[:] = 1
+            top = top_k_indices(scores, k, excluded, allowed)
+        for position, row in enumerate(chunk):
+            results[row] = [build_recommendation(services.quiz_metadata, content, quiz_idx,
+                                                 scores[position, quiz_idx])
+                            for quiz_idx in top[position]]
+
+    if cold:
+        # Geçmişi olmayan kullanıcılar: kategori popülerliğine göre önceden sıralı liste
+        popular = content.cold_start(k, categories)
+        max_popularity = content.popularity.max() or 1.0
+        recommendations = [
+            build_recommendation(services.quiz_metadata, content, quiz_idx,
+                                 content.popularity[quiz_idx] / max_popularity, POPULAR_REASON)
+            for quiz_idx in popular
+        ]
+        for row in cold:
+            results[row] = [dict(recommendation) for recommendation in recommendations]
+
+    return results
+
+def generate_recommendations(services, user_id, k=DEFAULT_RECOMMENDATION_COUNT, categories=None):
+    return generate_recommendations_batch(services, [user_id], k, categories)[0]
+
+def parse_recommendation_params(k_value, category_values):
+    try:
+        k = int(k_value if k_value is not None else DEFAULT_RECOMMENDATION_COUNT)
+    except (TypeError, ValueError):
+        raise ValueError('k must be an integer')
+    if not 1 <= k <= MAX_RECOMMENDATION_COUNT:
+        raise ValueError(f'k must be between 1 and {MAX_RECOMMENDATION_COUNT}')
+
+    if isinstance(category_values, str):
+        category_values = [category_values]
+    categories = [
+        category.strip()
+        for value in category_values or []
+        for category in str(value).split(',')
+        if category.strip()
+    ]
+    return k, categories
+
+@api.route('/recommendations/batch', methods=['POST'])
+def get_recommendations_batch():
+    services = current_services()
+    payload = request.get_json(silent=True)
+
+    if not payload or not isinstance(payload.get('userIds'), list):
+        return jsonify({'error': 'userIds must be a list'}), 400
+
+    user_ids = [str(user_id) for user_id in payload['userIds']]
+    if len(user_ids) > MAX_BATCH_USERS:
+        return jsonify({'error': f'At most {MAX_BATCH_USERS} users per batch'}), 400
+
+    try:
+        k, categories = parse_recommendation_params(payload.get('k'), payload.get('category'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    model_version = services.model_store.get_model().version
+
+    def generate():
+        # Kullanıcılar parça parça puanlanır, her satır hazır olunca gönderilir (NDJSON)
+        for start in range(0, len(user_ids), BATCH_CHUNK_SIZE):
+            chunk = user_ids[start:start + BATCH_CHUNK_SIZE]
+            results = generate_recommendations_batch(services, chunk, k, categories)
+            for user_id, recommendations in zip(chunk, results):
+                line = {
+                    'userId': user_id,
+                    'recommendations': recommendations,
+                    'modelVersion': model_version
+                }
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api.route('/similar_quizzes', methods=['GET'])
+def get_similar_quizzes():
+    services = current_services()
+    quiz_id = request.args.get('quiz_id')
+
+    if not quiz_id:
+        return jsonify({'error': 'Quiz ID is required'}), 400
+
+    try:
+        k, _ = parse_recommendation_params(request.args.get('k', DEFAULT_SIMILAR_COUNT), None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    model = services.model_store.get_model()
+    quiz_idx = model.quiz_index.get(quiz_id)
+    if quiz_idx is None or model.is_empty:
+        return jsonify({'error': 'Quiz not found'}), 404
+
+    # Bu quizi beğenenler bunları da beğendi: normalize quiz faktörlerinde en yakın komşular
+    indices, similarities = model.item_index.search(quiz_idx, k)
+    similar = []
+    for idx, similarity in zip(indices, similarities):
+        quiz_info = services.quiz_metadata.get(model.quiz_ids[idx], {})
+        similar.append({
+            "quizId": model.quiz_ids[idx],
             "quizTitle": quiz_info.get("title", "Bilinmeyen Quiz"),
             "category": quiz_info.get("category", "Genel"),
-            "confidenceScore": float(score),
-            "reason": "Based on your quiz history and similar user preferences"
-        }
-        
-        recommendations.append(recommendation)
-    
-    # Güven puanına göre sırala
-    recommendations.sort(key=lambda x: x["confidenceScore"], reverse=True)
-    
-    # İlk 3 öneriyi döndür
-    return recommendations[:3]
+            "similarity": float(similarity)
+        })
+
+    return jsonify({
+        'quizId': quiz_id,
+        'similarQuizzes': similar,
+        'modelVersion': model.version
+    })
+
+@api.route('/friend_suggestions', methods=['GET'])
+def get_friend_suggestions():
+    services = current_services()
+    user_id = request.args.get('user_id')
+
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
+    try:
+        k = int(request.args.get('k', DEFAULT_FRIEND_SUGGESTION_COUNT))
+    except ValueError:
+        return jsonify({'error': 'k must be an integer'}), 400
+    if not 1 <= k <= MAX_SUGGESTIONS:
+        return jsonify({'error': f'k must be between 1 and {MAX_SUGGESTIONS}'}), 400
+
+    # Ortak arkadaş + birlikte oynama skorları önceden hesaplı; arkadaşlar, engellenenler
+    # ve bekleyen istekler zaten dışlanmış durumda
+    graph = services.friend_store.get_graph()
+    with stage('friend_lookup'):
+        suggestions = graph.suggest(user_id, k)
+    return jsonify({
+        'userId': user_id,
+        'suggestions': suggestions,
+        'graphVersion': graph.version
+    })
+
+@api.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    services = current_services()
+    metric = request.args.get('metric', METRICS[0])
+    if metric not in METRICS:
+        return jsonify({'error': f"metric must be one of: {', '.join(METRICS)}"}), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_LEADERBOARD_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0:
+        return jsonify({'error': 'offset must not be negative'}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    # Sayfa başı sıralı listede ikili aramayla bulunur; Firestore sorgusu yapılmaz
+    with stage('leaderboard_lookup'):
+        entries, total = services.leaderboard_store.page(metric, offset, limit)
+    return jsonify({
+        'metric': metric,
+        'offset': offset,
+        'limit': limit,
+        'total': total,
+        'entries': entries
+    })
+
+@api.route('/leaderboard/rank', methods=['GET'])
+def get_leaderboard_rank():
+    services = current_services()
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
+    metric = request.args.get('metric')
+    if metric is not None and metric not in METRICS:
+        return jsonify({'error': f"metric must be one of: {', '.join(METRICS)}"}), 400
+
+    # Skoru olmayan metriklerde sıra null döner
+    with stage('leaderboard_lookup'):
+        ranks = services.leaderboard_store.rank(user_id, [metric] if metric else METRICS)
+    return jsonify({'userId': user_id, 'ranks': ranks})
 
-@app.route('/analyze', methods=['GET'])
+@api.route('/leaderboard/events', methods=['POST'])
+def submit_leaderboard_events():
+    services = current_services()
+    events = request.get_json(silent=True)
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'Events must be a non-empty list'}), 400
+    if len(events) > MAX_LEADERBOARD_EVENTS:
+        return jsonify({'error': f'At most {MAX_LEADERBOARD_EVENTS} events per request'}), 400
+    for event in events:
+        if not isinstance(event, dict) or not event.get('userId'):
+            return jsonify({'error': 'Each event needs a userId'}), 400
+        if event.get('metric') not in METRICS:
+            return jsonify({'error': f"metric must be one of: {', '.join(METRICS)}"}), 400
+        values = [event[key] for key in ('value', 'delta') if key in event]
+        if len(values) != 1 or not isinstance(values[0], int) or isinstance(values[0], bool):
+            return jsonify({'error': 'Each event needs exactly one integer value or delta'}), 400
+
+    # Skor olayları sıralı listelere artımlı uygulanır (eski anahtar silinir, yenisi eklenir)
+    applied = services.leaderboard_store.apply_events(events)
+    return jsonify({'status': 'success', 'applied': applied})
+
+@api.route('/leaderboard/status', methods=['GET'])
+def get_leaderboard_status():
+    services = current_services()
+    return jsonify(services.leaderboard_store.status())
+
+@api.route('/model/status', methods=['GET'])
+def get_model_status():
+    services = current_services()
+    # Model sürümü ve son eğitim zamanı (bayatlık takibi için)
+    return jsonify(services.model_store.status())
+
+@api.route('/analyze', methods=['GET'])
 def analyze_user():
+    services = current_services()
     user_id = request.args.get('user_id')
     
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
     
-    # Kullanıcı davranış analizi (örnek veri)
-    analysis = {
-        "userId": user_id,
-        "preferredCategories": ["Coğrafya", "Tarih"],
-        "avgScore": 4.2,
-        "engagementLevel": "Yüksek",
-        "timeSpent": "15 dakika",
-        "lastActive": "2025-01-17T15:30:00",
-        "recommendationsCount": 3,
-        "socialInteractions": 5
-    }
+    # Kullanıcı davranış analizi (önceden hesaplanmış tablodan)
+    analysis = services.analytics_store.get(user_id)
+    analysis["recommendationsCount"] = DEFAULT_RECOMMENDATION_COUNT
+    analysis["socialInteractions"] = 0
     
     return jsonify(analysis)
 
-@app.route('/user_data', methods=['POST'])
+@api.route('/user_data', methods=['POST'])
 def submit_user_data():
+    services = current_services()
     user_data = request.get_json()
 
     if not user_data:
         return jsonify({'error': 'No data provided'}), 400
 
-    # Kullanıcı verilerini işle (örnek)
-    print(f"Received user data: {json.dumps(user_data, indent=2)}")
+    try:
+        user_id, events = validate_user_data(user_data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Olay kuyruğa eklenir; kalıcı kayıt ve model güncellemesi arka planda toplu yapılır
+    try:
+        services.ingestion_queue.submit((user_id, events))
+    except QueueFullError:
+        return jsonify({'error': 'Too many pending events, retry later'}), 429, {'Retry-After': '1'}
+
+    return jsonify({'status': 'accepted', 'message': 'User data queued'}), 202
 
-    # Başarı mesajı döndür
-    return jsonify({'status': 'success', 'message': 'User data received'})
+@api.route('/user_data/metrics', methods=['GET'])
+def get_ingestion_metrics():
+    services = current_services()
+    # Kuyruk derinliği ve flush gecikmesi
+    return jsonify(services.ingestion_queue.metrics())
 
-@app.route('/add_questions', methods=['POST'])
+@api.route('/add_questions', methods=['POST'])
 def add_questions():
+    services = current_services()
+    db = services.get_db()
+    if db is None:
+        return jsonify({'error': 'Firebase not initialized'}), 500
+
+    questions_data = request.get_json()
+
+    if not questions_data or not isinstance(questions_data, list):
+        return jsonify({'error': 'Questions data must be a list'}), 400
+
+    on_duplicate = request.args.get('on_duplicate', 'flag')
+    if on_duplicate not in DUPLICATE_MODES:
+        return jsonify({'error': f"on_duplicate must be one of: {', '.join(DUPLICATE_MODES)}"}), 400
+
+    duplicates, written = find_duplicates(services, questions_data, on_duplicate)
+    # Sorular 500'lük WriteBatch parçaları halinde, sınırlı eşzamanlılıkla yazılır
+    with stage('firestore_write'):
+        results = write_questions(db, [questions_data[index] for index in written],
+                                  executor=services.io_executor())
+    return add_questions_response(services, results, questions_data, written, duplicates)
+
+@api.route('/async/add_questions', methods=['POST'])
+async def add_questions_async():
+    services = current_services()
+    db = services.get_async_db()
     if db is None:
         return jsonify({'error': 'Firebase not initialized'}), 500
 
@@ -184,54 +802,359 @@ def add_questions():
     if not questions_data or not isinstance(questions_data, list):
         return jsonify({'error': 'Questions data must be a list'}), 400
 
+    on_duplicate = request.args.get('on_duplicate', 'flag')
+    if on_duplicate not in DUPLICATE_MODES:
+        return jsonify({'error': f"on_duplicate must be one of: {', '.join(DUPLICATE_MODES)}"}), 400
+
+    duplicates, written = find_duplicates(services, questions_data, on_duplicate)
+    # Parçalar iş parçacığı yerine olay döngüsünde eşzamanlı commit edilir
+    with stage('firestore_write'):
+        results = await write_questions_async(db, [questions_data[index] for index in written],
+                                              max_concurrency=services.io_threads)
+    return add_questions_response(services, results, questions_data, written, duplicates)
+
+def find_duplicates(services, questions_data, on_duplicate):
+    """
+    Her soru için bankadaki ve aynı istekteki yakın kopyalar ile yazılacak soruların
+    istek içindeki sıraları; 'skip' modunda kopyası olanlar yazılmaz, 'allow' modunda
+    kontrol yapılmaz.
+    """
+    if on_duplicate == 'allow':
+        return [[] for _ in questions_data], list(range(len(questions_data)))
+    with stage('duplicate_check'):
+        duplicates = services.duplicate_detector.check_batch(questions_data)
+    written = [index for index, matches in enumerate(duplicates)
+               if not (on_duplicate == 'skip' and matches)]
+    return duplicates, written
+
+def add_questions_response(services, results, questions_data, written, duplicates):
+    # Sonuç sıraları istek gövdesine göre düzeltilir; atlanan kopyalar da sonuca eklenir
+    merged = [None] * len(questions_data)
+    for result in results:
+        index = written[result['index']]
+        merged[index] = {**result, 'index': index}
+    for index, matches in enumerate(duplicates):
+        if merged[index] is None:
+            merged[index] = {'index': index, 'status': 'skipped', 'duplicateOf': matches}
+        elif matches:
+            merged[index]['duplicateOf'] = matches
+    results = merged
+
+    added_questions = [
+        {'id': result['id'], 'text': result['text'], 'category': result['category']}
+        for result in results if result['status'] == 'success'
+    ]
+    failed = sum(result['status'] == 'error' for result in results)
+    skipped = sum(result['status'] == 'skipped' for result in results)
+
+    # Eklenen kategorilerin önbellekteki sayfaları geçersiz kılınır, sorular örnekleyiciye
+    # ve kopya indeksine eklenir
+    if added_questions:
+        services.question_cache.invalidate(
+            {question['category'] or None for question in added_questions})
+        stored = [{**questions_data[result['index']], 'id': result['id']}
+                  for result in results if result['status'] == 'success']
+        services.question_sampler.add_questions(stored)
+        services.duplicate_detector.add_questions(stored)
+
+    if failed and not added_questions:
+        # Hiçbiri yazılamadı: commit hatası varsa 500, yalnızca geçersiz veri varsa 400
+        commit_failed = any('id' in result for result in results)
+        return jsonify({
+            'error': 'Failed to add questions',
+            'results': results
+        }), 500 if commit_failed else 400
+
+    message = f'{len(added_questions)} questions added'
+    if skipped:
+        message += f', {skipped} skipped as duplicates'
+    if failed:
+        message += f', {failed} failed'
+    return jsonify({
+        'status': 'partial' if failed else 'success',
+        'message': message,
+        'questions': added_questions,
+        'duplicateCount': sum(bool(matches) for matches in duplicates),
+        'results': results
+    }), 207 if failed else 200
+
+@api.route('/quiz/next_questions', methods=['GET'])
+def get_next_questions():
+    services = current_services()
+    user_id = request.args.get('user_id')
+
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+
     try:
-        added_questions = []
-        for question_data in questions_data:
-            # Add question to Firestore
-            doc_ref = db.collection('questions').document()
-            doc_ref.set(question_data)
-            added_questions.append({
-                'id': doc_ref.id,
-                'text': question_data.get('text', ''),
-                'category': question_data.get('category', '')
-            })
+        n = int(request.args.get('n', DEFAULT_QUESTION_COUNT))
+    except ValueError:
+        return jsonify({'error': 'n must be an integer'}), 400
+    if not 1 <= n <= MAX_QUESTION_COUNT:
+        return jsonify({'error': f'n must be between 1 and {MAX_QUESTION_COUNT}'}), 400
+
+    view = request.args.get('view', 'full')
+    if view not in VIEWS:
+        return jsonify({'error': f"view must be one of: {', '.join(VIEWS)}"}), 400
+
+    # Cevaplanmamış sorular kullanıcının seviyesine göre bellek içi indekslerden seçilir
+    with stage('question_sample'):
+        selection = services.question_sampler.next_questions(
+            user_id, request.args.get('category'), n)
+    questions = [apply_view(question, view) for question in selection.pop('questions')]
+    return jsonify({
+        'userId': user_id,
+        'count': len(questions),
+        'questions': questions,
+        **selection
+    })
+
+@api.route('/quiz/answers', methods=['POST'])
+def submit_quiz_answers():
+    services = current_services()
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('userId')
+    answers = data.get('answers')
+
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'error': 'answers must be a non-empty list'}), 400
+    if len(answers) > MAX_ANSWERS_PER_REQUEST:
+        return jsonify({'error': f'At most {MAX_ANSWERS_PER_REQUEST} answers per request'}), 400
+    if not all(isinstance(answer, dict) and answer.get('questionId') for answer in answers):
+        return jsonify({'error': 'Each answer needs a questionId'}), 400
+
+    # Cevaplanan sorular bitmap'e işlenir; doğruluk oranı sonraki seçimin zorluğunu belirler
+    recorded = services.question_sampler.record_answers(
+        user_id, [(answer['questionId'], bool(answer.get('correct'))) for answer in answers])
+    return jsonify({'status': 'success', 'recorded': recorded})
+
+@api.route('/questions/duplicates', methods=['GET'])
+def get_duplicate_questions():
+    services = current_services()
+    try:
+        threshold = float(request.args.get('threshold', services.duplicate_detector.threshold))
+        limit = int(request.args.get('limit', DEFAULT_DUPLICATE_GROUPS))
+    except ValueError:
+        return jsonify({'error': 'threshold must be a number and limit an integer'}), 400
+    if not 0 < threshold <= 1:
+        return jsonify({'error': 'threshold must be between 0 and 1'}), 400
+    if not 1 <= limit <= MAX_DUPLICATE_GROUPS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_DUPLICATE_GROUPS}'}), 400
+
+    # Aynı LSH kovasına düşen çiftler doğrulanıp kümelere birleştirilir (tüm çiftler taranmaz)
+    with stage('duplicate_report'):
+        groups = services.duplicate_detector.duplicate_groups(threshold)
+    return jsonify({
+        'threshold': threshold,
+        'questionCount': len(services.duplicate_detector.get_index()),
+        'groupCount': len(groups),
+        'groups': groups[:limit]
+    })
+
+@api.route('/questions/sync', methods=['GET'])
+def sync_questions():
+    services = current_services()
+    db = services.get_db()
+    if db is None:
+        return jsonify({'error': 'Firebase not initialized'}), 500
+
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', DEFAULT_SYNC_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    after_id = request.args.get('after_id') or None
+    if since < 0:
+        return jsonify({'error': 'since must not be negative'}), 400
+    if not 1 <= limit <= MAX_SYNC_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SYNC_PAGE_SIZE}'}), 400
+    if after_id is not None and since == 0:
+        return jsonify({'error': 'after_id requires since'}), 400
+
+    view = request.args.get('view', 'full')
+    if view not in VIEWS:
+        return jsonify({'error': f"view must be one of: {', '.join(VIEWS)}"}), 400
+    output_format = request.args.get('format', 'json')
+    if output_format not in SYNC_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(SYNC_FORMATS)}"}), 400
+
+    try:
+        with stage('firestore_read'):
+            if since == 0:
+                # İlk senkronizasyon: tüm banka (sürüm alanı olmayan eski sorular dahil)
+                questions, deleted = list(stream_questions(db, view=view)), []
+                cursor, last_id, has_more = snapshot_cursor(), None, False
+            else:
+                # Yalnızca (since, after_id) sonrasında değişen sorular ve silinme kayıtları okunur
+                questions, deleted, cursor, last_id, has_more = fetch_question_changes(
+                    db, since, limit, view, after_id)
+    except Exception as e:
+        print(f"Error syncing questions: {e}")
+        return jsonify({'error': f'Failed to sync questions: {str(e)}'}), 500
+
+    payload = {
+        'since': since,
+        'version': cursor,
+        'afterId': last_id,
+        'full': since == 0,
+        'hasMore': has_more,
+        'count': len(questions),
+        'questions': questions,
+        'deleted': deleted
+    }
+    if output_format == 'compact':
+        # Tekrarlanan alan adları, kategoriler ve etiketler bir kez yazılır
+        with stage('serialize'):
+            body = compact_codec.encode(payload)
+        return Response(body, mimetype=compact_codec.MIMETYPE)
+    return jsonify(payload)
+
+@api.route('/questions/<question_id>', methods=['DELETE'])
+def delete_question(question_id):
+    services = current_services()
+    db = services.get_db()
+    if db is None:
+        return jsonify({'error': 'Firebase not initialized'}), 500
+
+    # Silme, /questions/sync istemcilerine bildirilmek üzere bir silinme kaydıyla birlikte yazılır
+    try:
+        with stage('firestore_write'):
+            deleted = delete_questions(db, [question_id])
+    except Exception as e:
+        print(f"Error deleting question: {e}")
+        return jsonify({'error': f'Failed to delete question: {str(e)}'}), 500
+
+    services.question_cache.invalidate()
+    services.question_sampler.remove_questions(deleted)
+    services.duplicate_detector.remove_questions(deleted)
+    return jsonify({'status': 'success', 'deleted': deleted})
+
+@api.route('/questions/cache', methods=['GET'])
+def get_question_cache_stats():
+    services = current_services()
+    # Önbellek isabet/ıska/atılma sayaçları (ayar için)
+    return jsonify(services.question_cache.stats())
+
+@api.route('/questions/cache', methods=['DELETE'])
+def invalidate_question_cache():
+    services = current_services()
+    removed = services.question_cache.invalidate()
+    return jsonify({'status': 'success', 'removed': removed})
+
+@api.route('/get_questions', methods=['GET'])
+def get_questions():
+    services = current_services()
+    db = services.get_db()
+    if db is None:
+        return jsonify({'error': 'Firebase not initialized'}), 500
+
+    try:
+        params = parse_page_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if params.pop('format') == 'ndjson':
+        return stream_questions_response(db, params)
+
+    try:
+        # Sayfalı okuma: sadece bir sayfa doküman belleğe alınır, sonuç önbelleğe yazılır
+        with stage('firestore_read'):
+            questions, next_cursor = services.question_cache.get_page(db, params)
 
         return jsonify({
             'status': 'success',
-            'message': f'{len(added_questions)} questions added',
-            'questions': added_questions
+            'count': len(questions),
+            'questions': questions,
+            'next_cursor': next_cursor
         })
 
     except Exception as e:
-        print(f"Error adding questions: {e}")
-        return jsonify({'error': f'Failed to add questions: {str(e)}'}), 500
+        print(f"Error getting questions: {e}")
+        return jsonify({'error': f'Failed to get questions: {str(e)}'}), 500
 
-@app.route('/get_questions', methods=['GET'])
-def get_questions():
+@api.route('/async/get_questions', methods=['GET'])
+async def get_questions_async():
+    services = current_services()
+    db = services.get_async_db()
     if db is None:
         return jsonify({'error': 'Firebase not initialized'}), 500
 
     try:
-        questions_ref = db.collection('questions')
-        docs = questions_ref.stream()
+        params = parse_page_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if params.pop('format') == 'ndjson':
+        return jsonify({'error': 'format=ndjson is only supported by /get_questions'}), 400
+
+    ids = [question_id.strip() for question_id in request.args.get('ids', '').split(',')
+           if question_id.strip()]
+    if len(ids) > MAX_QUESTION_IDS:
+        return jsonify({'error': f'At most {MAX_QUESTION_IDS} ids per request'}), 400
 
-        questions = []
-        for doc in docs:
-            question_data = doc.to_dict()
-            question_data['id'] = doc.id
-            questions.append(question_data)
+    try:
+        if ids:
+            # Kimlik listesi get_all parçalarına bölünür, parçalar eşzamanlı okunur
+            with stage('firestore_read'):
+                questions, missing = await get_questions_by_ids(
+                    db, ids, params['view'], params['fields'])
+            return jsonify({
+                'status': 'success',
+                'count': len(questions),
+                'questions': questions,
+                'missing': missing
+            })
 
+        with stage('firestore_read'):
+            questions, next_cursor = await services.question_cache.get_page_async(db, params)
         return jsonify({
             'status': 'success',
             'count': len(questions),
-            'questions': questions
+            'questions': questions,
+            'next_cursor': next_cursor
         })
 
     except Exception as e:
         print(f"Error getting questions: {e}")
         return jsonify({'error': f'Failed to get questions: {str(e)}'}), 500
 
+def stream_questions_response(db, params):
+    # Tüm soru bankası tek seferde belleğe alınmadan, doküman doküman gönderilir
+    questions = stream_questions(
+        db, params['category'], params['difficulty'], params['view'], params['fields'],
+        params['cursor'])
+    # Ayrıştırılmış kalite değeri kullanılır: 'gzip;q=0' sıkıştırmayı reddeder, '*' kabul eder
+    compress = (request.args.get('gzip', '').lower() in ('1', 'true')
+                or request.accept_encodings['gzip'] > 0)
+
+    def generate():
+        try:
+            yield from encode_ndjson(questions, compress)
+        except Exception as e:
+            print(f"Error streaming questions: {e}")
+
+    response = Response(generate(), mimetype='application/x-ndjson')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# Geriye dönük uyumluluk: `from ai_api import app` ve serve.py varsayılan ayarlı uygulamayı kullanır
+app = create_app()
+
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get('PORT', 5001))
+    services = current_services(app)
+    services.model_store.get_model()
+    services.model_store.start_background_refit(int(os.environ.get('MODEL_REFIT_INTERVAL', 300)))
+    services.friend_store.get_graph()
+    services.friend_store.start_background_refresh(
+        int(os.environ.get('FRIEND_GRAPH_REFRESH_INTERVAL', 600)))
+    services.leaderboard_store.get_board()
+    services.leaderboard_store.start_background_snapshots(
+        int(os.environ.get('LEADERBOARD_SNAPSHOT_INTERVAL', 60)))
+    if services.get_db() is not None:
+        services.question_cache.watch(services.db)
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,163 @@
+"""
+Precomputed per-user behaviour analytics for the /analyze endpoint
+"""
+
+import threading
+from collections import Counter
+
+PREFERRED_CATEGORY_COUNT = 2
+
+# Toplam deneme sayısına göre katılım seviyesi eşikleri
+ENGAGEMENT_LEVELS = [(10, "Yüksek"), (3, "Orta"), (0, "Düşük")]
+
+
+def engagement_level(attempts):
+    for threshold, level in ENGAGEMENT_LEVELS:
+        if attempts >= threshold:
+            return level
+    return ENGAGEMENT_LEVELS[-1][1]
+
+
+class UserAggregate:
+    """Bir kullanıcının artımlı güncellenen özet değerleri."""
+
+    __slots__ = ("attempts", "rating_sum", "time_spent", "categories", "last_active")
+
+    def __init__(self, attempts=0, rating_sum=0.0, time_spent=0.0, categories=None,
+                 last_active=None):
+        self.attempts = attempts
+        self.rating_sum = rating_sum
+        self.time_spent = time_spent
+        self.categories = categories if categories is not None else Counter()
+        self.last_active = last_active
+
+    def add(self, rating, time_spent, category, timestamp):
+        self.attempts += 1
+        self.rating_sum += rating
+        self.time_spent += time_spent
+        self.categories[category] += 1
+        if timestamp and (self.last_active is None or timestamp > self.last_active):
+            self.last_active = timestamp
+
+    def to_dict(self, user_id):
+        preferred = sorted(self.categories.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "userId": user_id,
+            "preferredCategories": [category for category, _ in preferred[:PREFERRED_CATEGORY_COUNT]],
+            "avgScore": round(self.rating_sum / self.attempts, 2) if self.attempts else 0.0,
+            "engagementLevel": engagement_level(self.attempts),
+            "timeSpent": f"{round(self.time_spent / 60)} dakika",
+            "lastActive": self.last_active,
+            "quizCount": self.attempts,
+        }
+
+
+def columns_frame(parts, quiz_category):
+    # RatingColumns parçalarından aynı DataFrame; kimlikler ve kategoriler kodlardan dizinlenir
+    import numpy as np
+    import pandas as pd
+
+    user_ids = np.asarray(parts[-1].user_mapping.ids, dtype=object)
+    quiz_ids = np.asarray(parts[-1].quiz_mapping.ids, dtype=object)
+    categories = np.asarray([quiz_category(quiz_id) for quiz_id in quiz_ids], dtype=object)
+    user_codes, quiz_codes, ratings, time_spent, timestamps = (
+        np.concatenate([getattr(part, name) for part in parts])
+        for name in ('user_codes', 'quiz_codes', 'ratings', 'time_spent', 'timestamps'))
+    return pd.DataFrame({
+        "user_id": user_ids[user_codes],
+        "quiz_id": quiz_ids[quiz_codes],
+        "rating": ratings,
+        "timestamp": np.datetime_as_string(timestamps, unit='s'),
+        "time_spent": time_spent,
+        "category": categories[quiz_codes],
+    }).replace({"timestamp": {"NaT": None}})
+
+
+def history_frame(history, quiz_category):
+    # user_quiz_data biçimindeki geçmişi tek bir DataFrame'e düzleştir
+    import pandas as pd
+
+    records = [
+        (user_id, quiz["quiz_id"], quiz["rating"], quiz.get("timestamp"), quiz.get("time_spent", 0))
+        for user_id, quizzes in history.items()
+        for quiz in quizzes
+    ]
+    frame = pd.DataFrame.from_records(
+        records, columns=["user_id", "quiz_id", "rating", "timestamp", "time_spent"]
+    )
+    frame["category"] = frame["quiz_id"].map(quiz_category)
+    frame["time_spent"] = pd.to_numeric(frame["time_spent"], errors="coerce").fillna(0)
+    return frame
+
+
+def aggregate_history(history, quiz_category):
+    """
+    Tüm geçmişi vektörize group-by'larla kullanıcı başına özetlere çevirir. history,
+    user_quiz_data biçiminde bir sözlük ya da RatingColumns parçalarıdır (olay log'u).
+    """
+    if isinstance(history, dict):
+        if not any(history.values()):
+            return {}
+        frame = history_frame(history, quiz_category)
+    else:
+        if not sum(len(part) for part in history):
+            return {}
+        frame = columns_frame(history, quiz_category)
+
+    totals = frame.groupby("user_id").agg(
+        attempts=("rating", "size"),
+        rating_sum=("rating", "sum"),
+        time_spent=("time_spent", "sum"),
+        last_active=("timestamp", "max"),
+    )
+    category_counts = frame.groupby(["user_id", "category"]).size()
+
+    aggregates = {}
+    for user_id, row in totals.iterrows():
+        aggregates[user_id] = UserAggregate(
+            int(row.attempts), float(row.rating_sum), float(row.time_spent),
+            last_active=row.last_active if isinstance(row.last_active, str) else None,
+        )
+    for (user_id, category), count in category_counts.items():
+        aggregates[user_id].categories[category] = int(count)
+    return aggregates
+
+
+class AnalyticsStore:
+    """
+    Kullanıcı analizlerini önceden hesaplanmış tabloda tutar.
+
+    İlk kullanımda tüm geçmiş toplu olarak özetlenir; sonraki olaylar add_events ile
+    artımlı işlenir, böylece /analyze her istekte sözlükten O(1) okuma yapar.
+    """
+
+    def __init__(self, load_history, quiz_category):
+        self._load_history = load_history
+        self._quiz_category = quiz_category
+        self._lock = threading.Lock()
+        self._aggregates = None
+
+    def _ensure_built(self):
+        if self._aggregates is None:
+            with self._lock:
+                if self._aggregates is None:
+                    self._aggregates = aggregate_history(self._load_history(), self._quiz_category)
+
+    def build(self):
+        self._ensure_built()
+
+    def add_events(self, user_id, events):
+        self._ensure_built()
+        with self._lock:
+            aggregate = self._aggregates.setdefault(user_id, UserAggregate())
+            for event in events:
+                aggregate.add(
+                    event["rating"], event.get("time_spent", 0) or 0,
+                    self._quiz_category(event["quiz_id"]), event.get("timestamp"),
+                )
+
+    def get(self, user_id):
+        self._ensure_built()
+        with self._lock:
+            aggregate = self._aggregates.get(user_id)
+            return (aggregate or UserAggregate()).to_dict(user_id)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Question import benchmark: per-document writes vs. batched (thread pool / asyncio) writes
+"""
+
+import argparse
+import asyncio
+import time
+
+from fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
+from question_store import QUESTIONS_COLLECTION, write_questions, write_questions_async
+
+
+def sample_question(i):
+    return {
+        "text": f"Örnek soru {i}",
+        "options": [{"text": "A", "score": 10, "feedback": "Doğru!"},
+                    {"text": "B", "score": 0, "feedback": "Yanlış."}],
+        "category": "Genel",
+        "difficulty": "easy",
+        "timeLimit": 30,
+        "tags": ["örnek"],
+    }
+
+
+def sequential_import(db, questions):
+    # Eski yol: soru başına bir doc_ref.set() çağrısı
+    for question in questions:
+        db.collection(QUESTIONS_COLLECTION).document().set(question)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /add_questions write strategies")
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="simulated round-trip latency per RPC")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    questions = [sample_question(i) for i in range(args.questions)]
+    print(f"📊 {args.questions:,} questions, {args.latency_ms:.0f}ms simulated RPC latency")
+
+    db = FakeFirestoreClient(latency=args.latency_ms / 1000)
+    start = time.perf_counter()
+    sequential_import(db, questions)
+    print(f"  sequential set(): {db.round_trips:5d} round trips, {time.perf_counter() - start:.2f}s")
+
+    db = FakeFirestoreClient(latency=args.latency_ms / 1000)
+    start = time.perf_counter()
+    results = write_questions(db, questions, max_workers=args.workers)
+    failed = sum(result["status"] != "success" for result in results)
+    print(f"  batched writes  : {db.round_trips:5d} round trips, {time.perf_counter() - start:.2f}s "
+          f"({failed} failed)")
+
+    db = FakeAsyncFirestoreClient(latency=args.latency_ms / 1000)
+    start = time.perf_counter()
+    results = asyncio.run(write_questions_async(db, questions, max_concurrency=args.workers))
+    failed = sum(result["status"] != "success" for result in results)
+    print(f"  async batched   : {db.round_trips:5d} round trips, {time.perf_counter() - start:.2f}s "
+          f"({failed} failed)")
+
+
+if __name__ == "__main__":
+    main()
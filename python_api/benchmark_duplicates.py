@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate question index benchmark on a synthetic question bank
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from duplicates import DuplicateIndex
+
+SYLLABLES = ['ka', 'ra', 'bon', 'son', 'de', 'niz', 'ağ', 'aç', 'gü', 'neş', 'su', 'ha',
+             'va', 'ye', 'şil', 'ör', 'man', 'top', 'rak', 'ık', 'lı', 'ci', 'ler', 'dır']
+
+
+def make_bank(rng, size, duplicate_rate):
+    vocabulary = np.array([''.join(rng.choice(SYLLABLES, rng.integers(2, 5))) for _ in range(5000)])
+
+    def words(count):
+        return ' '.join(vocabulary[rng.integers(0, len(vocabulary), count)])
+
+    questions = []
+    planted = []
+    for i in range(size):
+        if questions and rng.random() < duplicate_rate:
+            # Var olan bir sorunun kopyası: bir kelime değişir, seçenekler karışır
+            source = int(rng.integers(0, len(questions)))
+            original = questions[source]
+            tokens = original['text'].split()
+            tokens[int(rng.integers(0, len(tokens)))] = str(vocabulary[rng.integers(0, len(vocabulary))])
+            options = [dict(option) for option in original['options']]
+            rng.shuffle(options)
+            questions.append({'text': ' '.join(tokens).capitalize() + '?', 'options': options})
+            planted.append((source, i))
+        else:
+            questions.append({'text': words(int(rng.integers(8, 15))) + '?',
+                              'options': [{'text': words(int(rng.integers(1, 4)))} for _ in range(4)]})
+    return questions, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate question detection")
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.02)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    bank, planted = make_bank(rng, args.questions, args.duplicate_rate)
+    new_questions, _ = make_bank(rng, args.queries, 0)
+
+    index = DuplicateIndex(threshold=args.threshold)
+    start = time.perf_counter()
+    signatures, valid = index.signatures(bank)
+    sign_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index.add_many([str(i) for i in np.flatnonzero(valid)], signatures[valid])
+    build_time = time.perf_counter() - start
+
+    # Sorgu: LSH adayları ile tüm imzaların doğrusal taraması karşılaştırılır
+    queries = [signatures[i] for i in rng.integers(0, len(bank), args.queries)]
+    lsh, linear = [], []
+    found = expected = 0
+    for signature in queries:
+        start = time.perf_counter()
+        matches = {question_id for question_id, _ in index.query(signature)}
+        lsh.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        similarity = (signatures == signature).mean(axis=1)
+        exact = {str(i) for i in np.flatnonzero(similarity >= args.threshold)}
+        linear.append(time.perf_counter() - start)
+        found += len(matches & exact)
+        expected += len(exact)
+
+    # Yeni soruların eklenmesi (imza + sorgu + indekse ekleme)
+    start = time.perf_counter()
+    new_signatures, new_valid = index.signatures(new_questions)
+    for i, signature in enumerate(new_signatures):
+        index.query(signature)
+        index.add(f'new{i}', signature)
+    insert_time = (time.perf_counter() - start) / len(new_questions)
+
+    start = time.perf_counter()
+    groups = index.duplicate_groups()
+    report_time = time.perf_counter() - start
+    grouped = {}
+    for number, group in enumerate(groups):
+        for question_id in group['questionIds']:
+            grouped[question_id] = number
+    caught = sum(str(a) in grouped and grouped.get(str(a)) == grouped.get(str(b))
+                 for a, b in planted)
+
+    lsh_p50, lsh_p99 = np.percentile(np.array(lsh) * 1000, [50, 99])
+    linear_p50, linear_p99 = np.percentile(np.array(linear) * 1000, [50, 99])
+    print(f"📊 {args.questions:,} questions, {len(planted):,} planted near-duplicates, "
+          f"threshold {args.threshold}")
+    print(f"  signing {sign_time:.2f}s ({sign_time / args.questions * 1e6:.0f}µs/question)  "
+          f"index build {build_time:.2f}s")
+    print(f"  lsh query    p50 {lsh_p50:.3f}ms  p99 {lsh_p99:.3f}ms")
+    print(f"  linear scan  p50 {linear_p50:.3f}ms  p99 {linear_p99:.3f}ms")
+    print(f"  lsh recall vs linear scan: {found / max(expected, 1):.3f}")
+    print(f"  insert (sign + check + add): {insert_time * 1000:.3f}ms/question")
+    print(f"  report {report_time:.2f}s, {len(groups):,} groups, "
+          f"planted pairs caught {caught / max(len(planted), 1):.3f}")
+
+
+if __name__ == "__main__":
+    main()
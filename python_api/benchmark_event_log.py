@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: replaying the full event log vs. mmap snapshot + log tail
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from event_log import EventLog
+from recommender import columns_to_csr
+
+
+def synthetic_batches(n_events, n_users, n_quizzes, batch_size=10000, seed=42):
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_events, batch_size):
+        size = min(batch_size, n_events - start)
+        users = rng.integers(0, n_users, size).tolist()
+        quizzes = rng.integers(0, n_quizzes, size).tolist()
+        ratings = rng.integers(1, 6, size).tolist()
+        yield [
+            (f"user{user}", [{"quiz_id": f"quiz{quiz}", "rating": rating,
+                              "timestamp": "2025-01-15T10:00:00", "time_spent": 60}])
+            for user, quiz, rating in zip(users, quizzes, ratings)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recommender cold start from the event log")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=10_000, help="events appended after the snapshot")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--quizzes", type=int, default=5_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log = EventLog(directory)
+        for batch in synthetic_batches(args.events, args.users, args.quizzes):
+            log.append(batch)
+
+        start = time.perf_counter()
+        EventLog(directory).load()
+        replay_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log.compact()
+        compact_seconds = time.perf_counter() - start
+        for batch in synthetic_batches(args.tail, args.users, args.quizzes, seed=7):
+            log.append(batch)
+        log.close()
+
+        start = time.perf_counter()
+        columns = EventLog(directory).load()
+        snapshot_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns.to_history()
+        history_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns_to_csr(EventLog(directory).load_history())
+        csr_seconds = time.perf_counter() - start
+
+    print(f"📊 {args.events:,} events (+{args.tail:,} tail)")
+    print(f"  full log replay        : {replay_seconds:.2f}s")
+    print(f"  compaction             : {compact_seconds:.2f}s")
+    print(f"  mmap snapshot + tail   : {snapshot_seconds:.2f}s")
+    print(f"  columns -> history dict: {history_seconds:.2f}s")
+    print(f"  mmap parts -> CSR      : {csr_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Similar-quiz index latency benchmark for the KarbonSon recommender
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from item_index import ExactItemIndex, IVFItemIndex
+
+
+def measure(index, queries, k):
+    latencies = []
+    for item_idx in queries:
+        start = time.perf_counter()
+        index.search(item_idx, k)
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(np.array(latencies) * 1000, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark similar-quiz lookups")
+    parser.add_argument("--quizzes", type=int, default=100_000)
+    parser.add_argument("--factors", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(500, args.factors))
+    factors = centers[rng.integers(0, len(centers), args.quizzes)]
+    factors += rng.normal(scale=0.3, size=factors.shape)
+    queries = rng.integers(0, args.quizzes, args.queries)
+
+    start = time.perf_counter()
+    exact = ExactItemIndex(factors)
+    exact_build = time.perf_counter() - start
+    start = time.perf_counter()
+    ivf = IVFItemIndex(factors)
+    ivf_build = time.perf_counter() - start
+
+    recall = np.mean([
+        len(set(ivf.search(q, args.k)[0]) & set(exact.search(q, args.k)[0])) / args.k
+        for q in queries[:200]
+    ])
+
+    print(f"📊 {args.quizzes:,} quizzes, {args.factors} factors, k={args.k}")
+    for name, index, build in [("exact", exact, exact_build), ("ivf", ivf, ivf_build)]:
+        p50, p99 = measure(index, queries, args.k)
+        print(f"  {name:5s} build {build:.3f}s  p50 {p50:.3f}ms  p99 {p99:.3f}ms")
+    print(f"  ivf recall@{args.k} vs exact: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Leaderboard benchmark: build, incremental updates, rank/page lookups and snapshot reload
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from leaderboard import Leaderboard
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-memory leaderboards")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # Skorlar çarpık dağılır: çoğu kullanıcı düşük, az sayıda kullanıcı yüksek puanlı
+    quiz_counts = rng.zipf(1.6, args.users).clip(max=100_000).tolist()
+    users = {f'user{i}': {'quizCount': score, 'nickname': f'Oyuncu {i}'}
+             for i, score in enumerate(quiz_counts)}
+    user_ids = list(users)
+
+    start = time.perf_counter()
+    board = Leaderboard.from_users(users, metrics=('quizCount',))
+    build_time = time.perf_counter() - start
+
+    events = [{'userId': user_ids[i], 'metric': 'quizCount', 'delta': 1}
+              for i in rng.integers(0, args.users, args.updates)]
+    start = time.perf_counter()
+    board.apply(events)
+    update_time = (time.perf_counter() - start) / args.updates
+
+    rank_times, page_times = [], []
+    for i, offset in zip(rng.integers(0, args.users, args.lookups),
+                         rng.integers(0, args.users, args.lookups)):
+        start = time.perf_counter()
+        board.rank('quizCount', user_ids[i])
+        rank_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        board.page('quizCount', int(offset), 50)
+        page_times.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'leaderboard')
+        start = time.perf_counter()
+        board.save(directory)
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        restored = Leaderboard.load(directory)
+        load_time = time.perf_counter() - start
+        assert restored.page('quizCount', 0, 50) == board.page('quizCount', 0, 50)
+
+    rank_p50, rank_p99 = np.percentile(np.array(rank_times) * 1e6, [50, 99])
+    page_p50, page_p99 = np.percentile(np.array(page_times) * 1e6, [50, 99])
+    print(f"📊 {args.users:,} users, {args.updates:,} score events")
+    print(f"  build from users (sort) {build_time:.2f}s")
+    print(f"  update {update_time * 1e6:.1f}µs/event")
+    print(f"  rank      p50 {rank_p50:.1f}µs  p99 {rank_p99:.1f}µs")
+    print(f"  page(50)  p50 {page_p50:.1f}µs  p99 {page_p99:.1f}µs")
+    print(f"  snapshot save {save_time:.2f}s  load {load_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
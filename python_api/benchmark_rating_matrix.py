@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Rating matrix build benchmark for the KarbonSon recommender
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from recommender import build_rating_matrix, ratings_to_csr
+
+
+def synthetic_history(n_ratings, n_users, n_quizzes, seed=42):
+    rng = np.random.default_rng(seed)
+    users = rng.integers(0, n_users, n_ratings)
+    quizzes = rng.integers(0, n_quizzes, n_ratings)
+    ratings = rng.integers(1, 6, n_ratings)
+
+    history = {}
+    for user, quiz, rating in zip(users.tolist(), quizzes.tolist(), ratings.tolist()):
+        history.setdefault(f"user{user}", []).append({"quiz_id": f"quiz{quiz}", "rating": rating})
+    return history, (users, quizzes, ratings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sparse rating matrix build")
+    parser.add_argument("--ratings", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--quizzes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    history, (users, quizzes, ratings) = synthetic_history(args.ratings, args.users, args.quizzes)
+
+    # Sözlük geçmişinden (API yolu) CSR oluşturma
+    start = time.perf_counter()
+    matrix, user_mapping, quiz_mapping = build_rating_matrix(history)
+    history_seconds = time.perf_counter() - start
+
+    # Hazır COO dizilerinden CSR oluşturma
+    start = time.perf_counter()
+    ratings_to_csr(users, quizzes, ratings, (args.users, args.quizzes))
+    coo_seconds = time.perf_counter() - start
+
+    sparse_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    dense_bytes = matrix.shape[0] * matrix.shape[1] * np.dtype(np.float64).itemsize
+
+    print(f"📊 {args.ratings:,} ratings, {len(user_mapping):,} users x {len(quiz_mapping):,} quizzes")
+    print(f"  build from history : {history_seconds:.3f}s")
+    print(f"  build from COO     : {coo_seconds:.3f}s")
+    print(f"  CSR memory         : {sparse_bytes / 1e6:.1f} MB ({matrix.nnz:,} stored ratings)")
+    print(f"  dense np.zeros     : {dense_bytes / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: `python -X importtime` profile of importing the AI API
+
+Exits non-zero when importing the module pulls in one of the heavy, lazily
+loaded dependencies or takes longer than --max-ms, so it can run in CI.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Bu modüller ilk kullanan istekte yüklenmeli, içe aktarma sırasında değil
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'firebase_admin', 'google.cloud.firestore')
+
+
+def import_profile(module='ai_api', python=sys.executable):
+    """
+    Modülü yeni bir yorumlayıcıda içe aktarır ve -X importtime çıktısını ayrıştırır.
+
+    {modül_adı: kümülatif_mikrosaniye} döndürür.
+    """
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def heavy_imports(profile):
+    return sorted(
+        name for name in profile
+        if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AI API import time")
+    parser.add_argument("--module", default="ai_api")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="fail when the median import time exceeds this budget")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    timings = [profile[args.module] / 1000 for profile in profiles]
+    median_ms = statistics.median(timings)
+    print(f"import {args.module}: median {median_ms:.1f} ms, "
+          f"min {min(timings):.1f} ms over {args.repeat} runs")
+
+    print("slowest imports (cumulative):")
+    slowest = sorted(profiles[-1].items(), key=lambda item: -item[1])
+    for name, cumulative in [item for item in slowest if item[0] != args.module][:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    heavy = heavy_imports(profiles[-1])
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"FAIL: median import time {median_ms:.1f} ms exceeds {args.max_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Compact binary encoding for question sync payloads
+
+A JSON-compatible value is written as a string table followed by a tagged value
+tree. Every distinct string (field names, categories, tags, texts) is stored once
+and referenced by its position, so fields repeated across documents cost one or
+two bytes each:
+
+    b'KSC1' | varint(string count) | (varint(byte length) utf-8)* | value
+
+Value tags: 0 null, 1 false, 2 true, 3 integer (zigzag varint), 4 float (8-byte
+big-endian double), 5 string (varint table position), 6 array (varint length +
+values), 7 object (varint length + (varint key position, value)*).
+"""
+
+import struct
+
+MAGIC = b'KSC1'
+MIMETYPE = 'application/vnd.karbonson.compact'
+
+NULL, FALSE, TRUE, INTEGER, FLOAT, STRING, ARRAY, OBJECT = range(8)
+_DOUBLE = struct.Struct('>d')
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    # Negatif sayılar küçük pozitiflere eşlenir: 0, -1, 1, -2 -> 0, 1, 2, 3
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def encode(value):
+    """JSON uyumlu değeri kompakt ikili biçime çevirir; bilinmeyen tipler str() ile yazılır."""
+    strings = {}
+    body = bytearray()
+
+    def intern(text):
+        position = strings.get(text)
+        if position is None:
+            position = strings[text] = len(strings)
+        _write_varint(body, position)
+
+    def write(item):
+        if item is None:
+            body.append(NULL)
+        elif item is True or item is False:
+            body.append(TRUE if item else FALSE)
+        elif isinstance(item, int):
+            body.append(INTEGER)
+            _write_varint(body, _zigzag(item))
+        elif isinstance(item, float):
+            body.append(FLOAT)
+            body.extend(_DOUBLE.pack(item))
+        elif isinstance(item, dict):
+            body.append(OBJECT)
+            _write_varint(body, len(item))
+            for key, child in item.items():
+                intern(str(key))
+                write(child)
+        elif isinstance(item, (list, tuple)):
+            body.append(ARRAY)
+            _write_varint(body, len(item))
+            for child in item:
+                write(child)
+        else:
+            body.append(STRING)
+            intern(item if isinstance(item, str) else str(item))
+
+    write(value)
+
+    out = bytearray(MAGIC)
+    _write_varint(out, len(strings))
+    for text in strings:
+        encoded = text.encode('utf-8')
+        _write_varint(out, len(encoded))
+        out.extend(encoded)
+    out.extend(body)
+    return bytes(out)
+
+
+def decode(data):
+    """encode() çıktısını çözer (istemci kodlayıcıları için referans uygulama)."""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a compact payload')
+    position = len(MAGIC)
+
+    def read_varint():
+        nonlocal position
+        value = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    strings = []
+    for _ in range(read_varint()):
+        length = read_varint()
+        strings.append(data[position:position + length].decode('utf-8'))
+        position += length
+
+    def read():
+        nonlocal position
+        tag = data[position]
+        position += 1
+        if tag == NULL:
+            return None
+        if tag in (FALSE, TRUE):
+            return tag == TRUE
+        if tag == INTEGER:
+            value = read_varint()
+            return value >> 1 if not value & 1 else -((value + 1) >> 1)
+        if tag == FLOAT:
+            value = _DOUBLE.unpack_from(data, position)[0]
+            position += _DOUBLE.size
+            return value
+        if tag == STRING:
+            return strings[read_varint()]
+        if tag == ARRAY:
+            return [read() for _ in range(read_varint())]
+        if tag == OBJECT:
+            return {strings[read_varint()]: read() for _ in range(read_varint())}
+        raise ValueError(f'Unknown value tag {tag}')
+
+    return read()
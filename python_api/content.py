@@ -0,0 +1,142 @@
+"""
+Content-based quiz features and category popularity for hybrid / cold-start recommendations
+"""
+
+import zlib
+
+import numpy as np
+
+TAG_HASH_DIM = 256
+DEFAULT_CATEGORY = "Genel"
+
+
+def quiz_category(meta):
+    return meta.get("category", DEFAULT_CATEGORY)
+
+
+def quiz_difficulty(meta):
+    # Eski kayıtlarda zorluk "zorluk" anahtarıyla tutuluyor
+    return meta.get("difficulty") or meta.get("zorluk")
+
+
+def tag_bucket(tag):
+    # hash() süreçler arasında rastgele tohumlanır; crc32 her işçide aynı kovayı verir
+    return zlib.crc32(tag.strip().lower().encode("utf-8")) % TAG_HASH_DIM
+
+
+def normalize_sparse_rows(matrix):
+    from scipy.sparse import csr_matrix
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    return csr_matrix(matrix.multiply(1.0 / norms[:, None]))
+
+
+class ContentModel:
+    """
+    Quiz kataloğu için seyrek içerik özellikleri ve popülerlik sıralamaları.
+
+    features: (quiz, özellik) CSR matrisi — kategori ve zorluk one-hot, etiketler
+    TAG_HASH_DIM kovaya hash'lenir; satırlar L2 normalizedir. Katalog, faktör
+    modelinin quiz eşlemesiyle başlar, bu yüzden SVD skorları katalog indekslerinin
+    önekine hizalıdır.
+    """
+
+    def __init__(self, quiz_ids, categories, features, popularity):
+        self.quiz_ids = quiz_ids
+        self.quiz_index = {quiz_id: idx for idx, quiz_id in enumerate(quiz_ids)}
+        self.categories = categories
+        self.features = features
+        self.popularity = popularity
+        # Soğuk başlangıç için kategori başına önceden sıralanmış quiz indeksleri
+        order = np.argsort(-popularity, kind="stable")
+        self.popular_order = order
+        self.category_order = {
+            category: order[categories[order] == category] for category in np.unique(categories)
+        }
+
+    def __len__(self):
+        return len(self.quiz_ids)
+
+    def encode_history(self, histories):
+        """Kullanıcı geçmişlerinden (kullanıcı, quiz) seyrek puan matrisi (katalog dışı quizler atlanır)."""
+        from scipy.sparse import csr_matrix
+
+        rows, cols, ratings = [], [], []
+        for row, history in enumerate(histories):
+            for quiz in history:
+                idx = self.quiz_index.get(quiz["quiz_id"])
+                if idx is not None:
+                    rows.append(row)
+                    cols.append(idx)
+                    ratings.append(quiz["rating"])
+        # Tekrar oynanan quizlerin puanları toplanır; profilde ağırlıkları artar
+        return csr_matrix((np.asarray(ratings, dtype=np.float64), (rows, cols)),
+                          shape=(len(histories), len(self)))
+
+    def scores(self, rated):
+        """
+        İçerik benzerliği skorları: kullanıcı profili p = r·F (puan ağırlıklı özellik
+        toplamı, normalize), skorlar F·pᵀ — kullanıcı başına bir seyrek matris-vektör çarpımı.
+        (kullanıcı, quiz) float32 yoğun dizi döner; seyrek ara sonuç kurulmaz.
+        """
+        profiles = normalize_sparse_rows(rated @ self.features).toarray().astype(np.float32)
+        return (self.features @ profiles.T).T
+
+    def cold_start(self, k, allowed_categories=None):
+        """Geçmişi olmayan kullanıcılar için popülerliğe göre ilk k quiz indeksi."""
+        if not allowed_categories:
+            return self.popular_order[:k]
+        candidates = [self.category_order[category][:k] for category in allowed_categories
+                      if category in self.category_order]
+        if not candidates:
+            return np.array([], dtype=np.intp)
+        candidates = np.concatenate(candidates)
+        return candidates[np.argsort(-self.popularity[candidates], kind="stable")][:k]
+
+
+def build_content_model(quiz_mapping, quiz_metadata, ratings):
+    """
+    quiz_mapping: faktör modelinin quiz eşlemesi (kopyalanır, meta verideki yeni
+    quizler sona eklenir); ratings: modelin (kullanıcı, quiz) CSR puan matrisi.
+    """
+    from scipy.sparse import csr_matrix
+
+    catalog = quiz_mapping.copy()
+    for quiz_id in quiz_metadata:
+        catalog.add(quiz_id)
+    quiz_ids = list(catalog.ids)
+    metas = [quiz_metadata.get(quiz_id, {}) for quiz_id in quiz_ids]
+
+    categories = np.array([quiz_category(meta) for meta in metas], dtype=object)
+    difficulties = [quiz_difficulty(meta) for meta in metas]
+    category_values = sorted(set(categories.tolist()))
+    difficulty_values = sorted({value for value in difficulties if value})
+    category_column = {value: idx for idx, value in enumerate(category_values)}
+    difficulty_column = {value: len(category_values) + idx
+                         for idx, value in enumerate(difficulty_values)}
+    tag_offset = len(category_values) + len(difficulty_values)
+
+    rows, cols = [], []
+    for row, (meta, category, difficulty) in enumerate(zip(metas, categories, difficulties)):
+        rows.append(row)
+        cols.append(category_column[category])
+        if difficulty:
+            rows.append(row)
+            cols.append(difficulty_column[difficulty])
+        for tag in set(meta.get("tags", [])):
+            rows.append(row)
+            cols.append(tag_offset + tag_bucket(tag))
+    features = csr_matrix((np.ones(len(rows)), (rows, cols)),
+                          shape=(len(quiz_ids), tag_offset + TAG_HASH_DIM))
+    # Çakışan etiket kovaları toplanır; satırlar kosinüs benzerliği için normalize edilir
+    features = normalize_sparse_rows(features).astype(np.float32)
+
+    # Popülerlik: oynanma sayısı + ortalama puan (eşitlikleri bozar), puanlanmamış quizler 0
+    popularity = np.zeros(len(quiz_ids))
+    if ratings.shape[1]:
+        counts = np.diff(ratings.tocsc().indptr).astype(np.float64)
+        sums = np.asarray(ratings.sum(axis=0)).ravel()
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        popularity[:ratings.shape[1]] = counts + means / 10.0
+    return ContentModel(quiz_ids, categories, features, popularity)
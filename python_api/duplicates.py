@@ -0,0 +1,359 @@
+"""
+MinHash / LSH index for near-duplicate question detection
+"""
+
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.7
+# Yeni eklenen imzalar sıralı band dizilerine bu sayıya ulaşınca birleştirilir
+MERGE_EVERY = 4096
+# Çok kalabalık kovalarda (ör. aynı şablon metin) tüm çiftler yerine ilk üyeyle eşlenir
+MAX_BUCKET_PAIRS = 64
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    # Türkçe büyük I/İ harfleri lower()'dan önce doğru küçük harfe çevrilir
+    text = unicodedata.normalize('NFKC', str(text or ''))
+    text = text.replace('İ', 'i').replace('I', 'ı').lower()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def question_text(question):
+    """Soru metni + seçenek metinleri (sıradan bağımsız) tek bir normalize metin olarak."""
+    options = sorted(
+        normalize_text(option.get('text')) for option in question.get('options', []) or []
+        if isinstance(option, dict) and option.get('text')
+    )
+    return ' | '.join([normalize_text(question.get('text'))] + options).strip(' |')
+
+
+class DuplicateIndex:
+    """
+    Soru metinlerinin MinHash imzaları ve LSH band tabloları.
+
+    İmzalar NUM_PERM adet 32 bitlik min-hash değeridir; her biri BANDS banda bölünür
+    ve her bandın özeti bir anahtar olur. Aynı bantta anahtarı eşleşen sorular
+    adaydır, adaylar imzalardan tahmin edilen Jaccard benzerliğiyle doğrulanır; sorgu
+    maliyeti banka boyutuyla değil, eşleşen kova boyutlarıyla orantılıdır.
+
+    Band tabloları sıralı NumPy dizileridir (searchsorted); son eklenenler küçük bir
+    sıralanmamış kuyrukta vektörize karşılaştırılır ve MERGE_EVERY eklemede bir
+    sıralı dizilere katılır.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=DEFAULT_THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be divisible by bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.seed = seed
+        # Aynı tohum aynı hash ailesini verir; süreçler ve geçici indeksler arasında imzalar karşılaştırılabilir
+        rng = np.random.default_rng(seed)
+        # Permütasyonlar 32 bitlik afin dönüşümler: h(x) = a·x + b mod 2^32, a tek sayı.
+        # Girdiler zaten karıştırılmış shingle hash'leri olduğundan tahmin 64 bitlik
+        # çarp-kaydır ailesi kadar isabetli, hesap ~6 kat hızlıdır
+        self._a = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64).astype(np.uint32)
+        self._shingle_weights = rng.integers(1, 1 << 62, SHINGLE_SIZE, dtype=np.uint64) | np.uint64(1)
+        self._band_weights = rng.integers(1, 1 << 62, self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self.ids = []
+        self.ordinals = {}
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._keys = np.zeros((0, bands), dtype=np.uint64)
+        self._sorted_keys = np.zeros((bands, 0), dtype=np.uint64)
+        self._sorted_ordinals = np.zeros((bands, 0), dtype=np.int32)
+        self._merged = 0
+        self._lock = threading.Lock()
+
+    def spawn(self):
+        # Aynı hash ailesiyle boş bir indeks (toplu eklemede kendi içindeki tekrarlar için)
+        return DuplicateIndex(self.num_perm, self.bands, self.threshold, self.seed)
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def signatures(self, questions, chunk_size=512):
+        """
+        Soruların MinHash imzaları (n, num_perm) ve geçerlilik maskesi; metni olmayan
+        sorular maskede False olur. Bir parçadaki tüm metinler tek bir bayt dizisine
+        eklenir; shingle hash'leri ve min-hash'ler parça başına tek geçişte hesaplanır.
+        """
+        questions = list(questions)
+        result = np.zeros((len(questions), self.num_perm), dtype=np.uint32)
+        valid = np.zeros(len(questions), dtype=bool)
+        for start in range(0, len(questions), chunk_size):
+            encoded, rows = [], []
+            for row, question in enumerate(questions[start:start + chunk_size], start):
+                text = question_text(question) if isinstance(question, dict) else ''
+                if text:
+                    # Kısa metinler tek bir shingle olacak kadar doldurulur
+                    encoded.append(text.encode('utf-8').ljust(SHINGLE_SIZE, b'\0'))
+                    rows.append(row)
+            if not rows:
+                continue
+            lengths = np.array([len(data) for data in encoded])
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+            # Bayt 5-gramları tek bir matris çarpımıyla 32 bitlik hash'lere çevrilir;
+            # iki metnin sınırını aşan pencereler atılır
+            windows = np.lib.stride_tricks.sliding_window_view(data, SHINGLE_SIZE)
+            counts = lengths - SHINGLE_SIZE + 1
+            segment = np.repeat(np.arange(len(rows)), lengths)[:len(windows)]
+            inside = np.arange(len(windows)) - offsets[segment] < counts[segment]
+            shingles = ((windows[inside] @ self._shingle_weights) >> np.uint64(32)).astype(np.uint32)
+            hashed = self._a[:, None] * shingles[None, :]
+            hashed += self._b[:, None]
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            result[rows] = np.minimum.reduceat(hashed, starts, axis=1).T
+            valid[rows] = True
+        return result, valid
+
+    def signature(self, question):
+        """Sorunun MinHash imzası; metni olmayan sorular için None."""
+        signatures, valid = self.signatures([question])
+        return signatures[0] if valid[0] else None
+
+    def band_keys(self, signatures):
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return bands @ self._band_weights
+
+    def _reserve(self, needed):
+        if needed > len(self._signatures):
+            capacity = max(1024, 2 * len(self._signatures), needed)
+            self._signatures = _grow(self._signatures, capacity)
+            self._keys = _grow(self._keys, capacity)
+
+    def add(self, question_id, signature):
+        if signature is None or question_id in self.ordinals:
+            return False
+        with self._lock:
+            ordinal = len(self.ids)
+            self._reserve(ordinal + 1)
+            self._signatures[ordinal] = signature
+            self._keys[ordinal] = self.band_keys(signature[None, :])[0]
+            self.ids.append(question_id)
+            self.ordinals[question_id] = ordinal
+            if ordinal + 1 - self._merged >= MERGE_EVERY:
+                self._merge()
+        return True
+
+    def add_many(self, question_ids, signatures):
+        """İlk yükleme için toplu ekleme: band anahtarları tek geçişte, tablolar bir kez sıralanır."""
+        with self._lock:
+            rows = []
+            for row, question_id in enumerate(question_ids):
+                if question_id not in self.ordinals:
+                    self.ordinals[question_id] = len(self.ids)
+                    self.ids.append(question_id)
+                    rows.append(row)
+            count = len(self.ids)
+            start = count - len(rows)
+            self._reserve(count)
+            self._signatures[start:count] = signatures[rows]
+            self._keys[start:count] = self.band_keys(signatures[rows])
+            self._merge()
+        return len(rows)
+
+    def remove(self, question_id):
+        # Satır yerinde kalır; kimliği None olan ordinaller sorgu ve raporlarda atlanır
+        with self._lock:
+            ordinal = self.ordinals.pop(question_id, None)
+            if ordinal is None:
+                return False
+            self.ids[ordinal] = None
+        return True
+
+    def _merge(self):
+        count = len(self.ids)
+        keys = self._keys[:count].T
+        order = np.argsort(keys, axis=1, kind='stable')
+        self._sorted_keys = np.take_along_axis(keys, order, axis=1)
+        self._sorted_ordinals = order.astype(np.int32)
+        self._merged = count
+
+    def candidates(self, signature):
+        keys = self.band_keys(signature[None, :])[0]
+        sorted_keys, sorted_ordinals, merged = self._sorted_keys, self._sorted_ordinals, self._merged
+        found = []
+        for band, key in enumerate(keys):
+            lo = np.searchsorted(sorted_keys[band], key, 'left')
+            hi = np.searchsorted(sorted_keys[band], key, 'right')
+            if hi > lo:
+                found.append(sorted_ordinals[band, lo:hi])
+        # Henüz birleştirilmemiş son eklemeler
+        tail = self._keys[merged:len(self.ids)]
+        if len(tail):
+            found.append(merged + np.flatnonzero((tail == keys).any(axis=1)))
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def query(self, signature, threshold=None, exclude=None):
+        """Benzerliği eşiği geçen kayıtlar, azalan benzerlikle: [(question_id, benzerlik)]."""
+        if signature is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        # Eklemeler dizileri büyütebilir; aday listesi ve imzalar aynı anlık görüntüden okunur
+        with self._lock:
+            candidates = self.candidates(signature)
+            if not len(candidates):
+                return []
+            similarity = (self._signatures[candidates] == signature).mean(axis=1)
+            ids = [self.ids[ordinal] for ordinal in candidates.tolist()]
+        keep = np.flatnonzero(similarity >= threshold)
+        matches = sorted(((similarity[i], ids[i]) for i in keep.tolist()), key=lambda item: -item[0])
+        return [(question_id, round(float(score), 3)) for score, question_id in matches
+                if question_id is not None and question_id != exclude]
+
+    def duplicate_groups(self, threshold=None):
+        """
+        Tüm bankadaki yakın kopya kümeleri: aynı band kovasındaki çiftler doğrulanır ve
+        union-find ile birleştirilir. [{"questionIds": [...], "maxSimilarity": s}]
+
+        Aday üretimi LSH'ye dayandığından ~0.5'in altındaki eşiklerde bazı çiftler
+        kaçırılabilir (32 band x 4 satır: benzerlik 0.5 için yakalanma olasılığı ~%87).
+        """
+        threshold = self.threshold if threshold is None else threshold
+        # Rapor uzun sürebilir; kilit yalnızca anlık görüntü alınırken tutulur
+        with self._lock:
+            self._merge()
+            ids = list(self.ids)
+            signatures = self._signatures
+            sorted_keys, sorted_ordinals = self._sorted_keys, self._sorted_ordinals
+        pairs = [np.zeros((0, 2), dtype=np.int32)]
+        for band in range(self.bands):
+            keys, ordinals = sorted_keys[band], sorted_ordinals[band]
+            if len(keys) < 2:
+                continue
+            # Eşit anahtarlı ardışık koşular = kovalar; iki üyeli kovalar vektörize eşlenir
+            boundaries = np.flatnonzero(np.diff(keys)) + 1
+            starts = np.concatenate([[0], boundaries])
+            sizes = np.diff(np.concatenate([starts, [len(keys)]]))
+            pair_starts = starts[sizes == 2]
+            pairs.append(np.stack([ordinals[pair_starts], ordinals[pair_starts + 1]], axis=1))
+            for start, size in zip(starts[sizes > 2].tolist(), sizes[sizes > 2].tolist()):
+                members = ordinals[start:start + size]
+                if len(members) <= MAX_BUCKET_PAIRS:
+                    left, right = np.triu_indices(len(members), 1)
+                    pairs.append(np.stack([members[left], members[right]], axis=1))
+                else:
+                    pairs.append(np.stack([np.repeat(members[0], len(members) - 1), members[1:]],
+                                          axis=1))
+        pairs = np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        alive = np.array([question_id is not None for question_id in ids], dtype=bool)
+        keep = (similarity >= threshold) & alive[pairs[:, 0]] & alive[pairs[:, 1]]
+        pairs, similarity = pairs[keep], similarity[keep]
+
+        parent = list(range(len(ids)))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for left, right in pairs.tolist():
+            root_left, root_right = find(left), find(right)
+            if root_left != root_right:
+                parent[max(root_left, root_right)] = min(root_left, root_right)
+
+        groups = {}
+        for (left, _), score in zip(pairs.tolist(), similarity.tolist()):
+            group = groups.setdefault(find(left), {'members': set(), 'maxSimilarity': 0.0})
+            group['maxSimilarity'] = max(group['maxSimilarity'], score)
+        for left, right in pairs.tolist():
+            groups[find(left)]['members'].update((left, right))
+        report = [
+            {'questionIds': [ids[ordinal] for ordinal in sorted(group['members'])],
+             'maxSimilarity': round(group['maxSimilarity'], 3)}
+            for _, group in sorted(groups.items())
+        ]
+        # En kalabalık kümeler önce
+        report.sort(key=lambda group: (-len(group['questionIds']), -group['maxSimilarity']))
+        return report
+
+
+def _grow(array, capacity):
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class DuplicateDetector:
+    """
+    Soru bankasının yakın kopya indeksi; ilk kullanımda banka yüklenir, sonra her
+    eklemede güncellenir.
+    """
+
+    def __init__(self, load_questions, threshold=DEFAULT_THRESHOLD):
+        self._load_questions = load_questions
+        self.threshold = threshold
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get_index(self):
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    index = DuplicateIndex(threshold=self.threshold)
+                    questions = [question for question in self._load_questions()
+                                 if question.get('id')]
+                    signatures, valid = index.signatures(questions)
+                    index.add_many([question['id'] for question, ok in zip(questions, valid) if ok],
+                                   signatures[valid])
+                    self._index = index
+                index = self._index
+        return index
+
+    def check_batch(self, questions):
+        """
+        Her soru için yakın kopyaları döndürür: bankadakiler {"id", "similarity"}, aynı
+        istekte daha önce gelenler {"index", "similarity"} olarak.
+        """
+        index = self.get_index()
+        batch = index.spawn()
+        signatures, valid = index.signatures(questions)
+        matches = []
+        for position in range(len(signatures)):
+            signature = signatures[position] if valid[position] else None
+            found = [{'id': question_id, 'similarity': similarity}
+                     for question_id, similarity in index.query(signature)]
+            found += [{'index': int(batch_id), 'similarity': similarity}
+                      for batch_id, similarity in batch.query(signature)]
+            batch.add(str(position), signature)
+            matches.append(found)
+        return matches
+
+    def add_questions(self, questions):
+        # İndeks henüz yüklenmediyse yeni sorular ilk yüklemede zaten okunur
+        index = self._index
+        if index is None:
+            return 0
+        signatures, valid = index.signatures(questions)
+        return sum(index.add(question['id'], signatures[row])
+                   for row, question in enumerate(questions) if valid[row])
+
+    def remove_questions(self, question_ids):
+        index = self._index
+        if index is None:
+            return 0
+        return sum(index.remove(question_id) for question_id in question_ids)
+
+    def duplicate_groups(self, threshold=None):
+        return self.get_index().duplicate_groups(threshold)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation and benchmark harness for the recommender
+
+Generates synthetic ratings with power-law quiz popularity and user activity,
+splits them on the `timestamp` field, trains through ModelStore and scores
+through ai_api.generate_recommendations, then prints one JSON document with
+fit time, per-request latency percentiles, batch throughput, peak memory and
+precision@k / recall@k (plus a popularity baseline) for each scale.
+
+    python evaluate_recommender.py --ratings 10000,100000,1000000 --output run.json
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+CATEGORIES = ["Coğrafya", "Tarih", "Matematik", "Bilim", "Edebiyat", "Spor", "Sanat", "Teknoloji"]
+DIFFICULTIES = ["Kolay", "Orta", "Zor"]
+START_TIME = datetime(2025, 1, 1)
+
+
+def power_law_probabilities(n, exponent, rng):
+    # Zipf benzeri dağılım; sıralar karıştırılır, popülerlik kimlik numarasıyla ilişkili olmaz
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def synthetic_ratings(n_ratings, n_users, n_quizzes, exponent=1.1, n_latent=8, days=90, seed=42):
+    """
+    Gizli faktör yapısı olan sentetik puanlar üretir.
+
+    (user_quiz_data biçiminde geçmiş, quiz_metadata) döndürür; quiz kategorisi gizli
+    faktörlerden türetilir, böylece içerik özellikleri de sinyal taşır.
+    """
+    rng = np.random.default_rng(seed)
+    users = rng.choice(n_users, n_ratings, p=power_law_probabilities(n_users, exponent, rng))
+    quizzes = rng.choice(n_quizzes, n_ratings, p=power_law_probabilities(n_quizzes, exponent, rng))
+
+    user_factors = rng.normal(size=(n_users, n_latent))
+    quiz_factors = rng.normal(size=(n_quizzes, n_latent))
+    affinity = np.einsum('ij,ij->i', user_factors[users], quiz_factors[quizzes]) / np.sqrt(n_latent)
+    ratings = np.clip(np.rint(3 + 1.5 * affinity + rng.normal(scale=0.5, size=n_ratings)), 1, 5)
+
+    seconds = np.sort(rng.integers(0, days * 86400, n_ratings))
+    timestamps = np.datetime_as_string(
+        np.datetime64(START_TIME, 's') + seconds.astype('timedelta64[s]'), unit='s')
+
+    history = {}
+    for user, quiz, rating, timestamp in zip(users.tolist(), quizzes.tolist(), ratings.tolist(),
+                                             timestamps.tolist()):
+        history.setdefault(f"user{user}", []).append(
+            {"quiz_id": f"quiz{quiz}", "rating": int(rating), "timestamp": timestamp})
+
+    dominant = np.argmax(quiz_factors, axis=1)
+    metadata = {
+        f"quiz{quiz}": {
+            "title": f"Quiz {quiz}",
+            "category": CATEGORIES[dominant[quiz] % len(CATEGORIES)],
+            "difficulty": DIFFICULTIES[quiz % len(DIFFICULTIES)],
+            "tags": [f"konu{dominant[quiz]}", f"alt{np.argsort(quiz_factors[quiz])[-2]}"],
+        }
+        for quiz in range(n_quizzes)
+    }
+    return history, metadata
+
+
+def temporal_split(history, test_fraction=0.2):
+    """
+    Geçmişi timestamp alanına göre böler: en yeni test_fraction kadar puan test kümesidir.
+
+    Zaman damgası olmayan puanlar eğitimde kalır. ISO 8601 dizgeleri sözlük sırasıyla
+    karşılaştırılır.
+    """
+    timestamps = sorted(quiz["timestamp"] for quizzes in history.values() for quiz in quizzes
+                        if quiz.get("timestamp"))
+    if not timestamps:
+        return history, {}
+    cutoff = timestamps[min(int(len(timestamps) * (1 - test_fraction)), len(timestamps) - 1)]
+
+    train, test = {}, {}
+    for user_id, quizzes in history.items():
+        for quiz in quizzes:
+            target = test if quiz.get("timestamp") and quiz["timestamp"] >= cutoff else train
+            target.setdefault(user_id, []).append(quiz)
+    return train, test
+
+
+def precision_recall_at_k(recommended, relevant, k):
+    hits = len(set(recommended[:k]) & relevant)
+    return hits / k, hits / len(relevant)
+
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms)
+    return {
+        "p50": float(np.percentile(samples, 50)),
+        "p90": float(np.percentile(samples, 90)),
+        "p99": float(np.percentile(samples, 99)),
+        "mean": float(samples.mean()),
+    }
+
+
+def peak_rss_mb():
+    # Linux'ta ru_maxrss kilobayt cinsindendir
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def evaluate(n_ratings, args):
+    import ai_api
+    from recommender import ModelStore
+    from trainers import get_trainer
+
+    n_users = args.users or max(n_ratings // 20, 10)
+    n_quizzes = args.quizzes or max(n_ratings // 200, 10)
+    history, metadata = synthetic_ratings(n_ratings, n_users, n_quizzes, args.exponent,
+                                          seed=args.seed)
+    train, test = temporal_split(history, args.test_fraction)
+
+    # ai_api'nin öneri yolu sentetik veri üzerinde çalıştırılır
+    trainer = get_trainer(args.trainer, **({'n_jobs': args.jobs} if args.trainer == 'als' else {}))
+    store = ModelStore(lambda: train, n_components=args.n_components, trainer=trainer)
+    services = ai_api.current_services(ai_api.create_app())
+    services.model_store = store
+    services.quiz_metadata = metadata
+
+    start = time.perf_counter()
+    model = store.get_model()
+    fit_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed)
+    train_users = list(train)
+    request_users = rng.choice(train_users, min(args.requests, len(train_users)), replace=False)
+    ai_api.generate_recommendations(services, request_users[0], args.k)  # içerik modeli ısınması
+    latencies = []
+    for user_id in request_users:
+        start = time.perf_counter()
+        ai_api.generate_recommendations(services, user_id, args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    batch_users = train_users[:args.batch_users]
+    start = time.perf_counter()
+    for offset in range(0, len(batch_users), ai_api.BATCH_CHUNK_SIZE):
+        ai_api.generate_recommendations_batch(
+            services, batch_users[offset:offset + ai_api.BATCH_CHUNK_SIZE], args.k)
+    batch_seconds = time.perf_counter() - start
+
+    # Eğitimde görülen ve testte en az bir beğendiği (rating >= eşik) quiz olan kullanıcılar
+    eval_users = [
+        user_id for user_id, quizzes in test.items()
+        if user_id in train and any(quiz["rating"] >= args.relevance for quiz in quizzes)
+    ]
+    eval_users = eval_users[:args.eval_users]
+    content = ai_api.content_model(services, model)
+    popular_ids = [content.quiz_ids[idx] for idx in content.cold_start(len(content))]
+    model_scores, popular_scores = [], []
+    for offset in range(0, len(eval_users), ai_api.BATCH_CHUNK_SIZE):
+        chunk = eval_users[offset:offset + ai_api.BATCH_CHUNK_SIZE]
+        batch = ai_api.generate_recommendations_batch(services, chunk, args.k)
+        for user_id, recommendations in zip(chunk, batch):
+            relevant = {quiz["quiz_id"] for quiz in test[user_id]
+                        if quiz["rating"] >= args.relevance}
+            seen = {quiz["quiz_id"] for quiz in train[user_id]}
+            model_scores.append(precision_recall_at_k(
+                [rec["quizId"] for rec in recommendations], relevant, args.k))
+            # Taban çizgi: kullanıcının görmediği en popüler k quiz
+            baseline = [quiz_id for quiz_id in popular_ids[:args.k + len(seen)]
+                        if quiz_id not in seen]
+            popular_scores.append(precision_recall_at_k(baseline, relevant, args.k))
+
+    def summary(scores):
+        if not scores:
+            return {"precisionAtK": None, "recallAtK": None}
+        precision, recall = np.mean(scores, axis=0)
+        return {"precisionAtK": float(precision), "recallAtK": float(recall)}
+
+    return {
+        "ratings": n_ratings,
+        "users": len(history),
+        "quizzes": n_quizzes,
+        "trainRatings": sum(len(quizzes) for quizzes in train.values()),
+        "testRatings": sum(len(quizzes) for quizzes in test.values()),
+        "trainer": args.trainer,
+        "nComponents": model.quiz_factors.shape[1],
+        "fitSeconds": fit_seconds,
+        "latencyMs": percentiles(latencies),
+        "batchUsersPerSecond": len(batch_users) / batch_seconds if batch_seconds else None,
+        "peakRssMb": peak_rss_mb(),
+        "evalUsers": len(eval_users),
+        **summary(model_scores),
+        "popularityBaseline": summary(popular_scores),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate and benchmark the recommender offline")
+    parser.add_argument("--ratings", default="10000,100000",
+                        help="comma separated rating counts, e.g. 10000,1000000,10000000")
+    parser.add_argument("--users", type=int, default=None, help="default: ratings / 20")
+    parser.add_argument("--quizzes", type=int, default=None, help="default: ratings / 200")
+    parser.add_argument("--exponent", type=float, default=1.1, help="power-law exponent")
+    parser.add_argument("--trainer", choices=("svd", "als"), default="svd")
+    parser.add_argument("--jobs", type=int, default=None, help="ALS worker threads (default: all cores)")
+    parser.add_argument("--n-components", type=int, default=5)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--relevance", type=float, default=4, help="minimum relevant rating")
+    parser.add_argument("--requests", type=int, default=500, help="single-user latency samples")
+    parser.add_argument("--batch-users", type=int, default=10000)
+    parser.add_argument("--eval-users", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Kütüphane içe aktarma süresi ilk ölçeğin eğitim süresine eklenmesin
+    import scipy.sparse  # noqa: F401
+    import sklearn.utils.extmath  # noqa: F401
+
+    report = {
+        "startedAt": datetime.now().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": [evaluate(int(n_ratings), args) for n_ratings in args.ratings.split(",")],
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Append-only on-disk log of rating events with compacted columnar snapshots
+
+Layout of the log directory:
+
+    events-000001.log      length-prefixed records (uint32 length, uint32 crc32, JSON)
+    snapshot/              last compacted state as .npy columns + ids.json/meta.json
+
+A snapshot covers every segment older than meta["segment"]; startup memory-maps
+the snapshot columns and replays only the newer segments. load_history() hands
+the mapped snapshot and the replayed tail to consumers as separate column parts,
+so the snapshot is neither copied nor turned into per-event dicts.
+"""
+
+import json
+import os
+import shutil
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from recommender import IdMapping
+
+_HEADER = struct.Struct('<II')
+SNAPSHOT_DIR = 'snapshot'
+COLUMNS = ('user_codes', 'quiz_codes', 'ratings', 'time_spent', 'timestamps')
+
+
+def _segment_name(segment):
+    return f'events-{segment:06d}.log'
+
+
+def encode_record(user_id, event):
+    payload = json.dumps({
+        'u': user_id,
+        'q': event['quiz_id'],
+        'r': event['rating'],
+        't': event.get('timestamp'),
+        's': event.get('time_spent', 0),
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path):
+    """
+    Segmentteki kayıtları sırayla okur.
+
+    Yarım yazılmış ya da CRC'si tutmayan bir kayıtta durur (çökme sonrası kuyruk);
+    (geçerli_bayt_sayısı, kayıtlar) döndürür.
+    """
+    records = []
+    valid_bytes = 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    while valid_bytes + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, valid_bytes)
+        start = valid_bytes + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(json.loads(payload))
+        valid_bytes = start + length
+    return valid_bytes, records
+
+
+class RatingColumns:
+    """Sütunlu puan geçmişi: kod dizileri + kararlı kimlik eşlemeleri."""
+
+    def __init__(self, user_mapping, quiz_mapping, user_codes, quiz_codes, ratings, time_spent,
+                 timestamps):
+        self.user_mapping = user_mapping
+        self.quiz_mapping = quiz_mapping
+        self.user_codes = user_codes
+        self.quiz_codes = quiz_codes
+        self.ratings = ratings
+        self.time_spent = time_spent
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.user_codes)
+
+    @classmethod
+    def empty(cls):
+        return cls(IdMapping(), IdMapping(), np.zeros(0, np.int32), np.zeros(0, np.int32),
+                   np.zeros(0, np.float32), np.zeros(0, np.float32),
+                   np.zeros(0, 'datetime64[s]'))
+
+    def tail(self, records):
+        """
+        Yalnızca records'u içeren sütunlar; eşlemeler bu sütunlarınkinin kopyası olarak
+        genişletilir, böylece bu sütunların kodları yeni eşlemelerde de geçerlidir.
+        """
+        import pandas as pd
+
+        user_mapping = self.user_mapping.copy()
+        quiz_mapping = self.quiz_mapping.copy()
+        timestamps = pd.to_datetime([record['t'] for record in records], errors='coerce', utc=True,
+                                    format='ISO8601')
+        return RatingColumns(
+            user_mapping, quiz_mapping,
+            user_mapping.encode(r['u'] for r in records),
+            quiz_mapping.encode(r['q'] for r in records),
+            np.array([r['r'] for r in records], np.float32),
+            np.array([r['s'] or 0 for r in records], np.float32),
+            timestamps.tz_localize(None).to_numpy().astype('datetime64[s]'),
+        )
+
+    def extend(self, records):
+        # Log kuyruğundaki kayıtları sütunlara ekle (yeni diziler oluşturulur)
+        if not records:
+            return self
+        tail = self.tail(records)
+        return RatingColumns(
+            tail.user_mapping, tail.quiz_mapping,
+            *(np.concatenate([getattr(self, name), getattr(tail, name)]) for name in COLUMNS),
+        )
+
+    def to_history(self):
+        """user_quiz_data biçimine dönüştürür (kullanıcı başına zaman sıralı liste)."""
+        history = {}
+        if not len(self):
+            return history
+        order = np.argsort(self.user_codes, kind='stable')
+        timestamps = np.datetime_as_string(self.timestamps[order], unit='s')
+        quiz_ids = self.quiz_mapping.ids
+        user_ids = self.user_mapping.ids
+        boundaries = np.flatnonzero(np.diff(self.user_codes[order])) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(order)]])
+        quiz_codes = self.quiz_codes[order].tolist()
+        ratings = self.ratings[order].tolist()
+        time_spent = self.time_spent[order].tolist()
+        user_codes = self.user_codes[order]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            history[user_ids[user_codes[start]]] = [
+                {
+                    'quiz_id': quiz_ids[quiz_codes[i]],
+                    'rating': ratings[i],
+                    'timestamp': None if timestamps[i] == 'NaT' else timestamps[i],
+                    'time_spent': time_spent[i],
+                }
+                for i in range(start, end)
+            ]
+        return history
+
+
+class EventLog:
+    """
+    Puan olayları için yalnızca-ekleme log'u.
+
+    append() kayıtları aktif segmentin sonuna yazar; compact() aktif segmenti
+    döndürür, eski segmentleri son anlık görüntüyle birleştirip yeni .npy
+    sütunlarını atomik olarak yazar ve eski segmentleri siler.
+    """
+
+    def __init__(self, directory, fsync=False):
+        self.directory = directory
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._recover_snapshot()
+        meta = self._read_meta()
+        segments = self._segments()
+        self._segment = max(segments + [meta.get('segment', 1)])
+        self.tail_records = 0
+        self._file = None
+
+    @property
+    def _snapshot_path(self):
+        return os.path.join(self.directory, SNAPSHOT_DIR)
+
+    def _recover_snapshot(self):
+        # compact() yer değiştirme sırasında kesildiyse önceki anlık görüntüyü geri getir
+        old_path = self._snapshot_path + '.old'
+        if os.path.exists(old_path) and not os.path.exists(self._snapshot_path):
+            os.rename(old_path, self._snapshot_path)
+        shutil.rmtree(self._snapshot_path + '.tmp', ignore_errors=True)
+
+    def _read_meta(self):
+        path = os.path.join(self._snapshot_path, 'meta.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _segments(self):
+        return sorted(
+            int(name[len('events-'):-len('.log')])
+            for name in os.listdir(self.directory)
+            if name.startswith('events-') and name.endswith('.log')
+        )
+
+    def _open_segment(self):
+        if self._file is None:
+            path = os.path.join(self.directory, _segment_name(self._segment))
+            if os.path.exists(path):
+                # Çökme sonrası yarım kalmış son kaydı kes
+                valid_bytes, records = read_records(path)
+                if valid_bytes != os.path.getsize(path):
+                    with open(path, 'r+b') as f:
+                        f.truncate(valid_bytes)
+                self.tail_records = max(self.tail_records, len(records))
+            self._file = open(path, 'ab')
+        return self._file
+
+    def append(self, batch):
+        # batch: [(user_id, [olay, ...]), ...] — ingestion kuyruğunun parti biçimi
+        data = b''.join(
+            encode_record(user_id, event) for user_id, events in batch for event in events
+        )
+        if not data:
+            return
+        with self._lock:
+            f = self._open_segment()
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self.tail_records += sum(len(events) for _, events in batch)
+
+    def _load_snapshot(self, mmap=True):
+        meta = self._read_meta()
+        if not meta:
+            return RatingColumns.empty(), 1
+        with open(os.path.join(self._snapshot_path, 'ids.json'), encoding='utf-8') as f:
+            ids = json.load(f)
+        columns = [
+            np.load(os.path.join(self._snapshot_path, f'{name}.npy'),
+                    mmap_mode='r' if mmap else None)
+            for name in COLUMNS
+        ]
+        return (RatingColumns(IdMapping(ids['users']), IdMapping(ids['quizzes']), *columns),
+                meta['segment'])
+
+    def _load_parts(self):
+        with self._lock:
+            columns, first_segment = self._load_snapshot()
+            segments = [segment for segment in self._segments() if segment >= first_segment]
+            tail = []
+            for segment in segments:
+                tail.extend(read_records(os.path.join(self.directory, _segment_name(segment)))[1])
+        return columns, tail
+
+    def load(self):
+        """Son anlık görüntüyü mmap ile açar ve yalnızca sonraki segmentleri oynatır."""
+        columns, tail = self._load_parts()
+        return columns.extend(tail)
+
+    def load_history(self):
+        """
+        Geçmişi sütun parçaları olarak döndürür: mmap'li anlık görüntü ve (varsa) log
+        kuyruğu. Son parçanın eşlemeleri öncekilerin kodlarını da kapsar.
+        """
+        columns, tail = self._load_parts()
+        return (columns, columns.tail(tail)) if tail else (columns,)
+
+    def is_empty(self):
+        return not self._read_meta() and not any(
+            os.path.getsize(os.path.join(self.directory, _segment_name(segment)))
+            for segment in self._segments())
+
+    def compact(self):
+        with self._lock:
+            # Yeni eklemeler yeni segmente gider; eski segmentler anlık görüntüye katılır
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            covered = [segment for segment in self._segments() if segment <= self._segment]
+            self._segment += 1
+            self.tail_records = 0
+            next_segment = self._segment
+
+        columns, first_segment = self._load_snapshot(mmap=False)
+        tail = []
+        for segment in covered:
+            if segment >= first_segment:
+                tail.extend(read_records(os.path.join(self.directory, _segment_name(segment)))[1])
+        columns = columns.extend(tail)
+
+        tmp_path = self._snapshot_path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in COLUMNS:
+            np.save(os.path.join(tmp_path, f'{name}.npy'), np.asarray(getattr(columns, name)))
+        with open(os.path.join(tmp_path, 'ids.json'), 'w', encoding='utf-8') as f:
+            json.dump({'users': columns.user_mapping.ids, 'quizzes': columns.quiz_mapping.ids},
+                      f, ensure_ascii=False)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'segment': next_segment, 'records': len(columns)}, f)
+
+        # Eski anlık görüntüyü atomik olarak değiştir, kapsanan segmentleri sil
+        old_path = self._snapshot_path + '.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self._snapshot_path):
+            os.rename(self._snapshot_path, old_path)
+        os.rename(tmp_path, self._snapshot_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        for segment in covered:
+            os.remove(os.path.join(self.directory, _segment_name(segment)))
+        return len(columns)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,441 @@
+"""
+In-memory stand-in for the Firestore client used by tests and benchmarks
+
+Only the subset of the google-cloud-firestore API used by ai_api is implemented.
+Every RPC increments `round_trips` and every returned document increments
+`document_reads`, so callers can assert on billed reads and network calls.
+An optional per-RPC `latency` (seconds) simulates network round trips.
+
+FakeAsyncFirestoreClient exposes the same data through the AsyncClient API
+(awaitable get/set/commit, async stream/get_all) and sleeps with asyncio, so
+concurrent fan-out overlaps the simulated latency.
+"""
+
+import asyncio
+import copy
+import itertools
+import threading
+import time
+import uuid
+
+_OPERATORS = {
+    '==': lambda value, expected: value == expected,
+    '!=': lambda value, expected: value != expected,
+    '<': lambda value, expected: value is not None and value < expected,
+    '<=': lambda value, expected: value is not None and value <= expected,
+    '>': lambda value, expected: value is not None and value > expected,
+    '>=': lambda value, expected: value is not None and value >= expected,
+    'in': lambda value, expected: value in expected,
+    'array_contains': lambda value, expected: isinstance(value, list) and expected in value,
+}
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+        self.path = f"{collection.id}/{doc_id}"
+
+    def set(self, data, merge=False):
+        self._collection._client._rpc()
+        self._collection._write(self.id, data, merge)
+
+    def get(self):
+        self._collection._client._rpc(reads=1)
+        return FakeDocumentSnapshot(self, self._collection._read(self.id))
+
+    def delete(self):
+        self._collection._client._rpc()
+        self._collection._delete(self.id)
+
+
+class FakeQuery:
+    def __init__(self, collection, filters=(), order=None, cursor=None, limit=None,
+                 fields=None):
+        self._collection = collection
+        self._filters = list(filters)
+        self._order = order
+        self._cursor = cursor
+        self._limit = limit
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters, 'order': self._order, 'cursor': self._cursor,
+            'limit': self._limit, 'fields': self._fields,
+        }
+        state.update(changes)
+        return FakeQuery(self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        if field_path == '__name__' and self._order:
+            # Eşitlikler zaten belge kimliğine göre sıralanır
+            return self
+        return self._copy(order=(field_path, direction))
+
+    def start_after(self, values):
+        if isinstance(values, FakeDocumentSnapshot):
+            values = {'__name__': values.id}
+        return self._copy(cursor=values)
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def _sort_key(self, doc_id, data):
+        field = self._order[0] if self._order else '__name__'
+        if field == '__name__':
+            return doc_id
+        return (data.get(field), doc_id)
+
+    def _matches(self, data):
+        return all(
+            _OPERATORS[op](data.get(field), value) for field, op, value in self._filters
+        )
+
+    def stream(self):
+        self._collection._client._rpc()
+        yield from self._results()
+
+    def _results(self):
+        client = self._collection._client
+        ids = self._collection._ids()
+        field = self._order[0] if self._order else '__name__'
+        if field != '__name__':
+            # Firestore gibi: sıralama alanı olmayan dokümanlar sonuçta yer almaz
+            ids = [doc_id for doc_id in ids if field in self._collection._peek(doc_id)]
+        descending = bool(self._order) and self._order[1] == 'DESCENDING'
+
+        # Yalnızca kimlikler sıralanır; dokümanlar tüketildikçe tek tek okunur
+        keyed = sorted(
+            ids, key=lambda doc_id: self._sort_key(doc_id, self._collection._peek(doc_id)),
+            reverse=descending,
+        )
+        if self._cursor is not None:
+            # İmleç belge kimliği ya da (sıralama alanı, belge kimliği) çiftidir
+            if field == '__name__':
+                after = self._cursor['__name__']
+            else:
+                after = (self._cursor[field], self._cursor['__name__'])
+
+            def is_after(doc_id):
+                key = self._sort_key(doc_id, self._collection._peek(doc_id))
+                return key < after if descending else key > after
+
+            keyed = [doc_id for doc_id in keyed if is_after(doc_id)]
+
+        matching = (doc_id for doc_id in keyed if self._matches(self._collection._peek(doc_id)))
+        if self._limit is not None:
+            matching = itertools.islice(matching, self._limit)
+
+        for doc_id in matching:
+            data = self._collection._read(doc_id)
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            client._count_reads(1)
+            yield FakeDocumentSnapshot(self._collection.document(doc_id), data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, collection_id):
+        super().__init__(self)
+        self._client = client
+        self.id = collection_id
+
+    def _copy(self, **changes):
+        return FakeQuery(self, **{
+            'filters': [], 'order': None, 'cursor': None, 'limit': None, 'fields': None,
+            **changes,
+        })
+
+    def _docs(self):
+        return self._client._data.setdefault(self.id, {})
+
+    def _ids(self):
+        return list(self._docs())
+
+    def _peek(self, doc_id):
+        return self._docs().get(doc_id) or {}
+
+    def _read(self, doc_id):
+        data = self._docs().get(doc_id)
+        return copy.deepcopy(data) if data is not None else None
+
+    def _write(self, doc_id, data, merge=False):
+        docs = self._docs()
+        change_type = 'MODIFIED' if doc_id in docs else 'ADDED'
+        if merge and doc_id in docs:
+            docs[doc_id].update(copy.deepcopy(data))
+        else:
+            docs[doc_id] = copy.deepcopy(data)
+        self._client._notify(self, doc_id, change_type)
+
+    def _delete(self, doc_id):
+        if self._docs().pop(doc_id, None) is not None:
+            self._client._notify(self, doc_id, 'REMOVED')
+
+    def on_snapshot(self, callback):
+        # İlk çağrı mevcut dokümanlarla yapılır (gerçek Watch gibi)
+        listeners = self._client._listeners.setdefault(self.id, [])
+        listeners.append(callback)
+        callback([FakeDocumentSnapshot(self.document(doc_id), self._read(doc_id))
+                  for doc_id in self._ids()], [], None)
+        return FakeWatch(listeners, callback)
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self, doc_id or uuid.uuid4().hex[:20])
+
+
+class FakeDocumentChange:
+    def __init__(self, change_type, document):
+        self.type = change_type
+        self.document = document
+
+
+class FakeWatch:
+    def __init__(self, listeners, callback):
+        self._listeners = listeners
+        self._callback = callback
+
+    def unsubscribe(self):
+        if self._callback in self._listeners:
+            self._listeners.remove(self._callback)
+
+
+class FakeWriteBatch:
+    """WriteBatch gibi: yazmalar biriktirilir, commit tek RPC ve atomiktir."""
+
+    MAX_WRITES = 500
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, data, merge=False):
+        if len(self._writes) >= self.MAX_WRITES:
+            raise ValueError(f"A write batch can contain at most {self.MAX_WRITES} writes")
+        self._writes.append((reference, copy.deepcopy(data), merge))
+
+    def delete(self, reference):
+        # data None = silme
+        if len(self._writes) >= self.MAX_WRITES:
+            raise ValueError(f"A write batch can contain at most {self.MAX_WRITES} writes")
+        self._writes.append((reference, None, False))
+
+    def _apply(self):
+        for reference, data, merge in self._writes:
+            if data is None:
+                reference._collection._delete(reference.id)
+            else:
+                reference._collection._write(reference.id, data, merge)
+        writes, self._writes = self._writes, []
+        return writes
+
+    def commit(self):
+        self._client._rpc()
+        if self._client._take_failure():
+            raise RuntimeError("Simulated commit failure")
+        return self._apply()
+
+
+class FakeFirestoreClient:
+    def __init__(self, latency=0.0):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.latency = latency
+        self._listeners = {}
+        self.round_trips = 0
+        self.document_reads = 0
+        # Sonraki bu kadar batch commit'i hata verir (hata yolu testleri için)
+        self.fail_commits = 0
+
+    def _rpc(self, reads=0):
+        self._record_rpc(reads)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _record_rpc(self, reads=0):
+        with self._lock:
+            self.round_trips += 1
+            self.document_reads += reads
+
+    def _notify(self, collection, doc_id, change_type):
+        listeners = list(self._listeners.get(collection.id, []))
+        if not listeners:
+            return
+        snapshot = FakeDocumentSnapshot(collection.document(doc_id), collection._read(doc_id))
+        for callback in listeners:
+            callback([snapshot], [FakeDocumentChange(change_type, snapshot)], None)
+
+    def _take_failure(self):
+        with self._lock:
+            if self.fail_commits:
+                self.fail_commits -= 1
+                return True
+            return False
+
+    def _count_reads(self, count):
+        with self._lock:
+            self.document_reads += count
+
+    def collection(self, collection_id):
+        return FakeCollectionReference(self, collection_id)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.document_reads = 0
+
+
+class FakeAsyncDocumentReference:
+    def __init__(self, client, reference):
+        self._client = client
+        self._reference = reference
+        self.id = reference.id
+        self.path = reference.path
+
+    async def set(self, data, merge=False):
+        await self._client._rpc()
+        self._reference._collection._write(self.id, data, merge)
+
+    async def get(self):
+        await self._client._rpc(reads=1)
+        return FakeDocumentSnapshot(self._reference,
+                                    self._reference._collection._read(self.id))
+
+
+class FakeAsyncQuery:
+    def __init__(self, client, query):
+        self._client = client
+        self._query = query
+
+    def where(self, *args, **kwargs):
+        return FakeAsyncQuery(self._client, self._query.where(*args, **kwargs))
+
+    def order_by(self, *args, **kwargs):
+        return FakeAsyncQuery(self._client, self._query.order_by(*args, **kwargs))
+
+    def start_after(self, values):
+        return FakeAsyncQuery(self._client, self._query.start_after(values))
+
+    def limit(self, count):
+        return FakeAsyncQuery(self._client, self._query.limit(count))
+
+    def select(self, field_paths):
+        return FakeAsyncQuery(self._client, self._query.select(field_paths))
+
+    async def stream(self):
+        await self._client._rpc()
+        for snapshot in self._query._results():
+            yield snapshot
+
+    async def get(self):
+        return [snapshot async for snapshot in self.stream()]
+
+
+class FakeAsyncCollectionReference(FakeAsyncQuery):
+    def __init__(self, client, collection):
+        super().__init__(client, collection)
+        self.id = collection.id
+
+    def document(self, doc_id=None):
+        return FakeAsyncDocumentReference(self._client, self._query.document(doc_id))
+
+
+class FakeAsyncWriteBatch(FakeWriteBatch):
+    def set(self, reference, data, merge=False):
+        super().set(getattr(reference, '_reference', reference), data, merge)
+
+    def delete(self, reference):
+        super().delete(getattr(reference, '_reference', reference))
+
+    async def commit(self):
+        await self._client._rpc()
+        if self._client._backend._take_failure():
+            raise RuntimeError("Simulated commit failure")
+        return self._apply()
+
+
+class FakeAsyncFirestoreClient:
+    """
+    AsyncClient gibi davranan sahte istemci.
+
+    Veriyi ve sayaçları verilen FakeFirestoreClient ile paylaşır; böylece testler
+    senkron istemciyle veri ekleyip async yoldan okuyabilir.
+    """
+
+    def __init__(self, backend=None, latency=None):
+        self._backend = backend if backend is not None else FakeFirestoreClient()
+        self.latency = self._backend.latency if latency is None else latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def round_trips(self):
+        return self._backend.round_trips
+
+    @property
+    def document_reads(self):
+        return self._backend.document_reads
+
+    async def _rpc(self, reads=0):
+        self._backend._record_rpc(reads)
+        # Aynı anda bekleyen RPC sayısı: eşzamanlı fan-out'u doğrulamak için
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+    def collection(self, collection_id):
+        return FakeAsyncCollectionReference(self, self._backend.collection(collection_id))
+
+    async def get_all(self, references, field_paths=None):
+        # Tek RPC'de birden çok doküman; bulunmayanlar exists=False döner
+        references = list(references)
+        await self._rpc(reads=len(references))
+        for reference in references:
+            reference = getattr(reference, '_reference', reference)
+            data = reference._collection._read(reference.id)
+            if data is not None and field_paths is not None:
+                data = {field: data[field] for field in field_paths if field in data}
+            yield FakeDocumentSnapshot(reference, data)
+
+    def batch(self):
+        return FakeAsyncWriteBatch(self)
+
+    def reset_counters(self):
+        self._backend.reset_counters()
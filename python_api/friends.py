@@ -0,0 +1,329 @@
+"""
+Precomputed friend suggestions from the sparse friendship and co-play graphs
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from metrics import stage
+from recommender import IdMapping
+
+# Mobil istemcideki (friend_suggestion_service.dart) puanlamayla aynı ağırlıklar
+COMMON_FRIEND_SCORE = 10
+GAME_TOGETHER_SCORE = 5
+POPULAR_FRIEND_SCORE = 2
+POPULAR_WIN_SCORE = 3
+MAX_SUGGESTIONS = 50
+CO_PLAY_WINDOW_DAYS = 30
+# top_suggestions içindeki paketleme: ortak arkadaş sayısı üst bitlerde, oyun sayısı alt 24 bitte
+PACK_BASE = 1 << 24
+MASK_OFFSET = 1 << 52
+
+USERS_COLLECTION = 'users'
+FRIENDS_COLLECTION = 'friends'
+GAMES_COLLECTION = 'games'
+BLOCKED_COLLECTION = 'blocked'
+FRIEND_REQUESTS_COLLECTION = 'friend_requests'
+PROFILE_FIELDS = ['nickname', 'profilePictureUrl', 'totalWins']
+
+
+def pairs_to_csr(left, right, n_users):
+    """İndeks çiftlerinden simetrik, ikili (kullanıcı, kullanıcı) CSR matrisi; döngüler atlanır."""
+    from scipy.sparse import csr_matrix
+
+    keep = left != right
+    rows = np.concatenate([left[keep], right[keep]])
+    cols = np.concatenate([right[keep], left[keep]])
+    matrix = csr_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)),
+                        shape=(n_users, n_users))
+    # Aynı kenar iki yönden de kayıtlı olabilir; tekrarlar toplanır, sonra 1'e indirgenir
+    matrix.data[:] = 1
+    return matrix
+
+
+def co_play_matrix(game_rows, participants, n_games, n_users):
+    """
+    Birlikte oynanan oyun sayıları: oyun-katılımcı matrisi G için GᵀG, köşegen sıfır.
+    """
+    from scipy.sparse import csr_matrix
+
+    incidence = csr_matrix((np.ones(len(participants), dtype=np.int64),
+                            (game_rows, participants)), shape=(n_games, n_users))
+    incidence.data[:] = 1
+    together = (incidence.T @ incidence).tocoo()
+    off_diagonal = together.row != together.col
+    return csr_matrix((together.data[off_diagonal],
+                       (together.row[off_diagonal], together.col[off_diagonal])),
+                      shape=(n_users, n_users))
+
+
+class SocialGraph:
+    """
+    Arkadaşlık ve birlikte oynama graflarının ve kullanıcı başına hazır önerilerin
+    değişmez anlık görüntüsü.
+
+    Öneriler ragged dizilerde tutulur: kullanıcı i'nin adayları
+    candidates[indptr[i]:indptr[i + 1]], skora göre azalan sırada.
+    """
+
+    def __init__(self, version, built_at, mapping, profiles, friends, together, excluded,
+                 indptr, candidates, scores, common, games, popular):
+        self.version = version
+        self.built_at = built_at
+        self.mapping = mapping
+        self.profiles = profiles
+        self.friends = friends
+        self.together = together
+        self.excluded = excluded
+        self.indptr = indptr
+        self.candidates = candidates
+        self.scores = scores
+        self.common = common
+        self.games = games
+        self.popular = popular
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def _suggestion(self, idx, score, common, games, reason):
+        profile = self.profiles[idx]
+        return {
+            "userId": self.mapping.ids[idx],
+            "nickname": profile.get("nickname", ""),
+            "profilePictureUrl": profile.get("profilePictureUrl"),
+            "reason": reason,
+            "score": int(score),
+            "commonFriendsCount": int(common),
+            "totalGamesPlayed": int(games),
+        }
+
+    def suggest(self, user_id, k):
+        user_idx = self.mapping.get(user_id)
+        results = []
+        seen = set()
+        if user_idx is not None:
+            start, stop = self.indptr[user_idx], self.indptr[user_idx + 1]
+            for position in range(start, min(stop, start + k)):
+                common, games = self.common[position], self.games[position]
+                # Skorun büyük kısmı hangi sinyalden geliyorsa gerekçe odur
+                reason = ("commonFriends" if common * COMMON_FRIEND_SCORE >= games * GAME_TOGETHER_SCORE
+                          else "recentlyPlayed")
+                results.append(self._suggestion(self.candidates[position], self.scores[position],
+                                                common, games, reason))
+            seen.update(self.candidates[start:stop].tolist())
+            seen.update(self.friends.indices[self.friends.indptr[user_idx]:
+                                             self.friends.indptr[user_idx + 1]].tolist())
+            seen.update(self.excluded.indices[self.excluded.indptr[user_idx]:
+                                              self.excluded.indptr[user_idx + 1]].tolist())
+            seen.add(user_idx)
+
+        # Graf sinyali yetmezse (yeni kullanıcılar) popüler oyuncularla tamamlanır
+        for idx, score in self.popular:
+            if len(results) >= k:
+                break
+            if idx not in seen:
+                results.append(self._suggestion(idx, score, 0, 0, "popular"))
+        return results
+
+    def status(self):
+        return {
+            "graphVersion": self.version,
+            "builtAt": self.built_at.isoformat() if self.built_at else None,
+            "userCount": len(self),
+            "friendshipCount": int(self.friends.nnz // 2),
+            "coPlayPairCount": int(self.together.nnz // 2),
+            "suggestionCount": int(len(self.candidates)),
+        }
+
+
+def top_suggestions(common, together, masked, max_suggestions):
+    """
+    Bir kullanıcı parçası için skor = 10·ortak arkadaş + 5·birlikte oyun; dışlanan
+    hücreler (kendisi, arkadaşlar, engellenenler, bekleyen istekler) silinir ve her
+    satırın en iyi max_suggestions adayı tek bir sıralamayla seçilir.
+
+    İki sayaç tek bir int64 hücrede paketlenir (ortak << 24 | oyun), böylece seçilen
+    hücrelerin bileşenleri için ayrıca seyrek arama yapılmaz; maskelenen hücreler
+    büyük bir sabit çıkarılarak negatife düşer ve elenir.
+    """
+    packed = (common * PACK_BASE + together.minimum(PACK_BASE - 1) - masked * MASK_OFFSET).tocsr()
+    valid = packed.data > 0
+    rows = np.repeat(np.arange(packed.shape[0]), np.diff(packed.indptr))[valid]
+    cols = packed.indices[valid]
+    common_counts = packed.data[valid] // PACK_BASE
+    game_counts = packed.data[valid] % PACK_BASE
+    scores = COMMON_FRIEND_SCORE * common_counts + GAME_TOGETHER_SCORE * game_counts
+
+    # Satır artan, skor azalan, eşitlikte aday indeksi artan; anahtar int64'e sığmazsa lexsort
+    top_score = int(scores.max()) + 1 if len(scores) else 1
+    n_cols = packed.shape[1]
+    if packed.shape[0] * top_score * n_cols < 2 ** 63:
+        order = np.argsort((rows * top_score + (top_score - 1 - scores)) * n_cols + cols)
+    else:
+        order = np.lexsort((cols, -scores, rows))
+    rows = rows[order]
+    row_starts = np.searchsorted(rows, np.arange(packed.shape[0]))
+    keep = np.arange(len(rows)) - row_starts[rows] < max_suggestions
+    order = order[keep]
+    counts = np.bincount(rows[keep], minlength=packed.shape[0])
+    return counts, cols[order], scores[order], common_counts[order], game_counts[order]
+
+
+def encode_pairs(mapping, pairs):
+    pairs = list(pairs)
+    return (mapping.encode(a for a, _ in pairs), mapping.encode(b for _, b in pairs))
+
+
+def build_social_graph(data, version=1, max_suggestions=MAX_SUGGESTIONS, chunk_size=4096):
+    """
+    data: {"users": {user_id: profil}, "friendships": [(a, b)], "games": [[katılımcılar]],
+    "blocked": [(engelleyen, engellenen)], "pending": [(gönderen, alan)]}
+    """
+    from scipy.sparse import identity
+
+    users = data.get("users", {})
+    games = [list(dict.fromkeys(participants)) for participants in data.get("games", [])]
+    # Kimlikler bir kez tamsayıya çevrilir; yalnızca kenarlarda görülenler de eşlenir
+    mapping = IdMapping(users)
+    friend_pairs = encode_pairs(mapping, data.get("friendships", []))
+    hidden_pairs = encode_pairs(mapping, list(data.get("blocked", [])) + list(data.get("pending", [])))
+    game_rows = np.repeat(np.arange(len(games)), [len(participants) for participants in games])
+    participants = mapping.encode(user_id for players in games for user_id in players)
+    n_users = len(mapping)
+    profiles = [users.get(user_id, {}) for user_id in mapping.ids]
+
+    with stage('friend_graph_build'):
+        friends = pairs_to_csr(*friend_pairs, n_users)
+        together = co_play_matrix(game_rows, participants, len(games), n_users)
+        excluded = pairs_to_csr(*hidden_pairs, n_users)
+        # Kendisi, arkadaşlar, engellenenler ve bekleyen istekler aday olamaz
+        masked = friends + excluded + identity(n_users, dtype=np.int64, format='csr')
+
+    indptr = np.zeros(n_users + 1, dtype=np.int64)
+    parts = []
+    with stage('friend_suggestions_precompute'):
+        # Parça parça: arkadaşın arkadaşı sayıları F[parça]·F seyrek çarpımından gelir
+        for start in range(0, n_users, chunk_size):
+            stop = min(start + chunk_size, n_users)
+            counts, *columns = top_suggestions(
+                friends[start:stop] @ friends, together[start:stop], masked[start:stop],
+                max_suggestions)
+            indptr[start + 1:stop + 1] = counts
+            parts.append(columns)
+    np.cumsum(indptr, out=indptr)
+
+    def concat(position, dtype):
+        if not parts:
+            return np.zeros(0, dtype=dtype)
+        return np.concatenate([part[position] for part in parts]).astype(dtype)
+
+    # Popüler oyuncular: 2·arkadaş sayısı + 3·galibiyet (istemcideki "popular" ile aynı)
+    degrees = np.diff(friends.indptr)
+    wins = np.array([profile.get("totalWins", 0) or 0 for profile in profiles], dtype=np.int64)
+    popularity = POPULAR_FRIEND_SCORE * degrees + POPULAR_WIN_SCORE * wins
+    popular_order = np.argsort(-popularity, kind="stable")
+    # Yalnızca users koleksiyonunda profili olanlar (silinmiş hesaplar önerilmez)
+    popular = [(int(idx), int(popularity[idx])) for idx in popular_order
+               if profiles[idx]][:max_suggestions * 4]
+
+    return SocialGraph(version, datetime.now(), mapping, profiles, friends, together, excluded,
+                       indptr, concat(0, np.int32), concat(1, np.int64), concat(2, np.int32),
+                       concat(3, np.int32), popular)
+
+
+def load_social_data(db, window_days=CO_PLAY_WINDOW_DAYS):
+    """Firestore'dan arkadaşlık, oyun, engel ve bekleyen istek kayıtlarını okur (sunucu tarafında bir kez)."""
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    users = {
+        doc.id: doc.to_dict()
+        for doc in db.collection(USERS_COLLECTION).select(PROFILE_FIELDS).stream()
+    }
+    # users/{uid}/friends/{friendId} ve blocked_users/{uid}/blocked/{blockedId} alt koleksiyonları
+    friendships = [
+        (doc.reference.parent.parent.id, (doc.to_dict() or {}).get('uid') or doc.id)
+        for doc in db.collection_group(FRIENDS_COLLECTION).select(['uid']).stream()
+    ]
+    blocked = [
+        (doc.reference.parent.parent.id, doc.id)
+        for doc in db.collection_group(BLOCKED_COLLECTION).select([]).stream()
+    ]
+    since = datetime.now() - timedelta(days=window_days)
+    games = [
+        (doc.to_dict() or {}).get('participants') or []
+        for doc in db.collection(GAMES_COLLECTION)
+        .where(filter=FieldFilter('createdAt', '>', since)).select(['participants']).stream()
+    ]
+    requests = (
+        doc.to_dict() or {}
+        for doc in db.collection(FRIEND_REQUESTS_COLLECTION)
+        .where(filter=FieldFilter('status', '==', 'pending'))
+        .select(['fromUserId', 'toUserId']).stream()
+    )
+    pending = [(request['fromUserId'], request['toUserId']) for request in requests
+               if request.get('fromUserId') and request.get('toUserId')]
+    return {"users": users, "friendships": friendships, "games": games, "blocked": blocked,
+            "pending": pending}
+
+
+class FriendSuggestionStore:
+    """
+    Sosyal grafı ve tüm kullanıcıların önerilerini arka planda hesaplayıp bellekte tutar;
+    istekler yalnızca hazır diziden okur.
+    """
+
+    def __init__(self, load_data, max_suggestions=MAX_SUGGESTIONS):
+        self._load_data = load_data
+        self.max_suggestions = max_suggestions
+        self._lock = threading.Lock()
+        self._graph = None
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+
+    def get_graph(self):
+        graph = self._graph
+        if graph is None:
+            with self._lock:
+                if self._graph is None:
+                    self._graph = build_social_graph(self._load_data(), 1, self.max_suggestions)
+                graph = self._graph
+        return graph
+
+    def refresh(self):
+        # Yeni graf kilit dışında kurulur; istekler eskiyi okumaya devam eder
+        data = self._load_data()
+        version = self._graph.version + 1 if self._graph is not None else 1
+        graph = build_social_graph(data, version, self.max_suggestions)
+        with self._lock:
+            self._graph = graph
+        return graph
+
+    def suggest(self, user_id, k):
+        return self.get_graph().suggest(user_id, k)
+
+    def status(self):
+        return self.get_graph().status()
+
+    def start_background_refresh(self, interval_seconds):
+        if self._refresh_thread is not None:
+            return
+
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Background friend graph refresh failed: {e}")
+
+        self._refresh_thread = threading.Thread(target=run, name="friend-graph-refresh",
+                                                daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+        self._stop_event.clear()
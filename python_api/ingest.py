@@ -0,0 +1,233 @@
+"""
+Buffered, batched ingestion of quiz events posted to /user_data
+"""
+
+import math
+import queue
+import threading
+import time
+from datetime import datetime
+
+USER_EVENTS_COLLECTION = 'user_events'
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def validate_user_data(payload):
+    """
+    /user_data gövdesini doğrular ve (user_id, olaylar) döndürür.
+
+    Olaylar, öneri modelinin kullandığı user_quiz_data biçimindedir.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('User data must be an object')
+
+    user_id = payload.get('userId')
+    if not isinstance(user_id, str) or not user_id.strip():
+        raise ValueError('userId is required')
+
+    history = payload.get('quizHistory', [])
+    if not isinstance(history, list):
+        raise ValueError('quizHistory must be a list')
+
+    events = []
+    for position, quiz in enumerate(history):
+        if not isinstance(quiz, dict):
+            raise ValueError(f'quizHistory[{position}] must be an object')
+
+        quiz_id = quiz.get('quizId')
+        if not isinstance(quiz_id, str) or not quiz_id:
+            raise ValueError(f'quizHistory[{position}].quizId is required')
+
+        rating = quiz.get('rating')
+        if not _is_number(rating):
+            raise ValueError(f'quizHistory[{position}].rating must be a number')
+
+        time_spent = quiz.get('timeSpentSeconds', 0)
+        if not _is_number(time_spent) or time_spent < 0:
+            raise ValueError(f'quizHistory[{position}].timeSpentSeconds must be a non-negative number')
+
+        timestamp = quiz.get('timestamp') or datetime.now().isoformat()
+        if not isinstance(timestamp, str):
+            raise ValueError(f'quizHistory[{position}].timestamp must be a string')
+
+        events.append({
+            "quiz_id": quiz_id,
+            "rating": rating,
+            "timestamp": timestamp,
+            "time_spent": time_spent
+        })
+
+    return user_id, events
+
+
+def _is_number(value):
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value))
+
+
+class IngestionQueue:
+    """
+    Sınırlı kuyruk + arka plan işçisi.
+
+    submit() sadece kuyruğa ekler ve hemen döner; kuyruk doluysa QueueFullError
+    fırlatır (geri basınç). İşçi, batch_size olaya ulaşınca ya da flush_interval
+    dolunca biriken olayları sırayla her sink'e toplu olarak verir.
+    """
+
+    def __init__(self, sinks, max_size=10000, batch_size=500, flush_interval=1.0):
+        self._sinks = list(sinks)
+        self._queue = queue.Queue(maxsize=max_size)
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._process_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed_batches = 0
+        self.flushed_items = 0
+        self.sink_errors = 0
+        self.last_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    def add_sink(self, sink):
+        self._sinks.append(sink)
+
+    def submit(self, item):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError('Ingestion queue is full')
+        with self._lock:
+            self.accepted += 1
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='ingest-worker',
+                                                    daemon=True)
+                    self._worker.start()
+
+    def _collect(self):
+        try:
+            # Kısa bekleme: stop() isteği en geç bu süre içinde fark edilir
+            batch = [self._queue.get(timeout=min(self.flush_interval, 0.1))]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._wake.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+            except queue.Empty:
+                continue
+        # flush() isteğinde kuyrukta kalanlar da bu partiye eklenir
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch):
+        with self._process_lock:
+            start = time.perf_counter()
+            for sink in self._sinks:
+                try:
+                    sink(batch)
+                except Exception as e:
+                    with self._lock:
+                        self.sink_errors += 1
+                    print(f"Ingestion sink failed: {e}")
+            elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.flushed_batches += 1
+            self.flushed_items += len(batch)
+            self.last_flush_seconds = elapsed
+            self.total_flush_seconds += elapsed
+        for _ in batch:
+            self._queue.task_done()
+
+    def flush(self):
+        # Kuyruktakileri çağıran iş parçacığında işle, işçinin elindeki partiyi bekle
+        self._wake.set()
+        try:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                self._process(batch)
+            self._queue.join()
+        finally:
+            self._wake.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+        if self._worker is not None:
+            self._worker.join(timeout=1.0)
+            self._worker = None
+        self._stopped.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'queueDepth': self._queue.qsize(),
+                'queueCapacity': self.max_size,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'flushedBatches': self.flushed_batches,
+                'flushedItems': self.flushed_items,
+                'sinkErrors': self.sink_errors,
+                'lastFlushSeconds': self.last_flush_seconds,
+                'avgFlushSeconds': (self.total_flush_seconds / self.flushed_batches
+                                    if self.flushed_batches else 0.0),
+            }
+
+
+def firestore_events_sink(get_db, batch_size=500):
+    """Olayları user_events koleksiyonuna WriteBatch'lerle kalıcı olarak yazar."""
+
+    def sink(batch):
+        db = get_db()
+        if db is None:
+            return
+        collection = db.collection(USER_EVENTS_COLLECTION)
+        documents = [
+            {"userId": user_id, **event}
+            for user_id, events in batch
+            for event in events
+        ]
+        for start in range(0, len(documents), batch_size):
+            write_batch = db.batch()
+            for document in documents[start:start + batch_size]:
+                write_batch.set(collection.document(), document)
+            write_batch.commit()
+
+    return sink
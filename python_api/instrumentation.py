@@ -0,0 +1,130 @@
+"""
+Request timing middleware and opt-in cProfile hooks for the AI API
+
+Every request is timed into per-route latency histograms; stages measured with
+metrics.stage() are returned in a Server-Timing header. A request is profiled
+when the sampling rate selects it, or when it carries the profiling header and
+header profiling is enabled; its pstats dump is written only when the request
+is slower than PROFILE_MIN_MS.
+"""
+
+import cProfile
+import os
+import random
+import time
+import uuid
+
+from flask import current_app, g, request
+
+from metrics import end_spans, registry, start_spans
+
+PROFILE_HEADER = 'X-Profile'
+
+request_seconds = registry.histogram(
+    'ai_api_request_duration_seconds', 'Request latency by route',
+    ('route', 'method', 'status'))
+requests_total = registry.counter(
+    'ai_api_requests_total', 'Requests by route and status', ('route', 'method', 'status'))
+request_errors_total = registry.counter(
+    'ai_api_request_errors_total', 'Requests that ended with a 5xx status or an exception',
+    ('route', 'method'))
+profiles_written_total = registry.counter(
+    'ai_api_profiles_written_total', 'cProfile dumps written for slow requests')
+
+DEFAULT_CONFIG = {
+    # 0..1 arası örnekleme oranı; 0 iken yalnızca başlıkla istenen istekler profillenir
+    'PROFILE_SAMPLE_RATE': float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    # Herkese açık ortamlarda istemcilerin profil tetiklemesini önlemek için varsayılan kapalı
+    'PROFILE_ALLOW_HEADER': os.environ.get('PROFILE_ALLOW_HEADER', '').lower() in ('1', 'true'),
+    'PROFILE_MIN_MS': float(os.environ.get('PROFILE_MIN_MS', 500)),
+    'PROFILE_DIR': os.environ.get('PROFILE_DIR', 'profiles'),
+}
+
+
+def route_label():
+    # Ham yol yerine kural kullanılır; /quiz/<id> gibi yollar etiket sayısını patlatmaz
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def should_profile(config):
+    if config['PROFILE_ALLOW_HEADER'] and request.headers.get(PROFILE_HEADER) == '1':
+        return True
+    rate = config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+
+def write_profile(profiler, config, elapsed_ms):
+    os.makedirs(config['PROFILE_DIR'], exist_ok=True)
+    name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}"
+            f"{route_label().replace('/', '_')}-{int(elapsed_ms)}ms-{uuid.uuid4().hex[:8]}.pstats")
+    path = os.path.join(config['PROFILE_DIR'], name)
+    profiler.dump_stats(path)
+    profiles_written_total.inc()
+    print(f"Profile written for slow request {request.method} {request.path} "
+          f"({elapsed_ms:.1f} ms): {path}")
+    return path
+
+
+def before_request():
+    g.request_start = time.perf_counter()
+    g.spans, g.spans_token = start_spans()
+    g.profiler = None
+    if should_profile(current_app.config):
+        g.profiler = cProfile.Profile()
+        try:
+            g.profiler.enable()
+        except ValueError:
+            # Aynı iş parçacığında başka bir profiler etkinse (ör. geliştirici oturumu) atlanır
+            g.profiler = None
+
+
+def after_request(response):
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route, method, status = route_label(), request.method, str(response.status_code)
+    request_seconds.observe(elapsed, route=route, method=method, status=status)
+    requests_total.inc(route=route, method=method, status=status)
+    if response.status_code >= 500:
+        request_errors_total.inc(route=route, method=method)
+
+    # Akış yanıtlarında süre, gövde gönderilmeden önceki kısmı kapsar
+    spans = g.get('spans') or []
+    timings = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in spans]
+    timings.append(f'total;dur={elapsed * 1000:.2f}')
+    response.headers['Server-Timing'] = ', '.join(timings)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        config = current_app.config
+        if elapsed * 1000 >= config['PROFILE_MIN_MS']:
+            path = write_profile(profiler, config, elapsed * 1000)
+            response.headers[PROFILE_HEADER] = os.path.basename(path)
+    return response
+
+
+def teardown_request(error):
+    # after_request işlenmemiş istisnalarda çalışmaz; sayaçlar burada tamamlanır
+    if error is not None and g.get('request_start') is not None:
+        route, method = route_label(), request.method
+        elapsed = time.perf_counter() - g.pop('request_start')
+        request_seconds.observe(elapsed, route=route, method=method, status='500')
+        requests_total.inc(route=route, method=method, status='500')
+        request_errors_total.inc(route=route, method=method)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+    token = g.pop('spans_token', None)
+    if token is not None:
+        end_spans(token)
+
+
+def instrument_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    return app
@@ -0,0 +1,103 @@
+"""
+Nearest-neighbour index over normalized quiz factors for similar-quiz lookups
+"""
+
+import numpy as np
+
+# Bu boyutun altındaki kataloglarda kaba kuvvet (tam) arama yeterince hızlı
+EXACT_INDEX_MAX_ITEMS = 20000
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores, ids, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.float32)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return ids[candidates], scores[candidates]
+
+
+class ExactItemIndex:
+    """Tüm quizleri tek matris-vektör çarpımıyla puanlayan kosinüs benzerliği indeksi."""
+
+    def __init__(self, vectors):
+        self.vectors = normalize_rows(vectors)
+        self._ids = np.arange(len(self.vectors))
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, item_idx, k):
+        scores = self.vectors @ self.vectors[item_idx]
+        scores[item_idx] = -np.inf
+        indices, scores = _top_k(scores, self._ids, k)
+        return indices[np.isfinite(scores)], scores[np.isfinite(scores)]
+
+
+class IVFItemIndex:
+    """
+    Küresel k-means kümelerine dayalı yaklaşık (IVF) indeks.
+
+    Sorgu yalnızca en yakın n_probe kümenin üyelerini puanlar; vektörler kümelere
+    göre ardışık saklandığı için her küme tek bir dilimdir.
+    """
+
+    def __init__(self, vectors, n_lists=None, n_probe=8, n_iter=10, sample_size=50000, seed=42):
+        vectors = normalize_rows(vectors)
+        n_items = len(vectors)
+        self.n_lists = n_lists or max(1, int(np.sqrt(n_items)))
+        self.n_probe = min(n_probe, self.n_lists)
+        self.vectors = vectors
+        self.centroids = self._train_centroids(vectors, n_iter, sample_size, seed)
+
+        # Vektörleri küme sırasına diz; her küme [offsets[c], offsets[c + 1]) aralığı
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        self.item_ids = order.astype(np.int64)
+        self.sorted_vectors = vectors[order]
+        self.positions = np.empty(n_items, dtype=np.int64)
+        self.positions[order] = np.arange(n_items)
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))]
+        )
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def _train_centroids(self, vectors, n_iter, sample_size, seed):
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = vectors[rng.choice(len(vectors), self.n_lists, replace=False)]
+        for _ in range(n_iter):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            empty = np.bincount(assignments, minlength=self.n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def search(self, item_idx, k):
+        query = self.vectors[item_idx]
+        probes = np.argpartition(-(self.centroids @ query), self.n_probe - 1)[:self.n_probe]
+        slices = [np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes]
+        candidates = np.concatenate(slices)
+
+        scores = self.sorted_vectors[candidates] @ query
+        scores[candidates == self.positions[item_idx]] = -np.inf
+        indices, scores = _top_k(scores, self.item_ids[candidates], k)
+        return indices[np.isfinite(scores)], scores[np.isfinite(scores)]
+
+
+def build_item_index(quiz_factors, exact_max_items=EXACT_INDEX_MAX_ITEMS):
+    if len(quiz_factors) <= exact_max_items:
+        return ExactItemIndex(quiz_factors)
+    return IVFItemIndex(quiz_factors)
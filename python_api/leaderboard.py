@@ -0,0 +1,502 @@
+"""
+In-memory leaderboards with order-statistic lookups and on-disk snapshots
+
+Each metric keeps its (−score, user_id) keys in a bucketed sorted list, so
+ranks and page offsets are found by binary search instead of a Firestore
+ordered query. A snapshot directory holds the keys in rank order:
+
+    snapshot/
+        meta.json          version, user count, save time
+        users.json         user ids and display profiles
+        <metric>.npy       int64 (n, 2) array of [user code, score] in rank order
+
+Loading a snapshot rebuilds every list without sorting. Snapshots are exported
+from a copy-on-write view of the board outside the store lock, and only the
+process holding the directory's lock file writes them.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+from bisect import bisect_left, insort
+from itertools import chain
+
+import numpy as np
+
+USERS_COLLECTION = 'users'
+METRICS = ('quizCount', 'duelWins', 'friendCount', 'longestStreak')
+PROFILE_FIELDS = ['nickname', 'profilePictureUrl']
+MAX_PAGE_SIZE = 200
+
+
+class RankedList:
+    """
+    Sıralı anahtar listesi: anahtarlar en fazla 2*LOAD uzunluğunda sıralı kovalarda
+    tutulur. Kova boyutları bir Fenwick ağacında toplanır; bir anahtarın sırası ve bir
+    konumun kovası O(log n), ekleme/silme tek kova içinde bisect ile yapılır. Kova
+    bölünüp silindiğinde ağaç bir sonraki okumada yeniden kurulur. copy() kovaları
+    paylaşır; paylaşılan bir kova değiştirilmeden önce kopyalanır.
+    """
+
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        # keys sıralı olmalıdır (anlık görüntüden yükleme)
+        keys = list(keys)
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._lists]
+        self._len = len(keys)
+        self._tree = None
+        # Yalnızca bu listeye ait (paylaşılmayan) kovaların kimlikleri
+        self._owned = {id(bucket) for bucket in self._lists}
+
+    def copy(self):
+        """O(kova sayısı) kopya; iki taraf da kovaları ilk yazmada kendine kopyalar."""
+        clone = RankedList()
+        clone._lists, clone._maxes, clone._len = list(self._lists), list(self._maxes), self._len
+        self._owned = set()
+        return clone
+
+    def _writable(self, i):
+        bucket = self._lists[i]
+        if id(bucket) not in self._owned:
+            bucket = self._lists[i] = list(bucket)
+            self._owned.add(id(bucket))
+        return bucket
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._lists:
+            yield from bucket
+
+    def _fenwick(self):
+        if self._tree is None:
+            tree = [0] * (len(self._lists) + 1)
+            for i, bucket in enumerate(self._lists, 1):
+                tree[i] += len(bucket)
+                parent = i + (i & -i)
+                if parent < len(tree):
+                    tree[parent] += tree[i]
+            self._tree = tree
+        return self._tree
+
+    def _resize(self, bucket, delta):
+        tree = self._tree
+        if tree is None:
+            return
+        i = bucket + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        # bucket'tan önceki kovalardaki anahtar sayısı
+        tree, total, i = self._fenwick(), 0, bucket
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        # position'ı içeren kova ve kova içindeki sıra (Fenwick üzerinde ikili iniş)
+        tree = self._fenwick()
+        bucket, step = 0, 1 << (len(tree).bit_length())
+        while step:
+            if bucket + step < len(tree) and tree[bucket + step] <= position:
+                bucket += step
+                position -= tree[bucket]
+            step >>= 1
+        return bucket, position
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._owned.add(id(self._lists[-1]))
+            self._maxes.append(key)
+            self._len = 1
+            self._tree = None
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            bucket = self._writable(i)
+            bucket.append(key)
+            self._maxes[i] = key
+        else:
+            bucket = self._writable(i)
+            insort(bucket, key)
+        self._len += 1
+        if len(bucket) > 2 * self.LOAD:
+            self._lists.insert(i + 1, bucket[self.LOAD:])
+            self._owned.add(id(self._lists[i + 1]))
+            del bucket[self.LOAD:]
+            self._maxes.insert(i, bucket[-1])
+            self._tree = None
+        else:
+            self._resize(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        bucket = self._lists[i] if i < len(self._lists) else []
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise ValueError(f'{key!r} not in list')
+        bucket = self._writable(i)
+        del bucket[j]
+        self._len -= 1
+        if not bucket:
+            self._owned.discard(id(bucket))
+            del self._lists[i]
+            del self._maxes[i]
+            self._tree = None
+        else:
+            self._maxes[i] = bucket[-1]
+            self._resize(i, -1)
+
+    def index(self, key):
+        """key'den küçük anahtar sayısı (0 tabanlı sıra)."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        bucket, offset = self._locate(start)
+        keys = []
+        while len(keys) < stop - start:
+            keys.extend(self._lists[bucket][offset:offset + stop - start - len(keys)])
+            bucket, offset = bucket + 1, 0
+        return keys
+
+
+def _score(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value)
+
+
+class Leaderboard:
+    """Metrik başına kullanıcı skorları ve sıralı anahtar listeleri."""
+
+    def __init__(self, metrics=METRICS, version=0):
+        self.metrics = tuple(metrics)
+        self.scores = {metric: {} for metric in self.metrics}
+        self.ranked = {metric: RankedList() for metric in self.metrics}
+        self.profiles = {}
+        self.version = version
+
+    @classmethod
+    def from_users(cls, users, metrics=METRICS):
+        """users: {user_id: {metrik: değer, nickname, profilePictureUrl}} (Firestore users dokümanları)."""
+        board = cls(metrics)
+        for user_id, data in users.items():
+            data = data or {}
+            for metric in board.metrics:
+                score = _score(data.get(metric))
+                if score is not None:
+                    board.scores[metric][user_id] = score
+            board._update_profile(user_id, data)
+        for metric, scores in board.scores.items():
+            board.ranked[metric] = RankedList(sorted((-score, user_id)
+                                                     for user_id, score in scores.items()))
+        return board
+
+    def _update_profile(self, user_id, data):
+        # Profil sözlükleri yerinde değiştirilmez; kopyalar aynı profilleri paylaşabilir
+        profile = {field: data[field] for field in PROFILE_FIELDS if data.get(field)}
+        if profile:
+            self.profiles[user_id] = {**self.profiles.get(user_id, {}), **profile}
+
+    def set_score(self, metric, user_id, score):
+        scores, ranked = self.scores[metric], self.ranked[metric]
+        old = scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            ranked.remove((-old, user_id))
+        ranked.add((-score, user_id))
+        scores[user_id] = score
+
+    def apply(self, events):
+        """
+        Skor olaylarını uygular: {"userId", "metric", "value"} skoru ayarlar,
+        {"userId", "metric", "delta"} artırır. Uygulanan olay sayısını döndürür.
+        """
+        applied = 0
+        for event in events:
+            user_id, metric = event['userId'], event['metric']
+            if 'value' in event:
+                score = _score(event['value'])
+            else:
+                score = self.scores[metric].get(user_id, 0) + _score(event['delta'])
+            self.set_score(metric, user_id, score)
+            self._update_profile(user_id, event)
+            applied += 1
+        self.version += applied
+        return applied
+
+    def _entry(self, rank, user_id, score):
+        profile = self.profiles.get(user_id, {})
+        return {
+            'rank': rank,
+            'userId': user_id,
+            'nickname': profile.get('nickname', user_id),
+            'profilePictureUrl': profile.get('profilePictureUrl'),
+            'score': score,
+        }
+
+    def page(self, metric, offset=0, limit=50):
+        """
+        offset'ten başlayan limit kadar kayıt. Eşit skorlu kullanıcılar aynı sırayı
+        paylaşır (1, 2, 2, 4); kendi aralarında kullanıcı kimliğine göre dizilir.
+        """
+        ranked = self.ranked[metric]
+        entries = []
+        previous, rank = None, None
+        for position, (negative, user_id) in enumerate(ranked.slice(offset, offset + limit), offset):
+            if negative != previous:
+                # Sayfa başındaki kayıt önceki sayfadaki eşit skorlarla aynı sırayı alır
+                rank = ranked.index((negative, '')) + 1 if previous is None else position + 1
+                previous = negative
+            entries.append(self._entry(rank, user_id, -negative))
+        return entries
+
+    def rank(self, metric, user_id):
+        score = self.scores[metric].get(user_id)
+        if score is None:
+            return None
+        return {'rank': self.ranked[metric].index((-score, '')) + 1, 'score': score,
+                'total': len(self.ranked[metric])}
+
+    def snapshot_view(self):
+        """
+        export() için değişmeyen görünüm: sıralı listeler yazmada kopyalanacak şekilde
+        paylaşılır, profil sözlüğü sığ kopyalanır. Skorlar kopyalanmaz; görünüm yalnızca
+        export/page için kullanılır.
+        """
+        view = Leaderboard(self.metrics, self.version)
+        view.ranked = {metric: ranked.copy() for metric, ranked in self.ranked.items()}
+        view.profiles = dict(self.profiles)
+        return view
+
+    def export(self):
+        """Anlık görüntü verisi (bellekte); diske yazma kilit dışında yapılabilsin diye ayrıdır."""
+        user_ids = list(dict.fromkeys(chain(
+            self.profiles, *((user_id for _, user_id in ranked) for ranked in self.ranked.values()))))
+        codes = {user_id: code for code, user_id in enumerate(user_ids)}
+        rows = {}
+        for metric in self.metrics:
+            # Sütunlar ayrı listelerden doldurulur; demet listesinden dizi kurmaktan belirgin hızlıdır
+            metric_rows = np.empty((len(self.ranked[metric]), 2), dtype=np.int64)
+            metric_rows[:, 0] = [codes[user_id] for _, user_id in self.ranked[metric]]
+            metric_rows[:, 1] = [-negative for negative, _ in self.ranked[metric]]
+            rows[metric] = metric_rows
+        meta = {'version': self.version, 'users': len(user_ids), 'metrics': list(self.metrics)}
+        return meta, user_ids, dict(self.profiles), rows
+
+    def save(self, directory):
+        return write_snapshot(directory, self.export())
+
+    @classmethod
+    def load(cls, directory):
+        recover_snapshot(directory)
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, 'users.json'), encoding='utf-8') as f:
+            users = json.load(f)
+        user_ids = users['ids']
+        board = cls(meta['metrics'], meta['version'])
+        for metric in board.metrics:
+            rows = np.load(os.path.join(directory, f'{metric}.npy'))
+            ids = [user_ids[code] for code in rows[:, 0].tolist()]
+            scores = rows[:, 1].tolist()
+            # Satırlar zaten sıra düzeninde: sıralama yapılmadan kovalara bölünür
+            board.ranked[metric] = RankedList(zip([-score for score in scores], ids))
+            board.scores[metric] = dict(zip(ids, scores))
+        board.profiles = users['profiles']
+        return board
+
+
+def recover_snapshot(directory):
+    # write_snapshot() iki rename arasında kesildiyse önceki anlık görüntüyü geri getir
+    old_path = directory + '.old'
+    if os.path.exists(old_path) and not os.path.exists(directory):
+        os.rename(old_path, directory)
+    shutil.rmtree(directory + '.tmp', ignore_errors=True)
+
+
+def write_snapshot(directory, snapshot):
+    """export() çıktısını geçici dizine yazar ve eskisinin yerine atomik olarak taşır."""
+    meta, user_ids, profiles, rows = snapshot
+    tmp_path = directory + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for metric, metric_rows in rows.items():
+        np.save(os.path.join(tmp_path, f'{metric}.npy'), metric_rows)
+    with open(os.path.join(tmp_path, 'users.json'), 'w', encoding='utf-8') as f:
+        json.dump({'ids': user_ids, 'profiles': profiles}, f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({**meta, 'savedAt': time.time()}, f)
+
+    old_path = directory + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, old_path)
+    os.rename(tmp_path, directory)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return len(user_ids)
+
+
+def load_leaderboard_users(db):
+    # Kullanıcı başına yalnızca metrik ve profil alanları okunur (açılışta bir kez)
+    return {
+        doc.id: doc.to_dict() or {}
+        for doc in db.collection(USERS_COLLECTION).select(list(METRICS) + PROFILE_FIELDS).stream()
+    }
+
+
+class LeaderboardStore:
+    """
+    Liderlik tablolarını bellekte tutar. İlk kullanımda varsa anlık görüntüden, yoksa
+    kaynaktan (Firestore users) yüklenir; skor olaylarıyla artımlı güncellenir ve
+    arka planda değiştikçe diske yazılır. Anlık görüntüyü yalnızca dizinin kilit
+    dosyasını (snapshot_dir + '.lock') tutan süreç yazar.
+    """
+
+    def __init__(self, load_users, snapshot_dir=None):
+        self._load_users = load_users
+        self.snapshot_dir = snapshot_dir
+        self._lock = threading.Lock()
+        self._board = None
+        self._saved_version = None
+        self._writer_lock = None
+        self._writer_pid = None
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    def _build(self):
+        if self.snapshot_dir:
+            recover_snapshot(self.snapshot_dir)
+        if self.snapshot_dir and os.path.exists(os.path.join(self.snapshot_dir, 'meta.json')):
+            try:
+                board = Leaderboard.load(self.snapshot_dir)
+                self._saved_version = board.version
+                return board
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Leaderboard snapshot could not be loaded, rebuilding: {e}")
+        return Leaderboard.from_users(self._load_users())
+
+    def get_board(self):
+        board = self._board
+        if board is None:
+            with self._lock:
+                if self._board is None:
+                    self._board = self._build()
+                board = self._board
+        return board
+
+    def apply_events(self, events):
+        board = self.get_board()
+        with self._lock:
+            return board.apply(events)
+
+    def page(self, metric, offset, limit):
+        board = self.get_board()
+        with self._lock:
+            return board.page(metric, offset, limit), len(board.ranked[metric])
+
+    def rank(self, user_id, metrics):
+        board = self.get_board()
+        with self._lock:
+            return {metric: board.rank(metric, user_id) for metric in metrics}
+
+    def refresh(self):
+        # Kaynaktan yeniden kurulur (ör. uygulamanın doğrudan Firestore'a yazdığı sayaçlar)
+        board = Leaderboard.from_users(self._load_users())
+        with self._lock:
+            if self._board is not None:
+                board.version = self._board.version + 1
+            self._board = board
+        return board
+
+    def _acquire_writer(self):
+        # flock açık dosya tanımına bağlıdır: fork'lanan süreçler ve diğer depolar kilidi alamaz
+        if self._writer_pid == os.getpid():
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_dir)), exist_ok=True)
+        lock_file = open(self.snapshot_dir + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._writer_lock, self._writer_pid = lock_file, os.getpid()
+        return True
+
+    def save_snapshot(self):
+        if not self.snapshot_dir or not self._acquire_writer():
+            return False
+        board = self.get_board()
+        with self._lock:
+            # Kilit altında yalnızca yazmada kopyalanan görünüm alınır; dışa aktarma kilit dışındadır
+            if board.version == self._saved_version:
+                return False
+            view = board.snapshot_view()
+        write_snapshot(self.snapshot_dir, view.export())
+        self._saved_version = view.version
+        return True
+
+    def status(self):
+        board = self.get_board()
+        return {
+            'version': board.version,
+            'savedVersion': self._saved_version,
+            'users': {metric: len(board.ranked[metric]) for metric in board.metrics},
+        }
+
+    def _start_loop(self, name, interval_seconds, task):
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    task()
+                except Exception as e:
+                    print(f"Background leaderboard {name} failed: {e}")
+
+        thread = threading.Thread(target=run, name=f"leaderboard-{name}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def start_background_snapshots(self, interval_seconds):
+        if not self.snapshot_dir:
+            return False
+        # Kilidi tutan süreç çıkınca diğerleri sonraki turda yazıcı olabilir
+        if not self._acquire_writer():
+            print(f"Leaderboard snapshots in {self.snapshot_dir} are written by another process")
+        self._start_loop('snapshot', interval_seconds, self.save_snapshot)
+        return True
+
+    def start_background_refresh(self, interval_seconds):
+        self._start_loop('refresh', interval_seconds, self.refresh)
+
+    def stop_background_tasks(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._stop_event.clear()
+
+    def close(self):
+        # Son değişiklikler yalnızca yazıcı süreçte diske alınır (ör. ön yüklenen master yazmaz)
+        self.stop_background_tasks()
+        if self._writer_pid == os.getpid():
+            self.save_snapshot()
+            self._writer_lock.close()
+            self._writer_lock, self._writer_pid = None, None
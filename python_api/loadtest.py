@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Load test for serve.py: requests/sec across worker counts
+"""
+
+import argparse
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def hammer(url, duration, concurrency):
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+    stop_at = time.monotonic() + duration
+
+    def client(slot):
+        while time.monotonic() < stop_at:
+            try:
+                urllib.request.urlopen(url, timeout=5).read()
+                counts[slot] += 1
+            except OSError:
+                errors[slot] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/sec of serve.py per worker count")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--path", default="/recommendations?user_id=user1")
+    parser.add_argument("--server", default="auto", choices=("auto", "gunicorn", "prefork"))
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    print(f"📊 {url}, {args.concurrency} concurrent clients, {args.duration:.0f}s per run")
+    for workers in [int(value) for value in args.workers.split(",")]:
+        process = subprocess.Popen(
+            [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(args.port),
+             "--workers", str(workers), "--threads", str(args.threads), "--server", args.server],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not wait_until_ready(url):
+                print(f"  workers={workers}: server did not start")
+                continue
+            requests_done, errors = hammer(url, args.duration, args.concurrency)
+            print(f"  workers={workers:2d}: {requests_done / args.duration:8.1f} req/s ({errors} errors)")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
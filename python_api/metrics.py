@@ -0,0 +1,173 @@
+"""
+Minimal Prometheus-style metrics (counters, histograms, stage spans) without extra dependencies
+
+Metrics are kept per process; render() produces the Prometheus text exposition
+format (version 0.0.4) served by GET /metrics.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etkin isteğin aşama süreleri (Server-Timing başlığı için); istek dışında None
+_current_spans = contextvars.ContextVar('current_spans', default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple((name, labels[name]) for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][position] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple((name, labels[name]) for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(key + (('le', _format_value(float(bound))),))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Sayaç ve histogramların yanı sıra, kazıma anında okunan collector'ları tutar
+    (ör. önbellek sayaçları kendi sınıflarında tutulur, burada yalnızca okunur).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        # collect() -> [(ad, 'counter' | 'gauge', açıklama, {etiketler}, değer), ...]
+        self._collectors.append(collect)
+
+    def render(self, *collectors):
+        # collectors: yalnızca bu kazımada okunan ek collector'lar (ör. uygulamaya ait depolar)
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        families = {}
+        for collect in self._collectors + list(collectors):
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                family = families.setdefault(name, (kind, help_text, []))
+                family[2].append((tuple(sorted(labels.items())), value))
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'ai_api_stage_duration_seconds', 'Time spent in a named processing stage', ('stage',))
+
+
+@contextmanager
+def stage(name):
+    """Bir işlem aşamasını ölçer; istek içindeyse Server-Timing için de kaydeder."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=name)
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def start_spans():
+    spans = []
+    return spans, _current_spans.set(spans)
+
+
+def end_spans(token):
+    _current_spans.reset(token)
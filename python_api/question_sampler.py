@@ -0,0 +1,235 @@
+"""
+Adaptive question sampling from in-memory (category, difficulty) index arrays
+"""
+
+import random
+import threading
+from collections import deque
+
+import numpy as np
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+DEFAULT_LEVEL = 1
+# Eski / Türkçe kayıtlardaki zorluk adları
+DIFFICULTY_ALIASES = {'kolay': 'easy', 'orta': 'medium', 'zor': 'hard'}
+
+# Seviye, son ACCURACY_WINDOW cevaptaki doğruluğa göre bir basamak değişir (merdiven yöntemi);
+# karar için en az MIN_ANSWERS cevap gerekir, seviye değişince pencere sıfırlanır
+ACCURACY_WINDOW = 20
+MIN_ANSWERS = 5
+PROMOTE_ACCURACY = 0.8
+DEMOTE_ACCURACY = 0.5
+
+
+def normalize_difficulty(value):
+    value = str(value or '').strip().lower()
+    value = DIFFICULTY_ALIASES.get(value, value)
+    return value if value in DIFFICULTIES else DIFFICULTIES[DEFAULT_LEVEL]
+
+
+class QuestionIndex:
+    """
+    Soruları sıra numaralarına (ordinal) eşler ve (kategori, zorluk) ile (None, zorluk)
+    grupları için ordinal dizileri tutar. Ordinaller hiç değişmez; kullanıcıların
+    görülen-soru bitmap'leri bu numaralara göre tutulur.
+    """
+
+    def __init__(self, questions=()):
+        self.questions = []
+        self.ordinals = {}
+        self._groups = {}
+        self.add(questions)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def add(self, questions):
+        new_groups = {}
+        added = 0
+        for question in questions:
+            question_id = question.get('id')
+            if not question_id or question_id in self.ordinals:
+                continue
+            ordinal = len(self.questions)
+            self.questions.append(question)
+            self.ordinals[question_id] = ordinal
+            difficulty = normalize_difficulty(question.get('difficulty'))
+            for key in ((question.get('category'), difficulty), (None, difficulty)):
+                new_groups.setdefault(key, []).append(ordinal)
+            added += 1
+        # Diziler kopyalanıp bir seferde değiştirilir; okuyucular eski ya da yeni diziyi görür
+        for key, ordinals in new_groups.items():
+            current = self._groups.get(key, np.zeros(0, dtype=np.int32))
+            self._groups[key] = np.concatenate([current, np.asarray(ordinals, dtype=np.int32)])
+        return added
+
+    def remove(self, question_ids):
+        # Silinen sorular gruplardan çıkarılır; ordinaller yeniden kullanılmaz (bitmap'ler geçerli kalır)
+        removed = [self.ordinals.pop(question_id) for question_id in question_ids
+                   if question_id in self.ordinals]
+        if removed:
+            removed = np.asarray(removed, dtype=np.int32)
+            for key, group in list(self._groups.items()):
+                self._groups[key] = group[~np.isin(group, removed)]
+        return len(removed)
+
+    def group(self, category, difficulty):
+        return self._groups.get((category, difficulty), np.zeros(0, dtype=np.int32))
+
+
+class UserProgress:
+    """Kullanıcının cevapladığı soruların bitmap'i ve seviye durumu."""
+
+    __slots__ = ('seen', 'recent', 'level', 'answered')
+
+    def __init__(self):
+        # Bit i = ordinal i cevaplandı; bitmap yalnızca cevaplanan en büyük ordinale kadar büyür
+        self.seen = np.zeros(0, dtype=np.uint8)
+        self.recent = deque(maxlen=ACCURACY_WINDOW)
+        self.level = DEFAULT_LEVEL
+        self.answered = 0
+
+    def mark(self, ordinal):
+        byte = ordinal >> 3
+        if byte >= len(self.seen):
+            grown = np.zeros(max(byte + 1, len(self.seen) * 2), dtype=np.uint8)
+            grown[:len(self.seen)] = self.seen
+            self.seen = grown
+        self.seen[byte] |= np.uint8(1 << (ordinal & 7))
+
+    def is_seen(self, ordinal):
+        byte = ordinal >> 3
+        return byte < len(self.seen) and bool(self.seen[byte] >> (ordinal & 7) & 1)
+
+    def unseen_mask(self, ordinals):
+        # Vektörize bit testi; bitmap dışındaki ordinaller görülmemiştir
+        bytes_ = ordinals >> 3
+        inside = bytes_ < len(self.seen)
+        seen = np.zeros(len(ordinals), dtype=bool)
+        seen[inside] = (self.seen[bytes_[inside]] >> (ordinals[inside] & 7)) & 1 == 1
+        return ~seen
+
+    @property
+    def accuracy(self):
+        return sum(self.recent) / len(self.recent) if self.recent else None
+
+
+class QuestionSampler:
+    """
+    Kullanıcıya daha önce cevaplamadığı, seviyesine uygun soruları seçer.
+
+    Seçim, grup dizisinden rastgele konumlar çekip bitmap'te görülmüş olanları
+    reddederek yapılır; maliyet döndürülen soru sayısıyla orantılıdır, soru bankası
+    boyutuyla değil. Grubun çoğu görülmüşse (ret sayısı sınırı aşılırsa) grup bir
+    kez vektörize taranır.
+    """
+
+    def __init__(self, load_questions, seed=None):
+        self._load_questions = load_questions
+        self._index = None
+        self._users = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def get_index(self):
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = QuestionIndex(self._load_questions())
+                index = self._index
+        return index
+
+    def add_questions(self, questions):
+        # İndeks henüz yüklenmediyse yeni sorular ilk yüklemede zaten okunur
+        with self._lock:
+            if self._index is None:
+                return 0
+            return self._index.add(questions)
+
+    def remove_questions(self, question_ids):
+        with self._lock:
+            if self._index is None:
+                return 0
+            return self._index.remove(question_ids)
+
+    def _progress(self, user_id):
+        progress = self._users.get(user_id)
+        if progress is None:
+            progress = self._users.setdefault(user_id, UserProgress())
+        return progress
+
+    def record_answers(self, user_id, answers):
+        """answers: [(question_id, doğru_mu)]; bilinmeyen sorular atlanır."""
+        index = self.get_index()
+        recorded = 0
+        with self._lock:
+            progress = self._progress(user_id)
+            for question_id, correct in answers:
+                ordinal = index.ordinals.get(question_id)
+                if ordinal is None:
+                    continue
+                progress.mark(ordinal)
+                progress.recent.append(bool(correct))
+                progress.answered += 1
+                recorded += 1
+                self._adjust_level(progress)
+        return recorded
+
+    @staticmethod
+    def _adjust_level(progress):
+        if len(progress.recent) < MIN_ANSWERS:
+            return
+        accuracy = progress.accuracy
+        if accuracy >= PROMOTE_ACCURACY and progress.level < len(DIFFICULTIES) - 1:
+            progress.level += 1
+        elif accuracy <= DEMOTE_ACCURACY and progress.level > 0:
+            progress.level -= 1
+        else:
+            return
+        # Yeni seviye yeni cevaplarla değerlendirilir
+        progress.recent.clear()
+
+    def _sample_group(self, group, progress, count, chosen):
+        picks = []
+        if not len(group) or count <= 0:
+            return picks
+        attempts = 4 * count + 8
+        while len(picks) < count and attempts:
+            attempts -= 1
+            ordinal = int(group[self._random.randrange(len(group))])
+            if ordinal in chosen or progress.is_seen(ordinal):
+                continue
+            chosen.add(ordinal)
+            picks.append(ordinal)
+        if len(picks) < count:
+            # Grup büyük ölçüde görülmüş: kalan adaylar tek geçişte bulunur
+            candidates = [int(ordinal) for ordinal in group[progress.unseen_mask(group)]
+                          if int(ordinal) not in chosen]
+            extra = self._random.sample(candidates, min(count - len(picks), len(candidates)))
+            chosen.update(extra)
+            picks.extend(extra)
+        return picks
+
+    def next_questions(self, user_id, category=None, n=10):
+        """
+        Hedef seviyeden n soru döndürür; yetmezse en yakın seviyelerden tamamlar
+        (önce bir alt, sonra bir üst).
+        """
+        index = self.get_index()
+        progress = self._users.get(user_id) or UserProgress()
+        level = progress.level
+        order = sorted(range(len(DIFFICULTIES)), key=lambda other: (abs(other - level), other))
+        chosen = set()
+        ordinals = []
+        for other in order:
+            if len(ordinals) >= n:
+                break
+            group = index.group(category, DIFFICULTIES[other])
+            ordinals.extend(self._sample_group(group, progress, n - len(ordinals), chosen))
+        return {
+            'questions': [index.questions[ordinal] for ordinal in ordinals],
+            'difficulty': DIFFICULTIES[level],
+            'accuracy': progress.accuracy,
+            'answeredCount': progress.answered,
+        }
@@ -0,0 +1,461 @@
+"""
+Firestore query helpers for the KarbonSon question bank
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from ttl_cache import TTLCache
+
+QUESTIONS_COLLECTION = 'questions'
+# Silinen soruların kimlik + sürüm kayıtları (delta senkronizasyonu için)
+TOMBSTONES_COLLECTION = 'question_tombstones'
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Firestore bir WriteBatch içinde en fazla 500 yazmaya izin verir
+GET_ALL_CHUNK_SIZE = 100
+WRITE_BATCH_SIZE = 500
+# Varsayılan eşzamanlı commit sayısı; uygulamada FIRESTORE_IO_THREADS ayarıyla belirlenir
+WRITE_CONCURRENCY = 4
+
+# Delta senkronizasyonu: sayfa boyutu ve imlecin geride tutulduğu güvenlik penceresi.
+# Başka işçilerin sürüm aldıktan sonra geç commit ettiği yazmalar bu pencere içinde
+# kalırsa bir sonraki senkronizasyonda yine gönderilir (istemci kimliğe göre üzerine yazar)
+DEFAULT_SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 5000
+SYNC_SAFETY_SECONDS = float(os.environ.get('SYNC_SAFETY_SECONDS', 5))
+
+
+class VersionClock:
+    """
+    Soru sürümleri: mikrosaniye cinsinden duvar saati, süreç içinde kesin artan.
+    Süreçler arası sıralama saat farkı kadar kayabilir (SYNC_SAFETY_SECONDS).
+    """
+
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now():
+        return time.time_ns() // 1000
+
+    def reserve(self, count=1):
+        # count ardışık sürüm ayrılır; ilki döndürülür
+        with self._lock:
+            first = max(self.now(), self._last + 1)
+            self._last = first + max(count, 1) - 1
+            return first
+
+
+version_clock = VersionClock()
+
+# Liste görünümünde gönderilen alanlar (açıklama ve seçenek geri bildirimleri hariç)
+LIST_VIEW_FIELDS = ['text', 'options', 'category', 'difficulty', 'timeLimit', 'tags']
+VIEWS = ('full', 'list')
+FORMATS = ('json', 'ndjson')
+
+
+def build_questions_query(db, category=None, difficulty=None, fields=None, start_after=None,
+                          limit=None):
+    # Filtreler Firestore sorgusuna aktarılır, istemci tarafında filtreleme yapılmaz
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    query = db.collection(QUESTIONS_COLLECTION)
+    if category:
+        query = query.where(filter=FieldFilter('category', '==', category))
+    if difficulty:
+        query = query.where(filter=FieldFilter('difficulty', '==', difficulty))
+    if fields:
+        query = query.select(fields)
+    query = query.order_by('__name__')
+    if start_after:
+        query = query.start_after({'__name__': start_after})
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def project_question(doc, view='full'):
+    question = doc.to_dict() or {}
+    question['id'] = doc.id
+    return apply_view(question, view)
+
+
+def apply_view(question, view='full'):
+    # Liste görünümünde açıklama ve seçenek geri bildirimleri gönderilmez
+    if view == 'list':
+        question = {key: value for key, value in question.items() if key != 'explanation'}
+        question['options'] = [
+            {key: value for key, value in option.items() if key != 'feedback'}
+            for option in question.get('options', [])
+            if isinstance(option, dict)
+        ]
+    return question
+
+
+def fetch_questions_page(db, page_size=DEFAULT_PAGE_SIZE, cursor=None, category=None,
+                         difficulty=None, view='full', fields=None):
+    """
+    Tek sayfa soru döndürür; bellek kullanımı koleksiyon boyutundan bağımsızdır.
+
+    Sonraki sayfanın olup olmadığını anlamak için page_size + 1 doküman istenir;
+    next_cursor, sayfadaki son dokümanın kimliğidir.
+    """
+    if fields is None and view == 'list':
+        fields = LIST_VIEW_FIELDS
+    query = build_questions_query(db, category, difficulty, fields, cursor, page_size + 1)
+
+    questions = []
+    has_more = False
+    for doc in query.stream():
+        if len(questions) == page_size:
+            has_more = True
+            break
+        questions.append(project_question(doc, view))
+
+    next_cursor = questions[-1]['id'] if has_more and questions else None
+    return questions, next_cursor
+
+
+def stream_questions(db, category=None, difficulty=None, view='full', fields=None, cursor=None):
+    # Dokümanlar Firestore'dan geldikçe tek tek üretilir; liste biriktirilmez
+    if fields is None and view == 'list':
+        fields = LIST_VIEW_FIELDS
+    query = build_questions_query(db, category, difficulty, fields, cursor)
+    for doc in query.stream():
+        yield project_question(doc, view)
+
+
+def encode_ndjson(questions, compress=False, flush_every=100):
+    """
+    Soruları NDJSON satırlarına çevirir, istenirse gzip ile akış halinde sıkıştırır.
+
+    Sıkıştırma açıkken her flush_every dokümanda bir Z_SYNC_FLUSH yapılır; böylece
+    istemci ilk baytları tüm dışa aktarım bitmeden alır.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    for count, question in enumerate(questions, 1):
+        line = (json.dumps(question, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        if compressor is None:
+            yield line
+            continue
+        chunk = compressor.compress(line)
+        if count == 1 or count % flush_every == 0:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if chunk:
+            yield chunk
+    if compressor is not None:
+        yield compressor.flush()
+
+
+async def fetch_questions_page_async(db, page_size=DEFAULT_PAGE_SIZE, cursor=None, category=None,
+                                     difficulty=None, view='full', fields=None):
+    # fetch_questions_page'in AsyncClient karşılığı
+    if fields is None and view == 'list':
+        fields = LIST_VIEW_FIELDS
+    query = build_questions_query(db, category, difficulty, fields, cursor, page_size + 1)
+
+    questions = []
+    has_more = False
+    async for doc in query.stream():
+        if len(questions) == page_size:
+            has_more = True
+            break
+        questions.append(project_question(doc, view))
+
+    next_cursor = questions[-1]['id'] if has_more and questions else None
+    return questions, next_cursor
+
+
+async def get_questions_by_ids(db, question_ids, view='full', fields=None,
+                               chunk_size=GET_ALL_CHUNK_SIZE):
+    """
+    Soruları kimlikleriyle getirir: kimlikler chunk_size'lık get_all çağrılarına
+    bölünür ve çağrılar eşzamanlı beklenir. (sorular, bulunamayan_kimlikler) döndürür.
+    """
+    if fields is None and view == 'list':
+        fields = LIST_VIEW_FIELDS
+    collection = db.collection(QUESTIONS_COLLECTION)
+    unique_ids = list(dict.fromkeys(question_ids))
+
+    async def fetch(chunk):
+        references = [collection.document(question_id) for question_id in chunk]
+        return [doc async for doc in db.get_all(references, field_paths=fields)]
+
+    chunks = [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+    found = {}
+    for docs in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+        for doc in docs:
+            if doc.exists:
+                found[doc.id] = project_question(doc, view)
+
+    # İstenen sıra korunur
+    questions = [found[question_id] for question_id in unique_ids if question_id in found]
+    missing = [question_id for question_id in unique_ids if question_id not in found]
+    return questions, missing
+
+
+def _prepare_writes(db, questions):
+    results = [None] * len(questions)
+    pending = []
+    version = version_clock.reserve(len(questions))
+    for index, question in enumerate(questions):
+        if not isinstance(question, dict):
+            results[index] = {'index': index, 'status': 'error',
+                              'error': 'Question must be an object'}
+            continue
+        doc_ref = db.collection(QUESTIONS_COLLECTION).document()
+        # Her yazma /questions/sync için artan bir sürüm alır
+        pending.append((index, doc_ref, {**question, 'version': version + index}))
+    return results, pending
+
+
+def _record_chunk_results(results, chunk, error):
+    for index, doc_ref, question in chunk:
+        result = {'index': index, 'id': doc_ref.id,
+                  'status': 'error' if error else 'success'}
+        if error:
+            result['error'] = error
+        else:
+            result['text'] = question.get('text', '')
+            result['category'] = question.get('category', '')
+        results[index] = result
+
+
+def _commit_chunk(db, chunk):
+    batch = db.batch()
+    for _, doc_ref, question in chunk:
+        batch.set(doc_ref, question)
+    batch.commit()
+
+
+def write_questions(db, questions, batch_size=WRITE_BATCH_SIZE, max_workers=None, executor=None):
+    """
+    Soruları WriteBatch parçaları halinde yazar ve öğe başına sonuç döndürür.
+
+    Her parça atomiktir; parçalar verilen executor'da (uygulamanın yazma havuzu) ya da
+    max_workers (varsayılan WRITE_CONCURRENCY) boyutunda geçici bir havuzda commit
+    edilir. Bir parça başarısız olursa yalnızca o parçadaki sorular hata olarak işaretlenir.
+    """
+    results, pending = _prepare_writes(db, questions)
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(max_workers or WRITE_CONCURRENCY)
+    try:
+        futures = [(chunk, executor.submit(_commit_chunk, db, chunk)) for chunk in chunks]
+        for chunk, future in futures:
+            try:
+                future.result()
+                error = None
+            except Exception as e:
+                print(f"Error committing question batch: {e}")
+                error = str(e)
+            _record_chunk_results(results, chunk, error)
+    finally:
+        if owned:
+            executor.shutdown()
+
+    return results
+
+
+async def write_questions_async(db, questions, batch_size=WRITE_BATCH_SIZE, max_concurrency=None):
+    """
+    write_questions'ın AsyncClient karşılığı: parçalar iş parçacığı havuzu yerine
+    olay döngüsünde, en fazla max_concurrency commit aynı anda olacak şekilde yazılır.
+    """
+    results, pending = _prepare_writes(db, questions)
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    semaphore = asyncio.Semaphore(max_concurrency or WRITE_CONCURRENCY)
+
+    async def commit(chunk):
+        async with semaphore:
+            batch = db.batch()
+            for _, doc_ref, question in chunk:
+                batch.set(doc_ref, question)
+            await batch.commit()
+
+    outcomes = await asyncio.gather(*(commit(chunk) for chunk in chunks), return_exceptions=True)
+    for chunk, outcome in zip(chunks, outcomes):
+        error = None
+        if isinstance(outcome, Exception):
+            print(f"Error committing question batch: {outcome}")
+            error = str(outcome)
+        _record_chunk_results(results, chunk, error)
+    return results
+
+
+def delete_questions(db, question_ids, batch_size=WRITE_BATCH_SIZE // 2):
+    """
+    Soruları siler ve her biri için aynı WriteBatch içinde bir silinme kaydı yazar;
+    silinen sorular /questions/sync yanıtlarında "deleted" listesinde görünür.
+    """
+    question_ids = list(dict.fromkeys(question_ids))
+    version = version_clock.reserve(len(question_ids))
+    questions = db.collection(QUESTIONS_COLLECTION)
+    tombstones = db.collection(TOMBSTONES_COLLECTION)
+    for start in range(0, len(question_ids), batch_size):
+        batch = db.batch()
+        for offset, question_id in enumerate(question_ids[start:start + batch_size], start):
+            batch.delete(questions.document(question_id))
+            batch.set(tombstones.document(question_id), {'version': version + offset})
+        batch.commit()
+    return question_ids
+
+
+def _changed_since(db, collection, since, after_id, limit, fields=None):
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    # Aynı sürümü paylaşan dokümanlar sayfa sınırında kaybolmasın diye (version, kimlik)
+    # çiftine göre sıralanır ve son gönderilen çiftten sonra devam edilir
+    query = db.collection(collection)
+    if after_id is None:
+        query = query.where(filter=FieldFilter('version', '>', since))
+    else:
+        query = query.where(filter=FieldFilter('version', '>=', since))
+    if fields:
+        query = query.select(fields)
+    query = query.order_by('version').order_by('__name__')
+    if after_id is not None:
+        query = query.start_after({'version': since, '__name__': after_id})
+    return query.limit(limit).stream()
+
+
+def fetch_question_changes(db, since, limit=DEFAULT_SYNC_PAGE_SIZE, view='full', after_id=None):
+    """
+    (since, after_id) çiftinden sonra eklenen/değişen ve silinen sorular, (sürüm, kimlik)
+    sırasıyla.
+
+    Yalnızca 'version' alanı üzerindeki aralık sorgusu okunur; okunan doküman sayısı
+    banka boyutuyla değil değişiklik sayısıyla orantılıdır. (sorular, silinen_kimlikler,
+    imleç, son_kimlik, devamı_var) döndürür; devamı varsa imleç ve son_kimlik sayfadaki
+    son değişikliğin sürümü ve kimliğidir, yoksa imleç güvenlik penceresi kadar geride
+    tutulan şimdiki zaman, son_kimlik None'dır.
+    """
+    fields = ['version'] + LIST_VIEW_FIELDS if view == 'list' else None
+    changes = [(doc.get('version'), doc.id, project_question(doc, view))
+               for doc in _changed_since(db, QUESTIONS_COLLECTION, since, after_id, limit + 1,
+                                         fields)]
+    changes += [(doc.get('version'), doc.id, None)
+                for doc in _changed_since(db, TOMBSTONES_COLLECTION, since, after_id, limit + 1)]
+    changes.sort(key=lambda change: change[:2])
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        cursor, last_id = changes[-1][:2]
+    else:
+        cursor = max(since, version_clock.now() - int(SYNC_SAFETY_SECONDS * 1_000_000))
+        last_id = None
+    questions = [question for _, _, question in changes if question is not None]
+    deleted = [doc_id for _, doc_id, question in changes if question is None]
+    return questions, deleted, cursor, last_id, has_more
+
+
+def snapshot_cursor():
+    # Tam senkronizasyondan sonra kullanılacak imleç
+    return version_clock.now() - int(SYNC_SAFETY_SECONDS * 1_000_000)
+
+
+class QuestionCache:
+    """
+    Sayfa sonuçları için süreç içi önbellek (kategori/zorluk/sayfa parametrelerine göre).
+
+    add_questions yazdıktan sonra invalidate() çağırır; watch() ile Firestore
+    on_snapshot dinleyicisi başka süreçlerden gelen değişiklikleri de yakalar.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=300):
+        self._cache = TTLCache(max_entries, ttl_seconds)
+        self._watch = None
+
+    @staticmethod
+    def _key(params):
+        fields = tuple(params['fields']) if params.get('fields') else None
+        return (params.get('category'), params.get('difficulty'), params.get('view'), fields,
+                params.get('cursor'), params.get('page_size'))
+
+    def get_page(self, db, params):
+        return self._cache.get_or_load(
+            self._key(params), lambda: fetch_questions_page(db, **params))
+
+    async def get_page_async(self, db, params):
+        key = self._key(params)
+        page = self._cache.get(key)
+        if page is None:
+            page = await fetch_questions_page_async(db, **params)
+            self._cache.set(key, page)
+        return page
+
+    def invalidate(self, categories=None):
+        # Kategori verilirse sadece o kategorinin ve filtresiz sayfaların kayıtları silinir
+        if categories is None:
+            return self._cache.invalidate()
+        categories = set(categories)
+        return self._cache.invalidate(lambda key: key[0] is None or key[0] in categories)
+
+    def watch(self, db):
+        collection = db.collection(QUESTIONS_COLLECTION)
+        if self._watch is not None or not hasattr(collection, 'on_snapshot'):
+            return False
+
+        initial = [True]
+
+        def on_change(docs, changes, read_time):
+            # İlk çağrı mevcut durumu bildirir, değişiklik değildir
+            if initial[0]:
+                initial[0] = False
+                return
+            # Güncellemede eski kategori bilinmediği için tüm önbellek temizlenir
+            if changes:
+                self.invalidate()
+
+        self._watch = collection.on_snapshot(on_change)
+        return True
+
+    def stop_watch(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def stats(self):
+        return {**self._cache.stats(), 'watching': self._watch is not None}
+
+
+def parse_page_params(args):
+    try:
+        page_size = int(args.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('page_size must be an integer')
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f'page_size must be between 1 and {MAX_PAGE_SIZE}')
+
+    view = args.get('view', 'full')
+    if view not in VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(VIEWS)}")
+
+    output_format = args.get('format', 'json')
+    if output_format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+    fields = args.get('fields')
+    if fields:
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+
+    return {
+        'page_size': page_size,
+        'cursor': args.get('start_after') or None,
+        'category': args.get('category') or None,
+        'difficulty': args.get('difficulty') or None,
+        'view': view,
+        'fields': fields or None,
+        'format': output_format,
+    }
@@ -0,0 +1,410 @@
+"""
+Cached matrix factorization model for the KarbonSon recommendation API
+"""
+
+import threading
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from item_index import build_item_index
+from metrics import stage
+from trainers import RandomizedSVDTrainer, get_trainer
+
+# top_k_indices'te blok başına hücre sayısı (argpartition indeksleri hücre başına 8 bayt)
+TOP_K_BLOCK_CELLS = 1 << 20
+
+
+class IdMapping:
+    """Dış kimlikleri (user_id, quiz_id) kararlı tamsayı indekslere eşler; indeksler hiç değişmez."""
+
+    def __init__(self, ids=()):
+        self.ids = []
+        self.index = {}
+        for key in ids:
+            self.add(key)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def add(self, key):
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.ids)
+            self.index[key] = idx
+            self.ids.append(key)
+        return idx
+
+    def get(self, key):
+        return self.index.get(key)
+
+    def encode(self, keys):
+        add = self.add
+        return np.fromiter((add(key) for key in keys), dtype=np.int32)
+
+    def copy(self):
+        mapping = IdMapping()
+        mapping.ids = list(self.ids)
+        mapping.index = dict(self.index)
+        return mapping
+
+
+def ratings_to_csr(rows, cols, ratings, shape):
+    # COO dizilerinden toplu CSR; aynı (kullanıcı, quiz) için son puan geçerli
+    from scipy.sparse import coo_matrix
+
+    rows = np.asarray(rows, dtype=np.int32)
+    cols = np.asarray(cols, dtype=np.int32)
+    ratings = np.asarray(ratings, dtype=np.float32)
+    if len(rows):
+        keys = rows.astype(np.int64) * shape[1] + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+        rows, cols, ratings = rows[keep], cols[keep], ratings[keep]
+    return coo_matrix((ratings, (rows, cols)), shape=shape).tocsr()
+
+
+def columns_to_csr(parts):
+    """
+    Sütunlu geçmiş parçalarından (ör. mmap'li anlık görüntü + log kuyruğu) CSR puan
+    matrisi; kodlar sözlüğe çevrilmeden ratings_to_csr'a verilir. Son parçanın
+    eşlemeleri öncekilerin kodlarını kapsar. (matris, kullanıcı_eşlemesi, quiz_eşlemesi) döndürür.
+    """
+    user_mapping, quiz_mapping = parts[-1].user_mapping, parts[-1].quiz_mapping
+    rows, cols, ratings = (np.concatenate([getattr(part, name) for part in parts])
+                           for name in ('user_codes', 'quiz_codes', 'ratings'))
+    matrix = ratings_to_csr(rows, cols, ratings, (len(user_mapping), len(quiz_mapping)))
+    return matrix, user_mapping, quiz_mapping
+
+
+def build_rating_matrix(history, user_mapping=None, quiz_mapping=None, base=None):
+    """
+    Kullanıcı-quiz matrisi: bellek kullanımı puan sayısıyla ölçeklenir.
+
+    base: columns_to_csr çıktısı; verilirse puanları history'den önce gelir, kodları
+    verilen eşlemelere vektörel olarak çevrilir.
+    """
+    user_mapping = user_mapping.copy() if user_mapping is not None else IdMapping()
+    quiz_mapping = quiz_mapping.copy() if quiz_mapping is not None else IdMapping()
+
+    base_rows, base_cols, base_ratings = [], [], []
+    if base is not None:
+        base_matrix, base_users, base_quizzes = base
+        coo = base_matrix.tocoo()
+        base_rows = user_mapping.encode(base_users.ids)[coo.row]
+        base_cols = quiz_mapping.encode(base_quizzes.ids)[coo.col]
+        base_ratings = coo.data
+
+    for user in history:
+        user_mapping.add(user)
+    counts = [len(quizzes) for quizzes in history.values()]
+    rows = np.repeat(user_mapping.encode(history.keys()), counts)
+    cols = quiz_mapping.encode(quiz["quiz_id"] for quizzes in history.values() for quiz in quizzes)
+    ratings = np.fromiter(
+        (quiz["rating"] for quizzes in history.values() for quiz in quizzes), dtype=np.float32
+    )
+    if base is not None:
+        rows = np.concatenate([base_rows, rows])
+        cols = np.concatenate([base_cols, cols])
+        ratings = np.concatenate([base_ratings, ratings])
+
+    matrix = ratings_to_csr(rows, cols, ratings, (len(user_mapping), len(quiz_mapping)))
+    return matrix, user_mapping, quiz_mapping
+
+
+class FactorModel:
+    """Eğitilmiş kullanıcı/quiz faktörlerinin değişmez anlık görüntüsü."""
+
+    def __init__(self, version, trained_at, user_mapping, quiz_mapping, ratings, user_factors,
+                 quiz_factors, trainer=None):
+        self.version = version
+        # version süreç içi bir sayaçtır; model_id her eğitimde rastgele üretilir, yeniden
+        # başlatma ya da başka bir işçideki modelle çakışmaz (ETag ve önbellek anahtarı için)
+        self.model_id = uuid.uuid4().hex[:16]
+        self.trained_at = trained_at
+        self.user_ids = user_mapping.ids
+        self.quiz_ids = quiz_mapping.ids
+        self.user_index = user_mapping.index
+        self.quiz_index = quiz_mapping.index
+        self.user_mapping = user_mapping
+        self.quiz_mapping = quiz_mapping
+        self.ratings = ratings
+        self.user_factors = user_factors
+        self.quiz_factors = quiz_factors
+        # Fold-in, modeli eğiten motorun kullanıcı adımıyla yapılır
+        self.trainer = trainer or RandomizedSVDTrainer()
+        self._item_index = None
+
+    @property
+    def is_empty(self):
+        return self.quiz_factors.shape[0] == 0
+
+    @property
+    def item_index(self):
+        # Benzer quiz indeksi; model sürümüne bağlı olduğundan yeniden eğitimle yenilenir
+        if self._item_index is None:
+            self._item_index = build_item_index(self.quiz_factors)
+        return self._item_index
+
+    def fold_in(self, ratings):
+        # Yeni kullanıcı için faktör vektörü, yeniden eğitim yapılmadan
+        known = [(self.quiz_index[quiz_id], rating) for quiz_id, rating in ratings.items()
+                 if quiz_id in self.quiz_index]
+        if not known:
+            return np.zeros(self.quiz_factors.shape[1])
+        indices, values = zip(*known)
+        return self.trainer.fold_in(self.quiz_factors, list(indices), values)
+
+
+def empty_model(version=0, user_mapping=None, quiz_mapping=None):
+    from scipy.sparse import csr_matrix
+
+    user_mapping = user_mapping or IdMapping()
+    quiz_mapping = quiz_mapping or IdMapping()
+    ratings = csr_matrix((len(user_mapping), len(quiz_mapping)), dtype=np.float32)
+    return FactorModel(version, None, user_mapping, quiz_mapping, ratings,
+                       np.zeros((len(user_mapping), 0)), np.zeros((0, 0)))
+
+
+def fit_factor_model(history, version, n_components=5, user_mapping=None, quiz_mapping=None,
+                     trainer=None, base=None):
+    trainer = trainer or RandomizedSVDTrainer()
+    with stage('matrix_build'):
+        matrix, user_mapping, quiz_mapping = build_rating_matrix(history, user_mapping, quiz_mapping,
+                                                                 base)
+
+    n_components = min(n_components, min(matrix.shape) - 1)
+    if n_components < 1:
+        return empty_model(version, user_mapping, quiz_mapping)
+
+    # Matris ayrıştırma seçilen motorla yapılır (varsayılan randomized SVD), seyrek matris doğrudan verilir
+    with stage('model_fit'):
+        user_factors, quiz_factors = trainer.fit(matrix, n_components)
+
+    return FactorModel(version, datetime.now(), user_mapping, quiz_mapping, matrix,
+                       user_factors, quiz_factors, trainer)
+
+
+def top_k_indices(scores, k, excluded=None, allowed=None):
+    """
+    Her satır için en yüksek puanlı k sütunu azalan sırada döndürür.
+
+    scores: (kullanıcı, quiz) puan matrisi; excluded: dışlanacak hücreler (bool ya da
+    seyrek matris); allowed: quiz başına izin maskesi (ör. kategori filtresi).
+    Ondalıklı bir dizi verilirse maskeler yerinde uygulanır (dışlanan hücreler -inf olur);
+    seçim satır bloklarında yapıldığından ek bellek TOP_K_BLOCK_CELLS ile sınırlıdır.
+    """
+    from scipy.sparse import issparse
+
+    scores = np.asarray(scores)
+    if not np.issubdtype(scores.dtype, np.floating):
+        scores = scores.astype(np.float64)
+    if scores.ndim == 1:
+        scores = scores[None, :]
+    if excluded is not None:
+        if issparse(excluded):
+            rows, cols = excluded.nonzero()
+            scores[rows, cols] = -np.inf
+        else:
+            scores[np.array(excluded, dtype=bool, ndmin=2)] = -np.inf
+    if allowed is not None:
+        scores[:, ~np.asarray(allowed, dtype=bool)] = -np.inf
+
+    n_items = scores.shape[1]
+    k = min(k, n_items)
+    if k <= 0:
+        return [np.array([], dtype=np.intp) for _ in range(scores.shape[0])]
+
+    # O(n) seçim, sadece seçilen k eleman sıralanır; argpartition'ın indeks dizisi blok kadardır
+    results = []
+    block_rows = max(1, TOP_K_BLOCK_CELLS // n_items)
+    for start in range(0, scores.shape[0], block_rows):
+        block = scores[start:start + block_rows]
+        candidates = np.argpartition(np.negative(block, order='C'), k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        ranked = np.take_along_axis(candidates, order, axis=1)
+        ranked_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        results.extend(row[np.isfinite(row_scores)]
+                       for row, row_scores in zip(ranked, ranked_scores))
+    return results
+
+
+class ModelStore:
+    """
+    Faktör modelini bir kez eğitip bellekte tutar.
+
+    Yeni puanlar fold-in ile kullanıcının faktör vektörüne hemen yansıtılır;
+    yeni quizler ve faktörlerin kendisi ise periyodik yeniden eğitimle güncellenir.
+
+    load_history user_quiz_data biçiminde bir sözlük ya da RatingColumns parçaları
+    (olay log'u) döndürür. Parçalar sözlüğe çevrilmez: bir kez seyrek taban matrise
+    dönüştürülür, süreçte gelen puanlar ayrıca kullanıcı başına tutulur.
+    """
+
+    def __init__(self, load_history, n_components=5, trainer=None):
+        self._load_history = load_history
+        self._n_components = n_components
+        self._trainer = trainer if trainer is not None else get_trainer()
+        self._lock = threading.RLock()
+        self._history = None
+        self._base = None
+        self._model = None
+        self._user_overrides = {}
+        self._pending_ratings = 0
+        # Kullanıcı başına puan revizyonu (yanıt önbelleği anahtarı için); sayaç yerine
+        # rastgele belirteç tutulur, farklı süreçlerdeki revizyonlar aynı değeri almaz
+        self._revisions = {}
+        self._refit_thread = None
+        self._stop_event = threading.Event()
+
+    def _ensure_loaded(self):
+        if self._history is None:
+            with self._lock:
+                if self._history is None:
+                    with stage('history_load'):
+                        history = self._load_history()
+                        if isinstance(history, dict):
+                            self._history = {user: list(quizzes) for user, quizzes in history.items()}
+                        else:
+                            self._base = columns_to_csr(history)
+                            self._history = {}
+
+    def get_model(self):
+        model = self._model
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    self.train()
+                model = self._model
+        return model
+
+    def current_model(self):
+        # Eğitimi tetiklemeden mevcut model (henüz eğitilmediyse None); /metrics için
+        return self._model
+
+    def train(self):
+        self._ensure_loaded()
+        with self._lock:
+            history = {user: list(quizzes) for user, quizzes in self._history.items()}
+            pending = self._pending_ratings
+            version = self._model.version + 1 if self._model is not None else 1
+
+        previous = self._model
+        model = fit_factor_model(
+            history, version, self._n_components,
+            previous.user_mapping if previous is not None else None,
+            previous.quiz_mapping if previous is not None else None,
+            self._trainer, self._base,
+        )
+        if not model.is_empty:
+            # İndeksi yayınlamadan önce kur; istekler hiçbir zaman eski indeksi görmez
+            model.item_index
+
+        with self._lock:
+            self._model = model
+            self._user_overrides = {}
+            self._pending_ratings -= pending
+            # Eğitim sırasında gelen puanları yeni modele tekrar uygula
+            for user_id in list(self._history):
+                if len(self._history[user_id]) != len(history.get(user_id, [])):
+                    self._user_overrides[user_id] = model.fold_in(self._ratings_of(user_id))
+        return model
+
+    def get_history(self, user_id):
+        self._ensure_loaded()
+        with self._lock:
+            return self._base_history(user_id) + list(self._history.get(user_id, []))
+
+    def _base_history(self, user_id):
+        # Taban matristeki satır (quiz başına son puan); yalnızca log'dan yüklenen geçmişte
+        if self._base is None:
+            return []
+        matrix, user_mapping, quiz_mapping = self._base
+        user_idx = user_mapping.get(user_id)
+        if user_idx is None:
+            return []
+        start, end = matrix.indptr[user_idx], matrix.indptr[user_idx + 1]
+        return [{"quiz_id": quiz_mapping.ids[quiz_idx], "rating": rating}
+                for quiz_idx, rating in zip(matrix.indices[start:end].tolist(),
+                                            matrix.data[start:end].tolist())]
+
+    def _ratings_of(self, user_id):
+        return {quiz["quiz_id"]: quiz["rating"]
+                for quiz in self._base_history(user_id) + self._history.get(user_id, [])}
+
+    def add_ratings(self, user_id, ratings):
+        self._ensure_loaded()
+        model = self.get_model()
+        with self._lock:
+            quizzes = self._history.setdefault(user_id, [])
+            for rating in ratings:
+                quizzes.append(rating)
+            self._pending_ratings += len(ratings)
+            self._revisions[user_id] = uuid.uuid4().hex[:12]
+            self._user_overrides[user_id] = model.fold_in(self._ratings_of(user_id))
+
+    def user_revision(self, user_id):
+        # '0': bu süreçte eğitimden beri puan gelmedi; sonuç yalnızca modele bağlıdır
+        return self._revisions.get(user_id, '0')
+
+    def user_vector(self, model, user_id):
+        # Önce fold-in ile güncellenmiş vektör, sonra eğitimdeki satır
+        vector = self._user_overrides.get(user_id)
+        if vector is not None and len(vector) == model.quiz_factors.shape[1]:
+            return vector
+        user_idx = model.user_index.get(user_id)
+        if user_idx is not None:
+            return model.user_factors[user_idx]
+        return model.fold_in(self._ratings_of(user_id))
+
+    def rated_indices(self, model, user_id):
+        # Eğitimdeki seyrek satır + eğitimden sonra fold-in ile gelen puanlar
+        user_idx = model.user_index.get(user_id)
+        indices = np.array([], dtype=np.int32)
+        if user_idx is not None and user_idx < model.ratings.shape[0]:
+            indptr = model.ratings.indptr
+            indices = model.ratings.indices[indptr[user_idx]:indptr[user_idx + 1]]
+        if user_idx is None or user_id in self._user_overrides:
+            extra = [model.quiz_index[quiz_id] for quiz_id in self._ratings_of(user_id)
+                     if quiz_id in model.quiz_index]
+            indices = np.union1d(indices, np.asarray(extra, dtype=np.int32))
+        return indices
+
+    def status(self):
+        model = self.get_model()
+        return {
+            "modelVersion": model.version,
+            "modelId": model.model_id,
+            "trainer": model.trainer.name,
+            "lastTrainedAt": model.trained_at.isoformat() if model.trained_at else None,
+            "userCount": len(model.user_ids),
+            "quizCount": len(model.quiz_ids),
+            "pendingRatings": self._pending_ratings,
+        }
+
+    def start_background_refit(self, interval_seconds):
+        if self._refit_thread is not None:
+            return
+
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                if self._pending_ratings > 0:
+                    try:
+                        self.train()
+                    except Exception as e:
+                        print(f"Background model refit failed: {e}")
+
+        self._refit_thread = threading.Thread(target=run, name="model-refit", daemon=True)
+        self._refit_thread.start()
+
+    def stop_background_refit(self):
+        self._stop_event.set()
+        if self._refit_thread is not None:
+            self._refit_thread.join()
+            self._refit_thread = None
+        self._stop_event.clear()
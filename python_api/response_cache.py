@@ -0,0 +1,121 @@
+"""
+Response cache for /recommendations with pluggable storage backends
+"""
+
+import hashlib
+import json
+from urllib.parse import quote
+
+from ttl_cache import TTLCache
+
+
+class InProcessBackend:
+    """Süreç içi LRU + TTL depolama (işçi başına ayrı)."""
+
+    def __init__(self, max_entries=10000, ttl_seconds=600):
+        self._cache = TTLCache(max_entries, ttl_seconds)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def delete_prefix(self, prefix):
+        return self._cache.invalidate(lambda key: key.startswith(prefix))
+
+    def stats(self):
+        return {'backend': 'memory', **self._cache.stats()}
+
+
+class RedisBackend:
+    """
+    Redis uyumlu bir istemci üzerinde (get / set(ex=) / delete / scan_iter) depolama.
+
+    Değerler JSON olarak saklanır; süre aşımı Redis'e bırakılır, LRU tahliyesi
+    sunucunun maxmemory-policy ayarıyla (allkeys-lru) yapılır. Tüm işçiler aynı
+    önbelleği paylaşır.
+    """
+
+    def __init__(self, client, ttl_seconds=600, namespace='recommendations:'):
+        self._client = client
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url, ttl_seconds=600):
+        import redis
+
+        return cls(redis.Redis.from_url(url), ttl_seconds)
+
+    def get(self, key):
+        raw = self._client.get(self.namespace + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self._client.set(self.namespace + key, json.dumps(value, ensure_ascii=False),
+                         ex=self.ttl_seconds)
+
+    def delete_prefix(self, prefix):
+        keys = list(self._client.scan_iter(match=self.namespace + prefix + '*'))
+        if keys:
+            self._client.delete(*keys)
+        return len(keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'ttlSeconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RecommendationCache:
+    """
+    (user_id, model kimliği, kullanıcı revizyonu, parametreler) anahtarlı yanıt önbelleği.
+
+    Model kimliği (eğitim başına rastgele) ve kullanıcının puan revizyonu (rastgele
+    belirteç) anahtarın parçası olduğundan yeniden başlatma, başka işçi, yeniden
+    eğitim ya da /user_data sonrası eski kayıtlara hiç isabet edilmez; ETag de aynı
+    anahtardan türetilir, böylece If-None-Match skorlama yapılmadan yanıtlanır.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def _user_prefix(user_id):
+        # Kullanıcı kimliği kaçışlanır; '|' ve glob karakterleri öneki bozamaz
+        return quote(user_id, safe='') + '|'
+
+    def key(self, user_id, model_id, revision, k, categories):
+        return (f"{self._user_prefix(user_id)}{model_id}|{revision}|{k}|"
+                f"{','.join(sorted(categories or []))}")
+
+    @staticmethod
+    def etag(key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def invalidate_user(self, user_id):
+        return self.backend.delete_prefix(self._user_prefix(user_id))
+
+    def invalidate(self):
+        return self.backend.delete_prefix('')
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the KarbonSon AI API
+
+Runs the Flask app under gunicorn (gthread workers) when it is installed, or
+under a pure-Python pre-forking werkzeug server otherwise. In both modes the
+factor model is trained in the master process before forking, so every worker
+shares the same NumPy factor buffers copy-on-write instead of training its own.
+
+Workers do not share mutable state: fold-in overrides, analytics, caches, the
+question sampler, the leaderboard and the ingestion queue live in each worker
+and only converge through periodic refits/refreshes. The event log has a single
+writer, so EVENT_LOG_DIR requires one worker; leaderboard snapshots are written by
+whichever worker holds the snapshot directory's lock file.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+
+# Süreçler arası kilit olmadan diske yazan bileşenler; dizin başına tek yazıcı süreç desteklenir
+PERSISTENT_DIRS = ('EVENT_LOG_DIR',)
+
+
+def preload(app_module):
+    # Modeli ve türetilmiş indeksleri fork'tan önce yükle
+    services = app_module.current_services(app_module.app)
+    model = services.model_store.get_model()
+    services.analytics_store.build()
+    services.friend_store.get_graph()
+    services.leaderboard_store.get_board()
+    # Mevcut nesneleri GC'den çıkar; referans sayacı dışındaki sayfalar paylaşılmış kalır
+    gc.freeze()
+    print(f"Model v{model.version} loaded: {len(model.user_ids)} users, {len(model.quiz_ids)} quizzes")
+
+
+def post_fork(app_module):
+    # İş parçacıkları fork'ta kopyalanmaz; her işçide arka plan işleri yeniden başlar
+    services = app_module.current_services(app_module.app)
+    services.model_store.start_background_refit(
+        int(os.environ.get('MODEL_REFIT_INTERVAL', 300)))
+    services.friend_store.start_background_refresh(
+        int(os.environ.get('FRIEND_GRAPH_REFRESH_INTERVAL', 600)))
+    # Anlık görüntüyü dizin kilidini alan tek süreç yazar; LEADERBOARD_SNAPSHOT_DIR yoksa başlamaz
+    services.leaderboard_store.start_background_snapshots(
+        int(os.environ.get('LEADERBOARD_SNAPSHOT_INTERVAL', 60)))
+
+
+def run_gunicorn(app_module, host, port, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('preload_app', True)
+            self.cfg.set('post_fork', lambda server, worker: post_fork(app_module))
+
+        def load(self):
+            return app_module.app
+
+    Application().run()
+
+
+def run_prefork(app_module, host, port, workers, threads):
+    from werkzeug.serving import make_server
+
+    # Soket master'da açılır, işçiler aynı dinleyici soketi paylaşır
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    def serve():
+        post_fork(app_module)
+        server = make_server(host, port, app_module.app, threaded=threads > 1, fd=sock.fileno())
+        server.serve_forever()
+
+    if workers <= 1:
+        serve()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                serve()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def shutdown(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    print(f"Serving on http://{host}:{port} with {workers} pre-forked workers")
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the AI API with a multi-worker server")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', 5001)))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (WEB_WORKERS, default: CPU count, or 1 with on-disk state)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get('WEB_THREADS', 8)))
+    parser.add_argument("--io-threads", type=int, default=None,
+                        help="concurrent Firestore batch commits per worker when writing questions "
+                             "(FIRESTORE_IO_THREADS); reads are not pooled")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "prefork"), default="auto")
+    args = parser.parse_args(argv)
+
+    # Olay log'u süreçler arası kilit olmadan yazılır; birden fazla işçi aynı dizinde
+    # birbirinin segmentlerini ezer
+    persistent = [name for name in PERSISTENT_DIRS if os.environ.get(name)]
+    if args.workers is None:
+        args.workers = int(os.environ.get('WEB_WORKERS', 1 if persistent else os.cpu_count() or 1))
+    if args.workers > 1 and persistent:
+        parser.error(f"{', '.join(persistent)} supports a single writer; run with --workers 1")
+
+    # ai_api.DEFAULT_CONFIG içe aktarılırken okunur; create_app ayarına böyle ulaşır
+    if args.io_threads is not None:
+        os.environ['FIRESTORE_IO_THREADS'] = str(args.io_threads)
+
+    import ai_api
+    preload(ai_api)
+
+    server = args.server
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401
+            server = "gunicorn"
+        except ImportError:
+            server = "prefork"
+
+    if server == "gunicorn":
+        run_gunicorn(ai_api, args.host, args.port, args.workers, args.threads)
+    else:
+        run_prefork(ai_api, args.host, args.port, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,50 @@
 import pytest
 import json
-from ai_api import app
+import ai_api
+from ai_api import create_app, current_services
+from fake_firestore import FakeAsyncFirestoreClient, FakeFirestoreClient
 
 @pytest.fixture
-def client():
-    app.config['TESTING'] = True
+def app():
+    # Her test kendi uygulamasını ve depolarını (model, önbellekler, kuyruk) alır
+    test_app = create_app({'TESTING': True})
+    yield test_app
+    current_services(test_app).close()
+
+@pytest.fixture
+def services(app):
+    return current_services(app)
+
+@pytest.fixture
+def client(app):
     with app.test_client() as client:
         yield client
 
+@pytest.fixture
+def fake_db(services):
+    db = FakeFirestoreClient()
+    services.db = db
+    return db
+
+@pytest.fixture
+def fake_async_db(services, fake_db):
+    # Async istemci sahte senkron istemciyle aynı veriyi paylaşır
+    async_db = FakeAsyncFirestoreClient(fake_db)
+    services.async_db = async_db
+    return async_db
+
+def seed_questions(db, count, category='Coğrafya', difficulty='easy'):
+    for i in range(count):
+        db.collection('questions').document(f'q{i:05d}').set({
+            'text': f'Soru {i}',
+            'options': [{'text': 'A', 'score': 10, 'feedback': 'Doğru!'}],
+            'category': category if i % 2 == 0 else 'Tarih',
+            'difficulty': difficulty,
+            'explanation': 'Açıklama',
+            'tags': ['etiket'],
+        })
+    db.reset_counters()
+
 def test_recommendations_endpoint(client):
     # Test that the recommendations endpoint returns the expected response
     response = client.get('/recommendations?user_id=user1')
@@ -40,8 +77,796 @@ def test_user_data_endpoint(client):
     response = client.post('/user_data', 
                            json=test_data,
                            content_type='application/json')
-    assert response.status_code == 200
+    assert response.status_code == 202
     
     data = json.loads(response.data)
     assert 'status' in data
-    assert data['status'] == 'success'
+    assert data['status'] == 'accepted'
+
+def test_model_status_endpoint(client):
+    # Test that the model store exposes version and last training time
+    response = client.get('/model/status')
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    assert data['modelVersion'] >= 1
+    assert data['lastTrainedAt'] is not None
+
+def test_recommendations_use_cached_model(client):
+    # Test that consecutive requests reuse the same trained model
+    first = json.loads(client.get('/recommendations?user_id=user1').data)
+    second = json.loads(client.get('/recommendations?user_id=user1').data)
+    assert first['modelVersion'] == second['modelVersion']
+    assert first['recommendations'] == second['recommendations']
+
+def test_recommendations_exclude_rated_quizzes(client):
+    # Test that the requested user's own quizzes are not recommended
+    data = json.loads(client.get('/recommendations?user_id=user2').data)
+    quiz_ids = {rec['quizId'] for rec in data['recommendations']}
+    assert quiz_ids.isdisjoint({'quiz1', 'quiz4', 'quiz5'})
+
+def test_new_ratings_are_folded_in(client, services):
+    # Test that ratings submitted via /user_data are used without retraining
+    version = json.loads(client.get('/model/status').data)['modelVersion']
+    client.post('/user_data', json={
+        "userId": "fold_in_user",
+        "quizHistory": [{"quizId": "quiz1", "rating": 5}]
+    })
+    services.ingestion_queue.flush()
+
+    data = json.loads(client.get('/recommendations?user_id=fold_in_user').data)
+    assert data['modelVersion'] == version
+    assert 'quiz1' not in {rec['quizId'] for rec in data['recommendations']}
+    assert len(data['recommendations']) > 0
+
+def test_recommendations_k_parameter(client):
+    # Test that k controls how many recommendations are returned
+    data = json.loads(client.get('/recommendations?user_id=user1&k=2').data)
+    assert len(data['recommendations']) == 2
+    scores = [rec['confidenceScore'] for rec in data['recommendations']]
+    assert scores == sorted(scores, reverse=True)
+
+def test_recommendations_category_filter(client):
+    # Test that category filters restrict the candidate quizzes
+    data = json.loads(client.get('/recommendations?user_id=user1&category=Tarih').data)
+    assert all(rec['category'] == 'Tarih' for rec in data['recommendations'])
+
+def test_recommendations_invalid_k(client):
+    # Test that an invalid k is rejected
+    response = client.get('/recommendations?user_id=user1&k=abc')
+    assert response.status_code == 400
+
+def test_batch_recommendations_stream_ndjson(client):
+    # Test that the batch endpoint streams one NDJSON line per user
+    response = client.post('/recommendations/batch',
+                           json={"userIds": ["user1", "user2", "unknown_user"], "k": 2})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+    assert [line['userId'] for line in lines] == ["user1", "user2", "unknown_user"]
+    assert len(lines[2]['recommendations']) == 2
+
+def test_recommendations_cold_start_ranks_by_popularity(client):
+    # Test that users without history get the most played quizzes, optionally per category
+    data = json.loads(client.get('/recommendations?user_id=brand_new_user&k=2').data)
+    assert [rec['quizId'] for rec in data['recommendations']] == ['quiz1', 'quiz2']
+    assert all(rec['reason'] == ai_api.POPULAR_REASON for rec in data['recommendations'])
+
+    data = json.loads(client.get('/recommendations?user_id=brand_new_user&category=Matematik').data)
+    assert [rec['quizId'] for rec in data['recommendations']] == ['quiz3', 'quiz6']
+
+def test_recommendations_include_unrated_quizzes_by_content(client, services):
+    # Test that a quiz nobody has rated yet is recommended through its content features
+    services.quiz_metadata = {**services.quiz_metadata, 'quiz_new': {
+        "title": "Yeni Cebir", "category": "Matematik", "difficulty": "Zor", "tags": ["cebir"]}}
+    data = json.loads(client.get('/recommendations?user_id=user3&category=Matematik').data)
+    assert 'quiz_new' in {rec['quizId'] for rec in data['recommendations']}
+
+def test_batch_recommendations_match_single_route(client):
+    # Test that batch results are identical to the single-user route
+    response = client.post('/recommendations/batch', json={"userIds": ["user1", "user3"]})
+    lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+    for line in lines:
+        single = json.loads(client.get(f"/recommendations?user_id={line['userId']}").data)
+        assert line['recommendations'] == single['recommendations']
+
+def test_batch_scoring_chunks_follow_memory_budget(services, monkeypatch):
+    # Test that a small score budget splits users into smaller chunks without changing results
+    user_ids = ['user1', 'user2', 'user3']
+    expected = ai_api.generate_recommendations_batch(services, user_ids)
+    monkeypatch.setattr(ai_api, 'BATCH_SCORE_BUDGET', 1)
+    assert ai_api.score_chunk_size(100000) == 1
+    assert ai_api.generate_recommendations_batch(services, user_ids) == expected
+    assert ai_api.score_chunk_size(10) == 1
+    monkeypatch.setattr(ai_api, 'BATCH_SCORE_BUDGET', 4 * 100000 * 300)
+    assert ai_api.score_chunk_size(100000) == 300
+
+def test_batch_recommendations_requires_user_ids(client):
+    # Test that a missing userIds list is rejected
+    response = client.post('/recommendations/batch', json={"users": "user1"})
+    assert response.status_code == 400
+
+def test_similar_quizzes_endpoint(client):
+    # Test that similar quizzes are returned without the queried quiz itself
+    response = client.get('/similar_quizzes?quiz_id=quiz1&k=3')
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    quiz_ids = [quiz['quizId'] for quiz in data['similarQuizzes']]
+    assert 'quiz1' not in quiz_ids
+    assert 0 < len(quiz_ids) <= 3
+
+def test_similar_quizzes_unknown_quiz(client):
+    # Test that an unknown quiz id returns 404
+    response = client.get('/similar_quizzes?quiz_id=missing_quiz')
+    assert response.status_code == 404
+
+def test_get_questions_paginates_with_cursor(client, fake_db):
+    # Test that pages follow next_cursor until the collection is exhausted
+    seed_questions(fake_db, 25)
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/get_questions?page_size=10' + (f'&start_after={cursor}' if cursor else '')
+        data = json.loads(client.get(url).data)
+        seen.extend(q['id'] for q in data['questions'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+def test_get_questions_filters_and_list_view(client, fake_db):
+    # Test that filters are applied and list view drops explanation and option feedback
+    seed_questions(fake_db, 10)
+    data = json.loads(client.get('/get_questions?category=Tarih&view=list').data)
+
+    assert data['count'] == 5
+    for question in data['questions']:
+        assert question['category'] == 'Tarih'
+        assert 'explanation' not in question
+        assert all('feedback' not in option for option in question['options'])
+
+def test_get_questions_reads_are_independent_of_collection_size(client, services, fake_db):
+    # Test that one page reads a constant number of documents however large the bank is
+    reads = []
+    for size in (50, 2000):
+        fake_db._data.clear()
+        services.question_cache.invalidate()
+        seed_questions(fake_db, size)
+        client.get('/get_questions?page_size=20')
+        reads.append(fake_db.document_reads)
+
+    assert reads[0] == reads[1] == 21
+
+def test_get_questions_invalid_page_size(client, fake_db):
+    # Test that an out-of-range page size is rejected
+    response = client.get('/get_questions?page_size=0')
+    assert response.status_code == 400
+
+def test_get_questions_ndjson_streams_whole_bank(client, fake_db):
+    # Test that the NDJSON export returns every document, one per line
+    seed_questions(fake_db, 250)
+    response = client.get('/get_questions?format=ndjson&view=list')
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = response.data.decode('utf-8').splitlines()
+    assert len(lines) == 250
+    assert 'explanation' not in json.loads(lines[0])
+
+def test_get_questions_ndjson_gzip(client, fake_db):
+    # Test that the gzip-compressed stream decompresses to the same NDJSON lines
+    import gzip
+    seed_questions(fake_db, 30)
+    response = client.get('/get_questions?format=ndjson&gzip=1')
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+    assert len(lines) == 30
+
+def test_get_questions_ndjson_respects_accept_encoding_quality(client, fake_db):
+    # Test that the stream is gzipped only when the client accepts gzip with a non-zero quality
+    seed_questions(fake_db, 3)
+    response = client.get('/get_questions?format=ndjson', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.data.decode('utf-8').splitlines()) == 3
+
+    response = client.get('/get_questions?format=ndjson',
+                          headers={'Accept-Encoding': 'deflate, gzip;q=0.5'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+def test_get_questions_ndjson_reads_lazily(client, fake_db):
+    # Test that the first chunk is sent before the rest of the collection is read
+    seed_questions(fake_db, 1000)
+    response = client.get('/get_questions?format=ndjson', buffered=False)
+
+    first_chunk = next(iter(response.response))
+    assert json.loads(first_chunk)['id'] == 'q00000'
+    assert fake_db.document_reads < 10
+    response.close()
+
+def test_add_questions_uses_write_batches(client, services, fake_db):
+    # Test that questions are written in chunks of at most 500 per round trip
+    questions = [{'text': f'Soru {i}', 'category': 'Tarih'} for i in range(1200)]
+    # Kopya indeksinin ilk yüklemesi (bankanın okunması) ölçüme dahil edilmez
+    services.duplicate_detector.get_index()
+    fake_db.reset_counters()
+    response = client.post('/add_questions', json=questions)
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    assert len(data['questions']) == 1200
+    assert all(result['status'] == 'success' for result in data['results'])
+    assert fake_db.round_trips == 3
+    assert len(fake_db._data['questions']) == 1200
+
+def test_add_questions_reports_per_item_failures(client, fake_db):
+    # Test that a failed chunk and invalid items are reported without hiding the successes
+    fake_db.fail_commits = 1
+    questions = [{'text': f'Soru {i}'} for i in range(600)] + ['not a question']
+    response = client.post('/add_questions', json=questions)
+    assert response.status_code == 207
+
+    data = json.loads(response.data)
+    statuses = [result['status'] for result in data['results']]
+    assert statuses.count('success') + statuses.count('error') == 601
+    assert data['results'][-1]['status'] == 'error'
+    assert len(fake_db._data['questions']) == statuses.count('success')
+
+def test_get_questions_served_from_cache(client, services, fake_db):
+    # Test that a repeated page request does not hit Firestore again
+    seed_questions(fake_db, 10)
+    hits = services.question_cache.stats()['hits']
+
+    first = json.loads(client.get('/get_questions?category=Tarih').data)
+    reads = fake_db.document_reads
+    second = json.loads(client.get('/get_questions?category=Tarih').data)
+
+    assert first == second
+    assert fake_db.document_reads == reads
+    assert services.question_cache.stats()['hits'] == hits + 1
+
+def test_add_questions_invalidates_cache(client, fake_db):
+    # Test that newly added questions are visible on the next cached read
+    seed_questions(fake_db, 4)
+    before = json.loads(client.get('/get_questions?category=Tarih').data)['count']
+
+    client.post('/add_questions', json=[{'text': 'Yeni soru', 'category': 'Tarih'}])
+    after = json.loads(client.get('/get_questions?category=Tarih').data)['count']
+    assert after == before + 1
+
+def test_question_cache_stats_endpoint(client):
+    # Test that cache counters are exposed for tuning
+    data = json.loads(client.get('/questions/cache').data)
+    for key in ('hits', 'misses', 'evictions', 'entries'):
+        assert key in data
+
+def test_question_cache_invalidated_by_snapshot_listener(client, services, fake_db):
+    # Test that writes from another process (seen via on_snapshot) clear the cache
+    seed_questions(fake_db, 4)
+    assert services.question_cache.watch(fake_db)
+    try:
+        client.get('/get_questions')
+        assert services.question_cache.stats()['entries'] == 1
+
+        fake_db.collection('questions').document('external').set({'text': 'Dışarıdan'})
+        assert services.question_cache.stats()['entries'] == 0
+    finally:
+        services.question_cache.stop_watch()
+
+def test_analyze_uses_rating_history(client):
+    # Test that the analysis is computed from the user's quiz history
+    data = json.loads(client.get('/analyze?user_id=user3').data)
+    assert data['avgScore'] == pytest.approx((5 + 4 + 5) / 3, abs=0.01)
+    assert data['lastActive'] == '2025-01-17T11:30:00'
+    assert set(data['preferredCategories']) <= {'Tarih', 'Matematik'}
+
+def test_analyze_updates_incrementally_from_user_data(client, services):
+    # Test that submitted events are reflected in the next analysis
+    client.post('/user_data', json={
+        "userId": "analytics_user",
+        "quizHistory": [
+            {"quizId": "quiz2", "rating": 4, "timeSpentSeconds": 600},
+            {"quizId": "quiz5", "rating": 2, "timeSpentSeconds": 300}
+        ]
+    })
+    services.ingestion_queue.flush()
+
+    data = json.loads(client.get('/analyze?user_id=analytics_user').data)
+    assert data['avgScore'] == 3.0
+    assert data['preferredCategories'] == ['Tarih']
+    assert data['timeSpent'] == '15 dakika'
+    assert data['quizCount'] == 2
+
+def test_user_data_rejects_invalid_payload(client):
+    # Test that malformed events are rejected before they are queued
+    response = client.post('/user_data', json={"userId": "u", "quizHistory": [{"quizId": "quiz1"}]})
+    assert response.status_code == 400
+
+def test_user_data_backpressure(client, services, monkeypatch):
+    # Test that a full ingestion queue answers 429 instead of blocking
+    from ingest import IngestionQueue
+    full_queue = IngestionQueue([], max_size=1)
+    monkeypatch.setattr(full_queue, '_ensure_worker', lambda: None)
+    services.ingestion_queue = full_queue
+
+    payload = {"userId": "u", "quizHistory": [{"quizId": "quiz1", "rating": 5}]}
+    assert client.post('/user_data', json=payload).status_code == 202
+    response = client.post('/user_data', json=payload)
+    assert response.status_code == 429
+    assert full_queue.metrics()['rejected'] == 1
+
+def test_user_data_events_are_persisted(client, services, fake_db):
+    # Test that flushed events are written to the user_events collection
+    client.post('/user_data', json={"userId": "persist_user",
+                                    "quizHistory": [{"quizId": "quiz3", "rating": 4}]})
+    services.ingestion_queue.flush()
+
+    stored = list(fake_db._data['user_events'].values())
+    assert stored[0]['userId'] == 'persist_user'
+    assert json.loads(client.get('/user_data/metrics').data)['queueDepth'] == 0
+
+def test_import_does_not_load_heavy_dependencies():
+    # Test that importing ai_api leaves pandas/sklearn/scipy/firebase_admin for first use
+    from benchmark_startup import heavy_imports, import_profile
+    assert heavy_imports(import_profile('ai_api')) == []
+
+def test_create_app_uses_configured_firestore_client():
+    # Test that create_app wires an injected Firestore client without initializing Firebase
+    db = FakeFirestoreClient()
+    seed_questions(db, 3)
+    test_app = create_app({'TESTING': True, 'FIRESTORE_CLIENT': db})
+
+    response = test_app.test_client().get('/get_questions')
+    assert response.status_code == 200
+    assert json.loads(response.data)['count'] == 3
+    assert current_services(test_app).get_db() is db
+    current_services(test_app).close()
+
+def test_empty_event_log_is_seeded_from_existing_history(tmp_path):
+    # Test that switching on the event log keeps the existing rating history on first boot
+    config = {'TESTING': True, 'EVENT_LOG_DIR': str(tmp_path)}
+    for _ in range(2):
+        app = create_app(config)
+        services = current_services(app)
+        assert [q['quiz_id'] for q in services.model_store.get_history('user1')] == \
+            ['quiz1', 'quiz2', 'quiz3']
+        assert services.analytics_store.get('user1')['quizCount'] == 3
+        services.close()
+
+def test_create_app_instances_do_not_share_state():
+    # Test that two apps in one process keep separate clients, caches, queues and leaderboards
+    first_db, second_db = FakeFirestoreClient(), FakeFirestoreClient()
+    seed_questions(first_db, 3)
+    seed_questions(second_db, 5)
+    first = create_app({'TESTING': True, 'FIRESTORE_CLIENT': first_db})
+    second = create_app({'TESTING': True, 'FIRESTORE_CLIENT': second_db})
+    try:
+        assert json.loads(first.test_client().get('/get_questions').data)['count'] == 3
+        assert json.loads(second.test_client().get('/get_questions').data)['count'] == 5
+
+        first.test_client().post('/leaderboard/events', json=[
+            {'userId': 'user5', 'metric': 'duelWins', 'value': 99}])
+        first.test_client().post('/user_data', json={
+            'userId': 'isolated_user', 'quizHistory': [{'quizId': 'quiz1', 'rating': 5}]})
+        current_services(first).ingestion_queue.flush()
+
+        rank = json.loads(second.test_client().get(
+            '/leaderboard/rank?user_id=user5&metric=duelWins').data)
+        assert rank['ranks']['duelWins'] is None
+        rank = json.loads(first.test_client().get(
+            '/leaderboard/rank?user_id=user5&metric=duelWins').data)
+        assert rank['ranks']['duelWins']['score'] == 99
+        assert current_services(second).model_store.get_history('isolated_user') == []
+        assert current_services(first).model_store.get_history('isolated_user')
+        assert current_services(second).question_cache.stats()['entries'] == 1
+    finally:
+        current_services(first).close()
+        current_services(second).close()
+
+def test_async_get_questions_page_matches_sync_route(client, services, fake_db, fake_async_db):
+    # Test that the async question route returns the same page and cursor as /get_questions
+    seed_questions(fake_db, 25)
+    expected = json.loads(client.get('/get_questions?page_size=10&view=list').data)
+    services.question_cache.invalidate()
+
+    data = json.loads(client.get('/async/get_questions?page_size=10&view=list').data)
+    assert data['questions'] == expected['questions']
+    assert data['next_cursor'] == expected['next_cursor']
+
+def test_async_get_questions_by_ids_fans_out(client, fake_db, fake_async_db):
+    # Test that ids are fetched with concurrent get_all calls in request order
+    seed_questions(fake_db, 250)
+    fake_async_db.latency = 0.01
+    ids = [f'q{i:05d}' for i in range(249, -1, -1)] + ['missing']
+
+    response = client.get('/async/get_questions?ids=' + ','.join(ids))
+    data = json.loads(response.data)
+    assert response.status_code == 200
+    assert [question['id'] for question in data['questions']] == ids[:-1]
+    assert data['missing'] == ['missing']
+    assert fake_async_db.round_trips == 3
+    assert fake_async_db.max_in_flight == 3
+
+def test_async_add_questions_commits_batches_concurrently(client, services, fake_db, fake_async_db):
+    # Test that the async add route writes 500-question batches concurrently
+    fake_async_db.latency = 0.01
+    questions = [{'text': f'Soru {i}', 'category': 'Genel'} for i in range(1200)]
+    services.duplicate_detector.get_index()
+    fake_db.reset_counters()
+
+    response = client.post('/async/add_questions', json=questions)
+    assert response.status_code == 200
+    assert fake_async_db.round_trips == 3
+    assert fake_async_db.max_in_flight == 3
+    assert len(fake_db._data['questions']) == 1200
+
+def test_io_threads_config_limits_write_concurrency():
+    # Test that FIRESTORE_IO_THREADS from the app config bounds both question write paths
+    db = FakeFirestoreClient()
+    async_db = FakeAsyncFirestoreClient(db, latency=0.01)
+    test_app = create_app({'TESTING': True, 'FIRESTORE_CLIENT': db,
+                           'FIRESTORE_ASYNC_CLIENT': async_db, 'FIRESTORE_IO_THREADS': 1})
+    services = current_services(test_app)
+    try:
+        client = test_app.test_client()
+        questions = [{'text': f'Soru {i}', 'category': 'Genel'} for i in range(1200)]
+        response = client.post('/add_questions?on_duplicate=allow', json=questions)
+        assert response.status_code == 200
+        assert services.io_executor()._max_workers == 1
+
+        db.reset_counters()
+        response = client.post('/async/add_questions?on_duplicate=allow', json=questions)
+        assert response.status_code == 200
+        assert async_db.round_trips == 3
+        assert async_db.max_in_flight == 1
+    finally:
+        services.close()
+
+def test_async_add_questions_reports_failed_batch(client, fake_db, fake_async_db):
+    # Test that a failed async commit only marks its own batch as failed
+    fake_db.fail_commits = 1
+    questions = [{'text': f'Soru {i}', 'category': 'Genel'} for i in range(600)]
+
+    response = client.post('/async/add_questions', json=questions)
+    statuses = [result['status'] for result in json.loads(response.data)['results']]
+    assert response.status_code == 207
+    assert statuses.count('error') in (500, 100)
+
+def test_recommendations_etag_returns_304(client):
+    # Test that a matching If-None-Match skips scoring and returns 304
+    response = client.get('/recommendations?user_id=user1&k=2')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    cached = client.get('/recommendations?user_id=user1&k=2', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    other = client.get('/recommendations?user_id=user1&k=3', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+
+def test_recommendations_etag_not_reused_after_restart(client):
+    # Test that an ETag from a previous process (same model version and revision) is not honoured
+    etag = client.get('/recommendations?user_id=user1&k=2').headers['ETag']
+    restarted = create_app({'TESTING': True})
+    try:
+        response = restarted.test_client().get('/recommendations?user_id=user1&k=2',
+                                               headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert json.loads(response.data)['modelVersion'] == 1
+    finally:
+        current_services(restarted).close()
+
+def test_recommendations_served_from_response_cache(client, monkeypatch):
+    # Test that a repeated request is answered from the cache without scoring
+    first = json.loads(client.get('/recommendations?user_id=user2').data)
+    monkeypatch.setattr(ai_api, 'generate_recommendations',
+                        lambda *args, **kwargs: pytest.fail('scored a cached request'))
+    assert json.loads(client.get('/recommendations?user_id=user2').data) == first
+    assert json.loads(client.get('/recommendations/cache').data)['hits'] >= 1
+
+def test_user_data_invalidates_cached_recommendations(client, services):
+    # Test that new ratings for a user change the ETag and the cached response
+    etag = client.get('/recommendations?user_id=cache_user').headers['ETag']
+    client.post('/user_data', json={"userId": "cache_user",
+                                    "quizHistory": [{"quizId": "quiz1", "rating": 5}]})
+    services.ingestion_queue.flush()
+
+    response = client.get('/recommendations?user_id=cache_user', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'quiz1' not in {rec['quizId'] for rec in json.loads(response.data)['recommendations']}
+
+def test_model_retrain_invalidates_cached_recommendations(client, services):
+    # Test that retraining the model changes the ETag of every cached response
+    etag = client.get('/recommendations?user_id=user3').headers['ETag']
+    services.model_store.train()
+    response = client.get('/recommendations?user_id=user3', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+def test_metrics_endpoint_exposes_route_latency_and_cache_counters(client):
+    # Test that /metrics reports per-route histograms, stage timings and cache counters
+    client.get('/recommendations?user_id=user1')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert ('ai_api_request_duration_seconds_count'
+            '{route="/recommendations",method="GET",status="200"}') in text
+    assert 'ai_api_stage_duration_seconds_count{stage="score"}' in text
+    assert 'ai_api_cache_misses_total{cache="recommendations"}' in text
+    assert 'ai_api_model_version' in text
+
+def test_server_timing_header_lists_stages(client):
+    # Test that recommendation responses break down their time per stage
+    response = client.get('/recommendations?user_id=user1&k=2')
+    timing = response.headers['Server-Timing']
+    for name in ('model_load', 'score', 'top_k', 'serialize', 'total'):
+        assert f'{name};dur=' in timing
+
+def test_profile_header_dumps_pstats_when_enabled(app, client, tmp_path, monkeypatch):
+    # Test that X-Profile writes a pstats file only when header profiling is allowed
+    import pstats
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'PROFILE_MIN_MS', 0)
+
+    monkeypatch.setitem(app.config, 'PROFILE_ALLOW_HEADER', False)
+    response = client.get('/recommendations?user_id=user1', headers={'X-Profile': '1'})
+    assert 'X-Profile' not in response.headers
+    assert not list(tmp_path.iterdir())
+
+    monkeypatch.setitem(app.config, 'PROFILE_ALLOW_HEADER', True)
+    response = client.get('/recommendations?user_id=user1', headers={'X-Profile': '1'})
+    path = tmp_path / response.headers['X-Profile']
+    assert path.exists()
+    assert pstats.Stats(str(path)).total_calls > 0
+
+def test_profile_skips_fast_requests(app, client, tmp_path, monkeypatch):
+    # Test that sampled requests faster than PROFILE_MIN_MS leave no dump behind
+    monkeypatch.setitem(app.config, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'PROFILE_SAMPLE_RATE', 1.0)
+    monkeypatch.setitem(app.config, 'PROFILE_MIN_MS', 60000)
+    response = client.get('/model/status')
+    assert response.status_code == 200
+    assert 'X-Profile' not in response.headers
+    assert not list(tmp_path.iterdir())
+
+def test_friend_suggestions_endpoint(client):
+    # Test that friend suggestions mask friends, blocked users and pending requests
+    response = client.get('/friend_suggestions?user_id=user4&k=5')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    suggestions = data['suggestions']
+    assert suggestions[0]['userId'] == 'user1'
+    assert suggestions[0]['reason'] == 'commonFriends'
+    assert {'user2', 'user3', 'user4', 'user5'}.isdisjoint(s['userId'] for s in suggestions)
+    assert {'nickname', 'score', 'commonFriendsCount', 'totalGamesPlayed'} <= set(suggestions[0])
+
+def test_friend_suggestions_validates_params(client):
+    # Test that missing user_id and out-of-range k are rejected
+    assert client.get('/friend_suggestions').status_code == 400
+    assert client.get('/friend_suggestions?user_id=user1&k=0').status_code == 400
+    assert client.get('/friend_suggestions?user_id=user1&k=x').status_code == 400
+
+@pytest.fixture
+def leaderboard(services):
+    return services.leaderboard_store
+
+def test_leaderboard_pages_and_ranks(client, leaderboard):
+    # Test that leaderboard pages share ranks for ties and the rank endpoint matches them
+    response = client.get('/leaderboard?metric=quizCount&offset=1&limit=2')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['total'] == 6
+    assert [(e['rank'], e['userId'], e['score']) for e in data['entries']] == [
+        (1, 'user3', 42), (3, 'user6', 25)]
+    assert data['entries'][0]['nickname'] == 'Zeynep'
+
+    data = json.loads(client.get('/leaderboard/rank?user_id=user6').data)
+    assert data['ranks']['quizCount'] == {'rank': 3, 'score': 25, 'total': 6}
+    assert set(data['ranks']) == {'quizCount', 'duelWins', 'friendCount', 'longestStreak'}
+    data = json.loads(client.get('/leaderboard/rank?user_id=nobody&metric=duelWins').data)
+    assert data['ranks'] == {'duelWins': None}
+
+def test_leaderboard_events_update_ranks(client, leaderboard):
+    # Test that posted score events move users on the leaderboard without a rebuild
+    response = client.post('/leaderboard/events', json=[
+        {'userId': 'user5', 'metric': 'duelWins', 'delta': 25},
+        {'userId': 'user7', 'metric': 'duelWins', 'value': 10, 'nickname': 'Ece'},
+    ])
+    assert json.loads(response.data) == {'status': 'success', 'applied': 2}
+    entries = json.loads(client.get('/leaderboard?metric=duelWins&limit=3').data)['entries']
+    assert [(e['userId'], e['score']) for e in entries] == [('user5', 26), ('user3', 20), ('user1', 12)]
+    assert json.loads(client.get('/leaderboard/rank?user_id=user7&metric=duelWins').data)[
+        'ranks']['duelWins']['rank'] == 4
+    assert json.loads(client.get('/leaderboard/status').data)['version'] == 2
+
+def test_leaderboard_validates_params(client, leaderboard):
+    # Test that unknown metrics, bad paging and malformed events are rejected
+    assert client.get('/leaderboard?metric=coins').status_code == 400
+    assert client.get('/leaderboard?offset=-1').status_code == 400
+    assert client.get('/leaderboard?limit=0').status_code == 400
+    assert client.get('/leaderboard?limit=x').status_code == 400
+    assert client.get('/leaderboard/rank').status_code == 400
+    for body in ([], {'userId': 'user1'}, [{'userId': 'user1', 'metric': 'coins', 'value': 1}],
+                 [{'userId': 'user1', 'metric': 'quizCount', 'value': 1, 'delta': 1}],
+                 [{'userId': 'user1', 'metric': 'quizCount', 'value': True}],
+                 [{'metric': 'quizCount', 'delta': 1}]):
+        assert client.post('/leaderboard/events', json=body).status_code == 400
+    assert leaderboard.status()['version'] == 0
+
+def test_next_questions_skips_answered_questions(client, services):
+    # Test that /quiz/next_questions never repeats questions reported through /quiz/answers
+    from question_sampler import QuestionSampler
+    from add_sample_questions import sample_questions
+    services.question_sampler = QuestionSampler(lambda: sample_questions, seed=0)
+
+    response = client.get('/quiz/next_questions?user_id=quiz_user&category=Biyoloji&n=2&view=list')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['count'] == 2
+    assert all(question['category'] == 'Biyoloji' for question in data['questions'])
+    assert all('explanation' not in question for question in data['questions'])
+
+    answered = [question['id'] for question in data['questions']]
+    response = client.post('/quiz/answers', json={
+        'userId': 'quiz_user',
+        'answers': [{'questionId': question_id, 'correct': True} for question_id in answered]
+    })
+    assert json.loads(response.data)['recorded'] == 2
+
+    data = json.loads(client.get('/quiz/next_questions?user_id=quiz_user&category=Biyoloji&n=3').data)
+    assert data['count'] == 1
+    assert data['questions'][0]['id'] not in answered
+    assert data['answeredCount'] == 2
+
+def test_next_questions_validates_params(client):
+    # Test that missing user, bad n, bad view and malformed answers are rejected
+    assert client.get('/quiz/next_questions?n=3').status_code == 400
+    assert client.get('/quiz/next_questions?user_id=u&n=0').status_code == 400
+    assert client.get('/quiz/next_questions?user_id=u&view=short').status_code == 400
+    assert client.post('/quiz/answers', json={'userId': 'u', 'answers': [{}]}).status_code == 400
+
+def test_added_questions_become_available_to_sampler(client, services, fake_db):
+    # Test that /add_questions feeds the new documents into the sampler index
+    from question_sampler import QuestionSampler
+    services.question_sampler = QuestionSampler(lambda: [], seed=0)
+    assert json.loads(client.get('/quiz/next_questions?user_id=u&category=Kimya').data)['count'] == 0
+    client.post('/add_questions', json=[{'text': 'Yeni soru', 'category': 'Kimya',
+                                         'difficulty': 'hard', 'options': []}])
+    data = json.loads(client.get('/quiz/next_questions?user_id=u&category=Kimya').data)
+    assert [question['text'] for question in data['questions']] == ['Yeni soru']
+
+CAPITAL_QUESTION = {
+    'text': "Türkiye'nin başkenti neresidir?",
+    'options': [{'text': 'Ankara'}, {'text': 'İstanbul'}, {'text': 'İzmir'}, {'text': 'Bursa'}],
+    'category': 'Coğrafya',
+}
+
+def test_add_questions_flags_near_duplicates(client, fake_db):
+    # Test that a reworded copy of a stored question is written but flagged with the original id
+    fake_db.collection('questions').document('capital').set(CAPITAL_QUESTION)
+    reworded = {**CAPITAL_QUESTION, 'text': 'Türkiyenin başkenti neresidir ?',
+                'options': list(reversed(CAPITAL_QUESTION['options']))}
+    response = client.post('/add_questions', json=[reworded])
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    assert data['duplicateCount'] == 1
+    assert data['results'][0]['status'] == 'success'
+    assert data['results'][0]['duplicateOf'][0]['id'] == 'capital'
+    assert len(fake_db._data['questions']) == 2
+
+def test_add_questions_skips_near_duplicates(client, fake_db, fake_async_db):
+    # Test that skip mode drops copies of stored and same-request questions and keeps result order
+    fake_db.collection('questions').document('capital').set(CAPITAL_QUESTION)
+    new_question = {'text': 'Dünyanın en büyük okyanusu hangisidir?', 'category': 'Coğrafya',
+                    'options': [{'text': 'Pasifik'}, {'text': 'Atlas'}]}
+    response = client.post('/async/add_questions?on_duplicate=skip',
+                           json=[CAPITAL_QUESTION, new_question, new_question])
+    assert response.status_code == 200
+
+    results = json.loads(response.data)['results']
+    assert [result['status'] for result in results] == ['skipped', 'success', 'skipped']
+    assert results[0]['duplicateOf'][0]['id'] == 'capital'
+    assert results[2]['duplicateOf'] == [{'index': 1, 'similarity': 1.0}]
+    assert len(fake_db._data['questions']) == 2
+
+    # Yeni eklenen soru indekse girdi: tekrar gönderilince banka kopyası olarak bulunur
+    again = json.loads(client.post('/add_questions?on_duplicate=skip', json=[new_question]).data)
+    assert again['results'][0]['duplicateOf'][0]['id'] == results[1]['id']
+
+def test_add_questions_rejects_unknown_duplicate_mode(client, fake_db):
+    # Test that an unknown on_duplicate value is rejected
+    response = client.post('/add_questions?on_duplicate=merge', json=[CAPITAL_QUESTION])
+    assert response.status_code == 400
+
+def test_duplicate_report_groups_stored_copies(client, fake_db):
+    # Test that /questions/duplicates lists clusters of near-identical stored questions
+    seed_questions(fake_db, 3)
+    for doc_id in ('capital', 'capital-copy'):
+        fake_db.collection('questions').document(doc_id).set(CAPITAL_QUESTION)
+
+    data = json.loads(client.get('/questions/duplicates').data)
+    assert data['questionCount'] == 5
+    assert data['groups'] == [{'questionIds': ['capital', 'capital-copy'], 'maxSimilarity': 1.0}]
+    assert client.get('/questions/duplicates?threshold=2').status_code == 400
+
+def test_questions_sync_returns_only_changes(client, fake_db):
+    # Test that a delta sync reads and returns only documents written after the cursor
+    seed_questions(fake_db, 50)
+    full = json.loads(client.get('/questions/sync').data)
+    assert full['full'] and full['count'] == 50
+
+    client.post('/add_questions?on_duplicate=allow', json=[{'text': 'Yeni soru', 'category': 'Tarih'}])
+    fake_db.reset_counters()
+    delta = json.loads(client.get(f"/questions/sync?since={full['version']}").data)
+
+    assert not delta['full'] and not delta['hasMore']
+    assert [question['text'] for question in delta['questions']] == ['Yeni soru']
+    assert delta['version'] >= full['version']
+    assert fake_db.document_reads == 1
+
+def test_questions_sync_reports_deletions(client, fake_db):
+    # Test that deleted questions disappear from the bank and are listed as deleted
+    client.post('/add_questions?on_duplicate=allow', json=[{'text': 'Silinecek soru'}])
+    question_id = next(iter(fake_db._data['questions']))
+
+    response = client.delete(f'/questions/{question_id}')
+    assert response.status_code == 200
+    assert question_id not in fake_db._data['questions']
+
+    delta = json.loads(client.get('/questions/sync?since=1').data)
+    assert delta['questions'] == []
+    assert delta['deleted'] == [question_id]
+
+def test_questions_sync_pages_by_version(client, fake_db):
+    # Test that limit splits changes into pages whose cursor is the last returned version
+    client.post('/add_questions?on_duplicate=allow', json=[{'text': f'Soru {i}'} for i in range(3)])
+    first = json.loads(client.get('/questions/sync?since=1&limit=2').data)
+    assert first['hasMore'] and first['count'] == 2
+    assert first['version'] == first['questions'][-1]['version']
+
+    assert first['afterId'] is not None
+    second = json.loads(client.get(
+        f"/questions/sync?since={first['version']}&after_id={first['afterId']}&limit=2").data)
+    assert not second['hasMore'] and second['afterId'] is None
+    assert [question['text'] for question in first['questions'] + second['questions']] == \
+        ['Soru 0', 'Soru 1', 'Soru 2']
+
+def test_questions_sync_keeps_same_version_across_pages(client, fake_db):
+    # Test that documents sharing a version are not skipped when a page ends between them
+    questions = fake_db.collection('questions')
+    for question_id, version in (('q1', 10), ('q2', 20), ('q3', 20), ('q4', 30)):
+        questions.document(question_id).set({'text': question_id, 'version': version})
+    fake_db.collection('question_tombstones').document('q0').set({'version': 20})
+
+    pages, since, after_id = [], 1, ''
+    while True:
+        page = json.loads(client.get(
+            f"/questions/sync?since={since}&after_id={after_id}&limit=2").data)
+        pages.append([question['id'] for question in page['questions']] + page['deleted'])
+        if not page['hasMore']:
+            break
+        since, after_id = page['version'], page['afterId']
+
+    assert pages == [['q1', 'q0'], ['q2', 'q3'], ['q4']]
+    assert client.get('/questions/sync?after_id=q1').status_code == 400
+
+def test_questions_sync_compact_format(client, fake_db):
+    # Test that the compact encoding decodes to the same payload as JSON
+    import compact_codec
+    seed_questions(fake_db, 20)
+    as_json = json.loads(client.get('/questions/sync?view=list').data)
+    response = client.get('/questions/sync?view=list&format=compact')
+
+    assert response.mimetype == compact_codec.MIMETYPE
+    compact = compact_codec.decode(response.data)
+    assert compact['questions'] == as_json['questions']
+    assert len(response.data) < len(json.dumps(as_json).encode())
+    assert client.get('/questions/sync?since=-1').status_code == 400
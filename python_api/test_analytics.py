@@ -0,0 +1,35 @@
+from analytics import AnalyticsStore, aggregate_history, engagement_level
+
+CATEGORIES = {"quiz1": "Coğrafya", "quiz2": "Tarih", "quiz3": "Tarih"}
+
+def test_aggregate_history_groups_by_user():
+    # Test that the vectorized aggregation matches the raw history
+    history = {
+        "user1": [
+            {"quiz_id": "quiz1", "rating": 5, "timestamp": "2025-01-15T10:00:00"},
+            {"quiz_id": "quiz2", "rating": 3, "timestamp": "2025-01-16T10:00:00"},
+            {"quiz_id": "quiz3", "rating": 4, "timestamp": "2025-01-14T10:00:00"},
+        ],
+    }
+    summary = aggregate_history(history, CATEGORIES.get)["user1"].to_dict("user1")
+    assert summary["avgScore"] == 4.0
+    assert summary["preferredCategories"][0] == "Tarih"
+    assert summary["lastActive"] == "2025-01-16T10:00:00"
+
+def test_incremental_events_match_full_rebuild():
+    # Test that add_events produces the same aggregates as aggregating everything at once
+    base = {"user1": [{"quiz_id": "quiz1", "rating": 5, "timestamp": "2025-01-15T10:00:00"}]}
+    event = {"quiz_id": "quiz2", "rating": 2, "timestamp": "2025-01-18T10:00:00", "time_spent": 120}
+
+    store = AnalyticsStore(lambda: base, CATEGORIES.get)
+    store.add_events("user1", [event])
+
+    full = {"user1": base["user1"] + [event]}
+    assert store.get("user1") == aggregate_history(full, CATEGORIES.get)["user1"].to_dict("user1")
+
+def test_unknown_user_gets_empty_analysis():
+    # Test that users without history get zeroed analytics instead of an error
+    store = AnalyticsStore(lambda: {}, CATEGORIES.get)
+    summary = store.get("nobody")
+    assert summary["avgScore"] == 0.0
+    assert summary["engagementLevel"] == engagement_level(0)
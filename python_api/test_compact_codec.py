@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+import compact_codec
+
+
+def test_round_trip_preserves_json_values():
+    # Test that nested values, negative and large integers, floats and unicode survive a round trip
+    value = {
+        'version': 1_700_000_000_123_456,
+        'items': [None, True, False, -1, 0, 300, -2 ** 70, 2.5, 'Çığ', {'ı': []}],
+        'nested': {'text': 'İstanbul', 'score': -0.125},
+    }
+    assert compact_codec.decode(compact_codec.encode(value)) == value
+
+
+def test_repeated_strings_are_stored_once():
+    # Test that repeated field names and categories make the payload much smaller than JSON
+    questions = [{'id': f'q{i}', 'category': 'Coğrafya', 'difficulty': 'easy',
+                  'tags': ['iklim', 'enerji'], 'text': f'Soru {i}'} for i in range(200)]
+    encoded = compact_codec.encode({'questions': questions})
+    assert encoded.count('Coğrafya'.encode('utf-8')) == 1
+    assert len(encoded) < len(json.dumps({'questions': questions}, ensure_ascii=False).encode()) / 2
+
+
+def test_decode_rejects_other_payloads():
+    # Test that data without the magic header is rejected
+    with pytest.raises(ValueError):
+        compact_codec.decode(b'{"a": 1}')
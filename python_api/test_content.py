@@ -0,0 +1,47 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from content import TAG_HASH_DIM, build_content_model, tag_bucket
+from recommender import IdMapping
+
+METADATA = {
+    "q1": {"category": "Tarih", "difficulty": "Kolay", "tags": ["osmanlı"]},
+    "q2": {"category": "Tarih", "zorluk": "Zor", "tags": ["roma"]},
+    "q3": {"category": "Bilim", "difficulty": "Kolay", "tags": ["fizik"]},
+    "q4": {"category": "Bilim", "difficulty": "Zor", "tags": ["Osmanlı "]},
+}
+
+def build(ratings=None):
+    mapping = IdMapping(["q1", "q2", "q3"])
+    if ratings is None:
+        ratings = csr_matrix(np.array([[5, 0, 4], [4, 3, 0], [5, 0, 0]], dtype=np.float32))
+    return build_content_model(mapping, METADATA, ratings)
+
+def test_catalog_extends_model_mapping_with_metadata_quizzes():
+    # Test that model quizzes keep their indices and unrated metadata quizzes are appended
+    content = build()
+    assert content.quiz_ids == ["q1", "q2", "q3", "q4"]
+    assert content.features.shape == (4, 2 + 2 + TAG_HASH_DIM)
+    norms = np.sqrt(np.asarray(content.features.multiply(content.features).sum(axis=1))).ravel()
+    assert np.allclose(norms, 1.0)
+
+def test_tags_are_hashed_case_insensitively():
+    # Test that tag hashing is stable and ignores case and surrounding spaces
+    assert tag_bucket("Osmanlı ") == tag_bucket("osmanlı")
+    content = build()
+    shared = content.features[0].multiply(content.features[3]).sum()
+    assert shared > 0
+
+def test_content_scores_prefer_matching_features():
+    # Test that a user who liked an easy history quiz scores history and easy quizzes higher
+    content = build()
+    scores = content.scores(content.encode_history([[{"quiz_id": "q1", "rating": 5}]]))
+    assert scores.shape == (1, 4)
+    assert scores[0, 0] == scores[0].max()
+    assert scores[0, 1] > 0 and scores[0, 2] > 0
+
+def test_cold_start_ranks_by_popularity_per_category():
+    # Test that the cold-start path ranks by play count and respects category filters
+    content = build()
+    assert content.cold_start(2).tolist() == [0, 2]
+    assert content.cold_start(5, ["Bilim"]).tolist() == [2, 3]
+    assert content.cold_start(5, ["Yok"]).tolist() == []
@@ -0,0 +1,84 @@
+import duplicates
+from duplicates import DuplicateDetector, DuplicateIndex, normalize_text, question_text
+
+CAPITAL = {
+    'text': "Türkiye'nin başkenti neresidir?",
+    'options': [{'text': 'Ankara'}, {'text': 'İstanbul'}, {'text': 'İzmir'}, {'text': 'Bursa'}],
+}
+OCEAN = {
+    'text': 'Dünyanın en büyük okyanusu hangisidir?',
+    'options': [{'text': 'Pasifik'}, {'text': 'Atlas'}, {'text': 'Hint'}, {'text': 'Arktik'}],
+}
+
+
+def test_normalize_text_handles_turkish_case_and_punctuation():
+    # Test that dotted/dotless capitals lower-case correctly and punctuation is dropped
+    assert normalize_text('  IĞDIR ve İZMİR, nerede?! ') == 'ığdır ve izmir nerede'
+    assert question_text({'text': 'Soru', 'options': [{'text': 'B'}, {'text': 'A'}]}) == 'soru | a | b'
+
+
+def test_query_finds_reworded_copy_but_not_unrelated_question():
+    # Test that reordered options and small wording changes match while another question does not
+    index = DuplicateIndex()
+    index.add('capital', index.signature(CAPITAL))
+    index.add('ocean', index.signature(OCEAN))
+    reworded = {'text': 'Türkiyenin başkenti neresidir ?',
+                'options': list(reversed(CAPITAL['options']))}
+
+    matches = index.query(index.signature(reworded))
+    assert [question_id for question_id, _ in matches] == ['capital']
+    assert matches[0][1] >= 0.7
+    assert index.signature({'text': '', 'options': []}) is None
+
+
+def test_batch_signatures_match_single_signatures():
+    # Test that chunked signing gives the same signature as signing one question at a time
+    index = DuplicateIndex()
+    questions = [CAPITAL, {'text': 'a'}, {}, OCEAN, 'not a question']
+    signatures, valid = index.signatures(questions, chunk_size=2)
+    assert valid.tolist() == [True, True, False, True, False]
+    for row in (0, 1, 3):
+        assert (signatures[row] == index.signature(questions[row])).all()
+
+
+def test_unmerged_inserts_are_found_before_and_after_merge(monkeypatch):
+    # Test that recent inserts in the unsorted tail are queryable and survive a merge
+    monkeypatch.setattr(duplicates, 'MERGE_EVERY', 3)
+    index = DuplicateIndex()
+    questions = [{'text': f'Bu soru numarası {i} olan bir soru metnidir'} for i in range(7)]
+    for i, question in enumerate(questions):
+        index.add(f'q{i}', index.signature(question))
+        assert index.query(index.signature(question))[0] == (f'q{i}', 1.0)
+    assert index._merged == 6
+
+
+def test_duplicate_groups_merge_transitive_pairs():
+    # Test that copies are clustered and singletons are not reported
+    index = DuplicateIndex()
+    for question_id, question in (('a', CAPITAL), ('b', OCEAN), ('c', dict(CAPITAL)),
+                                  ('d', {**CAPITAL, 'text': "Türkiye'nin başkenti neresidir"})):
+        index.add(question_id, index.signature(question))
+    assert index.duplicate_groups() == [{'questionIds': ['a', 'c', 'd'], 'maxSimilarity': 1.0}]
+
+
+def test_removed_questions_are_not_matched():
+    # Test that a removed question is skipped by queries and reports
+    index = DuplicateIndex()
+    for question_id in ('a', 'b', 'c'):
+        index.add(question_id, index.signature(CAPITAL))
+    assert index.remove('b') and not index.remove('b')
+    assert [question_id for question_id, _ in index.query(index.signature(CAPITAL))] == ['a', 'c']
+    assert index.duplicate_groups() == [{'questionIds': ['a', 'c'], 'maxSimilarity': 1.0}]
+    assert len(index) == 2
+
+
+def test_detector_checks_bank_and_same_batch():
+    # Test that check_batch reports stored copies by id and earlier batch items by position
+    detector = DuplicateDetector(lambda: [{**CAPITAL, 'id': 'capital'}])
+    matches = detector.check_batch([OCEAN, CAPITAL, OCEAN])
+    assert matches[0] == []
+    assert matches[1] == [{'id': 'capital', 'similarity': 1.0}]
+    assert matches[2] == [{'index': 0, 'similarity': 1.0}]
+
+    assert detector.add_questions([{**OCEAN, 'id': 'ocean'}]) == 1
+    assert detector.check_batch([OCEAN])[0] == [{'id': 'ocean', 'similarity': 1.0}]
@@ -0,0 +1,30 @@
+from evaluate_recommender import precision_recall_at_k, synthetic_ratings, temporal_split
+
+def test_synthetic_ratings_follow_power_law():
+    # Test that synthetic data is in user_quiz_data form with skewed quiz popularity
+    history, metadata = synthetic_ratings(5000, 200, 100, seed=1)
+    plays = {}
+    for quizzes in history.values():
+        for quiz in quizzes:
+            assert 1 <= quiz['rating'] <= 5 and quiz['quiz_id'] in metadata
+            plays[quiz['quiz_id']] = plays.get(quiz['quiz_id'], 0) + 1
+    counts = sorted(plays.values(), reverse=True)
+    assert sum(len(quizzes) for quizzes in history.values()) == 5000
+    assert sum(counts[:10]) > sum(counts) * 0.3
+
+def test_temporal_split_holds_out_latest_ratings():
+    # Test that the newest ratings go to the test set and untimed ratings stay in training
+    history = {
+        'u1': [{'quiz_id': 'a', 'rating': 5, 'timestamp': '2025-01-01T00:00:00'},
+               {'quiz_id': 'b', 'rating': 4, 'timestamp': '2025-03-01T00:00:00'}],
+        'u2': [{'quiz_id': 'c', 'rating': 3, 'timestamp': None},
+               {'quiz_id': 'd', 'rating': 2, 'timestamp': '2025-02-01T00:00:00'}],
+    }
+    train, test = temporal_split(history, test_fraction=0.2)
+    assert [quiz['quiz_id'] for quiz in test['u1']] == ['b']
+    assert 'u2' not in test
+    assert [quiz['quiz_id'] for quiz in train['u2']] == ['c', 'd']
+
+def test_precision_recall_at_k():
+    # Test precision@k and recall@k against a relevant set
+    assert precision_recall_at_k(['a', 'b', 'c', 'd'], {'b', 'd', 'x'}, 2) == (0.5, 1 / 3)
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+from analytics import aggregate_history
+from event_log import EventLog, read_records
+from recommender import ModelStore
+
+def batch(user_id, *quizzes):
+    return [(user_id, [
+        {"quiz_id": quiz_id, "rating": rating, "timestamp": "2025-01-15T10:00:00", "time_spent": 60}
+        for quiz_id, rating in quizzes
+    ])]
+
+def test_append_and_replay(tmp_path):
+    # Test that appended events are replayed into the user_quiz_data shape
+    log = EventLog(str(tmp_path))
+    log.append(batch("user1", ("quiz1", 5), ("quiz2", 3)))
+    log.append(batch("user2", ("quiz1", 4)))
+    log.close()
+
+    history = EventLog(str(tmp_path)).load().to_history()
+    assert [q["quiz_id"] for q in history["user1"]] == ["quiz1", "quiz2"]
+    assert history["user2"][0]["rating"] == 4
+    assert history["user1"][0]["timestamp"] == "2025-01-15T10:00:00"
+
+def test_compaction_writes_snapshot_and_keeps_tail(tmp_path):
+    # Test that a snapshot plus newer log records reproduce the full history
+    log = EventLog(str(tmp_path))
+    log.append(batch("user1", ("quiz1", 5)))
+    assert log.compact() == 1
+    log.append(batch("user1", ("quiz2", 2)))
+    log.close()
+
+    assert os.path.exists(tmp_path / "snapshot" / "ratings.npy")
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".log")]) == 1
+
+    columns = EventLog(str(tmp_path)).load()
+    assert len(columns) == 2
+    history = columns.to_history()
+    assert [q["quiz_id"] for q in history["user1"]] == ["quiz1", "quiz2"]
+
+def test_torn_tail_is_ignored_and_truncated(tmp_path):
+    # Test that a half-written record after a crash is dropped on restart
+    log = EventLog(str(tmp_path))
+    log.append(batch("user1", ("quiz1", 5)))
+    log.close()
+    segment = next(tmp_path.glob("events-*.log"))
+    with open(segment, "ab") as f:
+        f.write(b"\x40\x00\x00\x00garbage")
+
+    log = EventLog(str(tmp_path))
+    assert len(log.load()) == 1
+    log.append(batch("user1", ("quiz2", 4)))
+    log.close()
+    assert len(read_records(segment)[1]) == 2
+
+def test_load_history_keeps_snapshot_mapped(tmp_path):
+    # Test that history parts expose the mmapped snapshot and the tail without copying either into dicts
+    log = EventLog(str(tmp_path))
+    log.append(batch("user1", ("quiz1", 5), ("quiz2", 3)))
+    log.compact()
+    log.append(batch("user2", ("quiz3", 4)) + batch("user1", ("quiz1", 2)))
+    log.close()
+
+    snapshot, tail = EventLog(str(tmp_path)).load_history()
+    assert isinstance(snapshot.user_codes, np.memmap) and len(snapshot) == 2
+    assert len(tail) == 2 and tail.user_mapping.ids == ["user1", "user2"]
+
+    store = ModelStore(lambda: (snapshot, tail), n_components=1)
+    assert store.get_history("user1") == [{"quiz_id": "quiz1", "rating": 2.0},
+                                          {"quiz_id": "quiz2", "rating": 3.0}]
+    store.add_ratings("user2", [{"quiz_id": "quiz1", "rating": 5}])
+    assert [q["quiz_id"] for q in store.get_history("user2")] == ["quiz3", "quiz1"]
+    assert store.train().ratings.nnz == 4
+
+    history = EventLog(str(tmp_path)).load().to_history()
+    for user_id in ("user1", "user2"):
+        assert aggregate_history((snapshot, tail), str.upper)[user_id].to_dict(user_id) == \
+            aggregate_history(history, str.upper)[user_id].to_dict(user_id)
+
+def test_is_empty(tmp_path):
+    # Test that a log only counts as empty before anything was appended
+    log = EventLog(str(tmp_path))
+    assert log.is_empty()
+    log.append(batch("user1", ("quiz1", 5)))
+    assert not log.is_empty()
+    log.compact()
+    assert not log.is_empty()
+    log.close()
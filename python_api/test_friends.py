@@ -0,0 +1,82 @@
+import numpy as np
+from friends import FriendSuggestionStore, build_social_graph, top_suggestions
+
+def sample_data():
+    return {
+        "users": {user_id: {"nickname": user_id.upper(), "totalWins": wins}
+                  for user_id, wins in [("a", 0), ("b", 1), ("c", 2), ("d", 3), ("e", 4),
+                                        ("f", 5), ("g", 30)]},
+        "friendships": [("a", "b"), ("b", "c"), ("b", "d"), ("c", "d"), ("a", "e"), ("e", "d")],
+        "games": [["a", "f"], ["a", "f"], ["a", "g", "c"]],
+        "blocked": [("g", "a")],
+        "pending": [],
+    }
+
+def test_common_friends_come_from_sparse_product():
+    # Test that friends-of-friends are ranked by shared friend count and exclude existing friends
+    graph = build_social_graph(sample_data())
+    suggestions = graph.suggest("a", 2)
+    assert [s["userId"] for s in suggestions] == ["d", "c"]
+    assert suggestions[0]["commonFriendsCount"] == 2
+    assert suggestions[0]["reason"] == "commonFriends"
+    assert suggestions[1]["score"] == 10 * 1 + 5 * 1
+
+def test_co_play_counts_games_played_together():
+    # Test that players met only in games are suggested with the recentlyPlayed reason
+    graph = build_social_graph(sample_data())
+    by_id = {s["userId"]: s for s in graph.suggest("a", 10)}
+    assert by_id["f"]["totalGamesPlayed"] == 2
+    assert by_id["f"]["reason"] == "recentlyPlayed"
+
+def test_blocked_and_pending_users_are_masked_both_ways():
+    # Test that blocked users and pending requests never appear, in either direction
+    data = sample_data()
+    data["pending"] = [("c", "a")]
+    graph = build_social_graph(data)
+    suggested = {s["userId"] for s in graph.suggest("a", 10)}
+    assert not suggested & {"a", "b", "e", "g", "c"}
+    assert "a" not in {s["userId"] for s in graph.suggest("g", 10)}
+
+def test_unknown_user_gets_popular_players():
+    # Test that users without graph signal fall back to popular players
+    graph = build_social_graph(sample_data())
+    suggestions = graph.suggest("nobody", 3)
+    assert [s["reason"] for s in suggestions] == ["popular"] * 3
+    assert suggestions[0]["userId"] == "g"
+
+def test_chunked_precompute_matches_single_chunk():
+    # Test that splitting users into chunks does not change the precomputed suggestions
+    rng = np.random.default_rng(0)
+    users = {f"u{i}": {"nickname": f"n{i}"} for i in range(200)}
+    data = {
+        "users": users,
+        "friendships": [(f"u{a}", f"u{b}") for a, b in rng.integers(0, 200, (800, 2))],
+        "games": [[f"u{a}", f"u{b}"] for a, b in rng.integers(0, 200, (300, 2))],
+        "blocked": [(f"u{a}", f"u{b}") for a, b in rng.integers(0, 200, (50, 2))],
+    }
+    whole = build_social_graph(data, max_suggestions=5, chunk_size=1000)
+    chunked = build_social_graph(data, max_suggestions=5, chunk_size=7)
+    assert np.array_equal(whole.indptr, chunked.indptr)
+    assert np.array_equal(whole.candidates, chunked.candidates)
+    assert np.array_equal(whole.scores, chunked.scores)
+
+def test_top_suggestions_limits_per_row():
+    # Test that each row keeps at most max_suggestions candidates, best first
+    from scipy.sparse import csr_matrix
+    common = csr_matrix(np.array([[0, 3, 1, 2], [1, 0, 0, 0]], dtype=np.int64))
+    together = csr_matrix((2, 4), dtype=np.int64)
+    masked = csr_matrix(np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.int64))
+    counts, candidates, scores, common_counts, games = top_suggestions(common, together, masked, 2)
+    assert counts.tolist() == [2, 1]
+    assert candidates.tolist() == [1, 3, 0]
+    assert scores.tolist() == [30, 20, 10]
+
+def test_refresh_swaps_in_new_graph():
+    # Test that refresh rebuilds from fresh data and bumps the graph version
+    data = sample_data()
+    store = FriendSuggestionStore(lambda: data)
+    assert store.get_graph().version == 1
+    data["friendships"].append(("a", "d"))
+    graph = store.refresh()
+    assert graph.version == 2
+    assert "d" not in {s["userId"] for s in store.suggest("a", 10)}
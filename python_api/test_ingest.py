@@ -0,0 +1,80 @@
+import threading
+import pytest
+from ingest import IngestionQueue, QueueFullError, validate_user_data
+
+def test_validate_user_data_normalizes_events():
+    # Test that a valid payload is converted to the rating store's event shape
+    user_id, events = validate_user_data({
+        "userId": "user1",
+        "quizHistory": [{"quizId": "quiz1", "rating": 5, "timeSpentSeconds": 30}]
+    })
+    assert user_id == "user1"
+    assert events[0]["quiz_id"] == "quiz1"
+    assert events[0]["time_spent"] == 30
+    assert events[0]["timestamp"]
+
+@pytest.mark.parametrize("payload", [
+    [],
+    {"quizHistory": []},
+    {"userId": "u", "quizHistory": "quiz1"},
+    {"userId": "u", "quizHistory": [{"quizId": "quiz1", "rating": "5"}]},
+    {"userId": "u", "quizHistory": [{"quizId": "quiz1", "rating": True}]},
+])
+def test_validate_user_data_rejects_bad_payloads(payload):
+    # Test that invalid payloads raise ValueError
+    with pytest.raises(ValueError):
+        validate_user_data(payload)
+
+def test_worker_flushes_by_batch_size():
+    # Test that the background worker delivers full batches to the sinks
+    batches = []
+    done = threading.Event()
+
+    def sink(batch):
+        batches.append(list(batch))
+        if sum(len(b) for b in batches) == 4:
+            done.set()
+
+    ingestion = IngestionQueue([sink], max_size=10, batch_size=2, flush_interval=5)
+    for i in range(4):
+        ingestion.submit(i)
+
+    assert done.wait(2)
+    assert [len(batch) for batch in batches] == [2, 2]
+    ingestion.stop()
+
+def test_flush_drains_queue_and_records_metrics():
+    # Test that flush() processes pending items and updates metrics
+    received = []
+    ingestion = IngestionQueue([received.extend], max_size=10, batch_size=100, flush_interval=5)
+    ingestion.submit("a")
+    ingestion.submit("b")
+    ingestion.flush()
+
+    metrics = ingestion.metrics()
+    assert sorted(received) == ["a", "b"]
+    assert metrics['queueDepth'] == 0
+    assert metrics['flushedItems'] == 2
+    ingestion.stop()
+
+def test_sink_errors_do_not_stop_other_sinks():
+    # Test that a failing sink is counted and the next sink still runs
+    received = []
+
+    def broken(batch):
+        raise RuntimeError("boom")
+
+    ingestion = IngestionQueue([broken, received.extend], max_size=10, flush_interval=5)
+    ingestion.submit("a")
+    ingestion.flush()
+    assert received == ["a"]
+    assert ingestion.metrics()['sinkErrors'] == 1
+    ingestion.stop()
+
+def test_submit_raises_when_full(monkeypatch):
+    # Test that the bounded queue applies backpressure
+    ingestion = IngestionQueue([], max_size=1)
+    monkeypatch.setattr(ingestion, '_ensure_worker', lambda: None)
+    ingestion.submit("a")
+    with pytest.raises(QueueFullError):
+        ingestion.submit("b")
@@ -0,0 +1,29 @@
+import numpy as np
+from item_index import ExactItemIndex, IVFItemIndex, build_item_index
+
+def test_exact_index_returns_nearest_neighbours():
+    # Test that the exact index ranks by cosine similarity and skips the query item
+    vectors = np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.7, 0.7]])
+    indices, scores = ExactItemIndex(vectors).search(0, 2)
+    assert indices.tolist() == [1, 3]
+    assert scores[0] >= scores[1]
+
+def test_ivf_index_matches_exact_on_clustered_data():
+    # Test that the IVF index finds the same neighbours as brute force on well-separated clusters
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 8))
+    vectors = np.repeat(centers, 50, axis=0) + rng.normal(scale=0.01, size=(1000, 8))
+
+    exact = ExactItemIndex(vectors)
+    ivf = IVFItemIndex(vectors, n_lists=20, n_probe=4)
+    for item_idx in [0, 123, 999]:
+        exact_ids, _ = exact.search(item_idx, 10)
+        ivf_ids, _ = ivf.search(item_idx, 10)
+        assert set(ivf_ids.tolist()) == set(exact_ids.tolist())
+        assert item_idx not in ivf_ids
+
+def test_build_item_index_picks_engine_by_size():
+    # Test that small catalogs use brute force and large ones use IVF
+    vectors = np.random.default_rng(1).normal(size=(50, 4))
+    assert isinstance(build_item_index(vectors), ExactItemIndex)
+    assert isinstance(build_item_index(vectors, exact_max_items=10), IVFItemIndex)
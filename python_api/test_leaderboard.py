@@ -0,0 +1,192 @@
+import random
+
+import pytest
+
+from leaderboard import Leaderboard, LeaderboardStore, RankedList
+
+USERS = {
+    'a': {'nickname': 'Ayşe', 'quizCount': 42, 'duelWins': 12},
+    'b': {'nickname': 'Mehmet', 'quizCount': 17},
+    'c': {'nickname': 'Zeynep', 'quizCount': 42, 'duelWins': 20},
+    'd': {'quizCount': 8, 'duelWins': True},
+}
+
+
+def test_ranked_list_matches_sorted_list(monkeypatch):
+    # Test that random inserts and removals keep index/slice in line with a plain sorted list
+    monkeypatch.setattr(RankedList, 'LOAD', 4)
+    rng = random.Random(0)
+    ranked, expected = RankedList(), []
+    for _ in range(2000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            ranked.remove(key)
+        else:
+            key = (rng.randrange(-50, 0), str(rng.randrange(10000)))
+            if key in expected:
+                continue
+            expected.append(key)
+            expected.sort()
+            ranked.add(key)
+        probe = (rng.randrange(-55, 5), '')
+        assert ranked.index(probe) == sum(k < probe for k in expected)
+        start = rng.randrange(len(expected) + 1)
+        assert ranked.slice(start, start + 7) == expected[start:start + 7]
+    assert list(ranked) == expected and len(ranked) == len(expected)
+    with pytest.raises(ValueError):
+        ranked.remove((1, 'missing'))
+
+
+def test_ties_share_rank_across_pages():
+    # Test that equal scores get the same competition rank even when split across pages
+    board = Leaderboard.from_users(USERS)
+    assert [(e['rank'], e['userId'], e['score']) for e in board.page('quizCount', 0, 10)] == [
+        (1, 'a', 42), (1, 'c', 42), (3, 'b', 17), (4, 'd', 8)]
+    assert [(e['rank'], e['userId']) for e in board.page('quizCount', 1, 2)] == [(1, 'c'), (3, 'b')]
+    assert board.page('quizCount', 4, 10) == []
+    assert board.page('quizCount', 0, 1)[0]['nickname'] == 'Ayşe'
+    # Bool değerler skor sayılmaz
+    assert board.rank('duelWins', 'd') is None
+    assert board.rank('duelWins', 'a') == {'rank': 2, 'score': 12, 'total': 2}
+
+
+def test_apply_sets_and_increments_scores():
+    # Test that value events set scores, delta events add to them and ranks move accordingly
+    board = Leaderboard.from_users(USERS)
+    applied = board.apply([
+        {'userId': 'b', 'metric': 'quizCount', 'delta': 30},
+        {'userId': 'e', 'metric': 'quizCount', 'value': 5, 'nickname': 'Can'},
+        {'userId': 'a', 'metric': 'quizCount', 'value': 1},
+    ])
+    assert applied == 3 and board.version == 3
+    assert [(e['userId'], e['score']) for e in board.page('quizCount', 0, 10)] == [
+        ('b', 47), ('c', 42), ('d', 8), ('e', 5), ('a', 1)]
+    assert board.rank('quizCount', 'e') == {'rank': 4, 'score': 5, 'total': 5}
+    assert board.page('quizCount', 3, 1)[0]['nickname'] == 'Can'
+
+
+def test_snapshot_round_trip(tmp_path):
+    # Test that a saved snapshot reloads the same pages, ranks and version without the source
+    directory = str(tmp_path / 'leaderboard')
+    store = LeaderboardStore(lambda: USERS, directory)
+    store.apply_events([{'userId': 'd', 'metric': 'duelWins', 'value': 30}])
+    assert store.save_snapshot()
+    assert not store.save_snapshot()
+
+    def fail():
+        raise AssertionError('snapshot should be used')
+
+    restored = LeaderboardStore(fail, directory)
+    for metric in ('quizCount', 'duelWins', 'friendCount'):
+        assert restored.page(metric, 0, 10) == store.page(metric, 0, 10)
+    assert restored.rank('d', ['duelWins']) == {'duelWins': {'rank': 1, 'score': 30, 'total': 3}}
+    assert restored.status()['version'] == 1
+    assert not (tmp_path / 'leaderboard.tmp').exists()
+
+
+def test_store_recovers_interrupted_snapshot(tmp_path):
+    # Test that a crash between the renames in write_snapshot still restarts from the old snapshot
+    directory = tmp_path / 'leaderboard'
+    store = LeaderboardStore(lambda: USERS, str(directory))
+    store.apply_events([{'userId': 'd', 'metric': 'duelWins', 'value': 30}])
+    assert store.save_snapshot()
+    store.close()
+    directory.rename(tmp_path / 'leaderboard.old')
+    (tmp_path / 'leaderboard.tmp').mkdir()
+
+    def fail():
+        raise AssertionError('snapshot should be used')
+
+    restored = LeaderboardStore(fail, str(directory))
+    assert restored.status()['version'] == 1
+    assert restored.rank('d', ['duelWins']) == {'duelWins': {'rank': 1, 'score': 30, 'total': 3}}
+    assert directory.exists() and not (tmp_path / 'leaderboard.tmp').exists()
+
+
+def test_ranked_list_copy_is_independent(monkeypatch):
+    # Test that a copy keeps its keys while the original buckets are changed and split
+    monkeypatch.setattr(RankedList, 'LOAD', 4)
+    ranked = RankedList((-score, f'u{score}') for score in range(30, 0, -1))
+    expected = list(ranked)
+    view = ranked.copy()
+    for score in range(30, 0, -3):
+        ranked.remove((-score, f'u{score}'))
+    for score in range(100, 120):
+        ranked.add((-score, f'v{score}'))
+    view.add((0, 'w'))
+    assert list(view) == expected + [(0, 'w')]
+    assert list(ranked) == sorted(list(ranked)) and len(ranked) == 40
+    assert (0, 'w') not in list(ranked)
+
+
+def test_snapshot_export_runs_outside_lock(tmp_path, monkeypatch):
+    # Test that events applied while a snapshot is exported neither wait for it nor leak into it
+    directory = str(tmp_path / 'leaderboard')
+    store = LeaderboardStore(lambda: USERS, directory)
+    store.apply_events([{'userId': 'b', 'metric': 'quizCount', 'value': 50, 'nickname': 'Can'}])
+    export = Leaderboard.export
+
+    def export_during_events(board):
+        assert not store._lock.locked()
+        store.apply_events([{'userId': 'b', 'metric': 'quizCount', 'value': 1, 'nickname': 'Ali'}])
+        return export(board)
+
+    monkeypatch.setattr(Leaderboard, 'export', export_during_events)
+    assert store.save_snapshot()
+    restored = Leaderboard.load(directory)
+    assert restored.version == 1
+    assert restored.page('quizCount', 0, 1)[0] == {
+        'rank': 1, 'userId': 'b', 'nickname': 'Can', 'profilePictureUrl': None, 'score': 50}
+    assert store.rank('b', ['quizCount'])['quizCount']['score'] == 1
+
+
+def test_single_snapshot_writer(tmp_path):
+    # Test that only the store holding the directory lock writes snapshots until it closes
+    directory = str(tmp_path / 'leaderboard')
+    writer, other = LeaderboardStore(lambda: USERS, directory), LeaderboardStore(lambda: USERS, directory)
+    assert writer.start_background_snapshots(3600)
+    other.apply_events([{'userId': 'd', 'metric': 'duelWins', 'value': 30}])
+    assert not other.save_snapshot()
+
+    writer.apply_events([{'userId': 'a', 'metric': 'quizCount', 'delta': 1}])
+    writer.close()
+    assert Leaderboard.load(directory).rank('quizCount', 'a')['score'] == 43
+    assert other.save_snapshot()
+    other.close()
+
+
+def _elect_writer(directory, ready, release, results):
+    store = LeaderboardStore(lambda: USERS, directory)
+    results.put(store.save_snapshot())
+    ready.wait()
+    if store._writer_pid is not None:
+        release.wait()
+    store.close()
+
+
+def test_snapshot_writer_election_across_processes(tmp_path):
+    # Test that among forked workers sharing a directory exactly one writes, and another takes over after it exits
+    import multiprocessing
+
+    context = multiprocessing.get_context('fork')
+    directory = str(tmp_path / 'leaderboard')
+    ready, release, results = context.Event(), context.Event(), context.Queue()
+    workers = [context.Process(target=_elect_writer, args=(directory, ready, release, results))
+               for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    elected = [results.get(timeout=10) for _ in workers]
+    ready.set()
+    assert elected.count(True) == 1
+
+    # Yazıcı kilidi tutarken ana süreç yazamaz; yazıcı çıkınca kilit serbest kalır
+    store = LeaderboardStore(lambda: USERS, directory)
+    store.apply_events([{'userId': 'b', 'metric': 'quizCount', 'value': 99}])
+    assert not store.save_snapshot()
+    release.set()
+    for worker in workers:
+        worker.join(timeout=10)
+        assert worker.exitcode == 0
+    assert store.save_snapshot()
+    assert Leaderboard.load(directory).rank('quizCount', 'b')['score'] == 99
+    store.close()
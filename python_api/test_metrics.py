@@ -0,0 +1,50 @@
+from metrics import Counter, Histogram, MetricsRegistry, end_spans, stage, start_spans
+
+def test_histogram_renders_cumulative_buckets():
+    # Test that histogram buckets are cumulative and end with +Inf, sum and count
+    histogram = Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route='/a')
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+def test_counter_escapes_label_values():
+    # Test that quotes and backslashes in label values are escaped
+    counter = Counter('errors_total', 'Errors', ('route',))
+    counter.inc(route='a"b\\c')
+    counter.inc(2, route='a"b\\c')
+    assert 'errors_total{route="a\\"b\\\\c"} 3' in counter.render()
+
+def test_registry_renders_collectors_and_survives_failures():
+    # Test that collector samples are grouped into families and a failing collector is skipped
+    registry = MetricsRegistry()
+    registry.counter('requests_total', 'Requests').inc()
+
+    def broken():
+        raise RuntimeError('boom')
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [
+        ('cache_hits_total', 'counter', 'Hits', {'cache': 'a'}, 1),
+        ('cache_hits_total', 'counter', 'Hits', {'cache': 'b'}, 2),
+    ])
+    text = registry.render()
+    assert 'requests_total 1' in text
+    assert text.count('# TYPE cache_hits_total counter') == 1
+    assert 'cache_hits_total{cache="b"} 2' in text
+
+def test_stage_records_spans_only_inside_request():
+    # Test that stage() appends spans to the active list and is harmless outside a request
+    with stage('outside'):
+        pass
+    spans, token = start_spans()
+    try:
+        with stage('inside'):
+            pass
+    finally:
+        end_spans(token)
+    assert [name for name, _ in spans] == ['inside']
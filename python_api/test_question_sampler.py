@@ -0,0 +1,95 @@
+import numpy as np
+from question_sampler import (MIN_ANSWERS, QuestionIndex, QuestionSampler, UserProgress,
+                              normalize_difficulty)
+
+def make_bank(per_group=30):
+    return [
+        {'id': f'{category}-{difficulty}-{i}', 'category': category, 'difficulty': difficulty}
+        for category in ('Tarih', 'Coğrafya')
+        for difficulty in ('easy', 'medium', 'hard')
+        for i in range(per_group)
+    ]
+
+def test_index_groups_by_category_and_difficulty():
+    # Test that ordinals are grouped per (category, difficulty) and per difficulty across categories
+    index = QuestionIndex(make_bank(3))
+    assert len(index.group('Tarih', 'hard')) == 3
+    assert len(index.group(None, 'hard')) == 6
+    assert index.add([{'id': 'Tarih-hard-0', 'difficulty': 'hard'},
+                      {'id': 'new', 'category': 'Tarih', 'difficulty': 'Zor'}]) == 1
+    assert index.ordinals['new'] in index.group('Tarih', 'hard').tolist()
+
+def test_removed_questions_leave_groups():
+    # Test that removed questions are no longer sampled and can be re-added under a new ordinal
+    index = QuestionIndex(make_bank(3))
+    old_ordinal = index.ordinals['Tarih-hard-0']
+    assert index.remove(['Tarih-hard-0', 'missing']) == 1
+    assert len(index.group('Tarih', 'hard')) == 2
+    assert len(index.group(None, 'hard')) == 5
+    assert index.add([{'id': 'Tarih-hard-0', 'category': 'Tarih', 'difficulty': 'hard'}]) == 1
+    assert index.ordinals['Tarih-hard-0'] != old_ordinal
+
+def test_difficulty_aliases():
+    # Test that Turkish and unknown difficulty names are normalized
+    assert normalize_difficulty('Kolay') == 'easy'
+    assert normalize_difficulty(None) == 'medium'
+
+def test_bitmap_marks_and_masks():
+    # Test that the seen bitmap grows on demand and the vectorized mask matches single lookups
+    progress = UserProgress()
+    for ordinal in (0, 9, 100):
+        progress.mark(ordinal)
+    assert progress.is_seen(9) and not progress.is_seen(10) and not progress.is_seen(10_000)
+    ordinals = np.array([0, 1, 9, 100, 5000], dtype=np.int32)
+    assert progress.unseen_mask(ordinals).tolist() == [False, True, False, False, True]
+
+def test_next_questions_excludes_answered_and_respects_category():
+    # Test that answered questions are never returned again until the group runs out
+    sampler = QuestionSampler(lambda: make_bank(), seed=1)
+    served = set()
+    for _ in range(3):
+        questions = sampler.next_questions('u1', 'Tarih', 10)['questions']
+        assert len(questions) == 10
+        assert all(question['category'] == 'Tarih' for question in questions)
+        ids = {question['id'] for question in questions}
+        assert not ids & served
+        served |= ids
+        sampler.record_answers('u1', [(question_id, True) for question_id in ids][:4] +
+                               [(question_id, False) for question_id in ids][4:])
+
+def test_level_steers_difficulty_from_recent_accuracy():
+    # Test that high accuracy promotes to harder questions and low accuracy demotes
+    sampler = QuestionSampler(lambda: make_bank(), seed=1)
+    assert sampler.next_questions('u1', None, 5)['difficulty'] == 'medium'
+    medium = [question['id'] for question in sampler.next_questions('u1', None, MIN_ANSWERS)['questions']]
+    sampler.record_answers('u1', [(question_id, True) for question_id in medium])
+    selection = sampler.next_questions('u1', None, 5)
+    assert selection['difficulty'] == 'hard'
+    assert {question['difficulty'] for question in selection['questions']} == {'hard'}
+
+    hard = [question['id'] for question in selection['questions']]
+    sampler.record_answers('u1', [(question_id, False) for question_id in hard])
+    assert sampler.next_questions('u1', None, 5)['difficulty'] == 'medium'
+
+def test_exhausted_level_is_filled_from_nearest_levels():
+    # Test that a nearly exhausted group is topped up from neighbouring difficulties
+    sampler = QuestionSampler(lambda: make_bank(4), seed=3)
+    sampler.record_answers('u1', [(f'Tarih-medium-{i}', i % 2 == 0) for i in range(3)])
+    questions = sampler.next_questions('u1', 'Tarih', 6)['questions']
+    assert [question['difficulty'] for question in questions][0] == 'medium'
+    assert len({question['id'] for question in questions}) == 6
+    assert 'Tarih-medium-3' in {question['id'] for question in questions}
+
+def test_sampling_cost_does_not_scan_large_groups(monkeypatch):
+    # Test that drawing from a mostly unseen group never falls back to scanning it
+    sampler = QuestionSampler(lambda: make_bank(20000), seed=0)
+    scanned = []
+    original = UserProgress.unseen_mask
+
+    def unseen_mask(self, ordinals):
+        scanned.append(len(ordinals))
+        return original(self, ordinals)
+
+    monkeypatch.setattr(UserProgress, 'unseen_mask', unseen_mask)
+    assert len(sampler.next_questions('u1', 'Tarih', 10)['questions']) == 10
+    assert scanned == []
@@ -0,0 +1,61 @@
+import numpy as np
+from scipy.sparse import issparse
+from recommender import IdMapping, build_rating_matrix, ratings_to_csr, top_k_indices
+
+def test_build_rating_matrix_is_sparse():
+    # Test that the rating matrix is CSR and stores only the given ratings
+    history = {
+        "user1": [{"quiz_id": "quiz1", "rating": 5}, {"quiz_id": "quiz2", "rating": 3}],
+        "user2": [{"quiz_id": "quiz2", "rating": 4}],
+    }
+    matrix, users, quizzes = build_rating_matrix(history)
+    assert issparse(matrix) and matrix.format == 'csr'
+    assert matrix.shape == (2, 2)
+    assert matrix.nnz == 3
+    assert matrix[users.get("user2"), quizzes.get("quiz2")] == 4
+
+def test_id_mappings_are_stable():
+    # Test that existing ids keep their index when new ids appear
+    history = {"user1": [{"quiz_id": "quiz1", "rating": 5}]}
+    _, users, quizzes = build_rating_matrix(history)
+
+    history["user0"] = [{"quiz_id": "quiz0", "rating": 2}]
+    matrix, new_users, new_quizzes = build_rating_matrix(history, users, quizzes)
+    assert new_users.get("user1") == users.get("user1")
+    assert new_quizzes.get("quiz1") == quizzes.get("quiz1")
+    assert matrix.shape == (2, 2)
+    assert len(users) == 1  # the original mapping is not mutated
+
+def test_duplicate_ratings_keep_latest():
+    # Test that a repeated (user, quiz) pair keeps the last rating like the dense build did
+    matrix = ratings_to_csr([0, 0, 1], [1, 1, 0], [2, 5, 3], (2, 2))
+    assert matrix.nnz == 2
+    assert matrix[0, 1] == 5
+
+def test_id_mapping_encode():
+    # Test bulk encoding of ids into integer codes
+    mapping = IdMapping(["a"])
+    codes = mapping.encode(["b", "a", "b"])
+    assert codes.tolist() == [1, 0, 1]
+    assert np.issubdtype(codes.dtype, np.integer)
+
+def test_top_k_indices_masks_and_orders():
+    # Test that top-k selection skips excluded items and returns scores in descending order
+    scores = np.array([[0.1, 0.9, 0.5, 0.7]])
+    excluded = np.array([[False, True, False, False]])
+    assert top_k_indices(scores, 2, excluded)[0].tolist() == [3, 2]
+
+def test_top_k_indices_masks_float32_in_place(monkeypatch):
+    # Test that float32 scores are masked in place and selected in row blocks
+    import recommender
+    monkeypatch.setattr(recommender, 'TOP_K_BLOCK_CELLS', 4)
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.8, 0.2, 0.6, 0.4]], dtype=np.float32)
+    excluded = np.array([[False, True, False, False], [True, False, False, False]])
+    assert [row.tolist() for row in top_k_indices(scores, 2, excluded)] == [[3, 2], [2, 3]]
+    assert scores.dtype == np.float32 and scores[0, 1] == -np.inf
+
+def test_top_k_indices_respects_allowed_mask():
+    # Test that filtered-out items are never returned, even when k is larger
+    scores = np.array([0.1, 0.9, 0.5])
+    allowed = np.array([True, False, False])
+    assert top_k_indices(scores, 3, allowed=allowed)[0].tolist() == [0]
@@ -0,0 +1,54 @@
+import fnmatch
+from response_cache import InProcessBackend, RecommendationCache, RedisBackend
+
+class FakeRedis:
+    # Redis uyumlu istemcinin önbelleğin kullandığı alt kümesi
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode('utf-8')
+        self.expiry[key] = ex
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match='*'):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+def test_key_changes_with_version_revision_and_params():
+    # Test that every component of the key yields a different cache entry and ETag
+    cache = RecommendationCache(InProcessBackend())
+    base = cache.key('u1', 1, 0, 3, ['Tarih'])
+    variants = [cache.key('u1', 2, 0, 3, ['Tarih']), cache.key('u1', 1, 1, 3, ['Tarih']),
+                cache.key('u1', 1, 0, 5, ['Tarih']), cache.key('u1', 1, 0, 3, [])]
+    assert len({cache.etag(key) for key in [base] + variants}) == 5
+    assert cache.key('u1', 1, 0, 3, ['b', 'a']) == cache.key('u1', 1, 0, 3, ['a', 'b'])
+
+def test_invalidate_user_only_removes_that_user():
+    # Test that user invalidation is exact even when ids share a prefix or contain separators
+    cache = RecommendationCache(InProcessBackend())
+    for user_id in ('u1', 'u10', 'u1|x'):
+        cache.set(cache.key(user_id, 1, 0, 3, []), {'user': user_id})
+    assert cache.invalidate_user('u1') == 1
+    assert cache.get(cache.key('u10', 1, 0, 3, [])) == {'user': 'u10'}
+    assert cache.get(cache.key('u1|x', 1, 0, 3, [])) == {'user': 'u1|x'}
+
+def test_redis_backend_round_trips_json_with_ttl():
+    # Test that the Redis backend stores JSON with an expiry and supports user invalidation
+    client = FakeRedis()
+    cache = RecommendationCache(RedisBackend(client, ttl_seconds=60))
+    key = cache.key('u*1', 1, 0, 3, [])
+    cache.set(key, {'recommendations': [{'quizId': 'quiz1'}], 'modelVersion': 1})
+    cache.set(cache.key('u21', 1, 0, 3, []), {'recommendations': []})
+
+    assert cache.get(key)['recommendations'][0]['quizId'] == 'quiz1'
+    assert set(client.expiry.values()) == {60}
+    assert cache.invalidate_user('u*1') == 1
+    assert cache.get(key) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
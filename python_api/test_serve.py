@@ -0,0 +1,23 @@
+import pytest
+
+import serve
+
+
+def test_persistent_dirs_require_single_worker(monkeypatch, capsys):
+    # Test that serve.py refuses several workers sharing an on-disk event log
+    monkeypatch.setenv('EVENT_LOG_DIR', '/tmp/events')
+    monkeypatch.delenv('LEADERBOARD_SNAPSHOT_DIR', raising=False)
+    with pytest.raises(SystemExit):
+        serve.main(['--workers', '2'])
+    assert 'EVENT_LOG_DIR supports a single writer' in capsys.readouterr().err
+
+def test_leaderboard_snapshots_allow_several_workers(monkeypatch):
+    # Test that a leaderboard snapshot directory does not limit the worker count
+    monkeypatch.delenv('EVENT_LOG_DIR', raising=False)
+    monkeypatch.setenv('LEADERBOARD_SNAPSHOT_DIR', '/tmp/leaderboard')
+    started = []
+    monkeypatch.setattr(serve, 'preload', lambda app_module: None)
+    monkeypatch.setattr(serve, 'run_prefork', lambda app_module, host, port, workers, threads:
+                        started.append(workers))
+    serve.main(['--workers', '2', '--server', 'prefork'])
+    assert started == [2]
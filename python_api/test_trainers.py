@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from scipy.sparse import csr_matrix
+from sklearn.decomposition import TruncatedSVD
+from trainers import ImplicitALSTrainer, RandomizedSVDTrainer, get_trainer
+from recommender import ModelStore
+
+def block_ratings(n_users=40, n_quizzes=20, seed=0):
+    # İki kullanıcı grubu, her biri yalnızca kendi quiz yarısını puanlar
+    rng = np.random.default_rng(seed)
+    dense = np.zeros((n_users, n_quizzes))
+    for user in range(n_users):
+        half = user % 2
+        quizzes = rng.choice(np.arange(half * n_quizzes // 2, (half + 1) * n_quizzes // 2), 4,
+                             replace=False)
+        dense[user, quizzes] = rng.integers(3, 6, 4)
+    return csr_matrix(dense)
+
+def test_randomized_svd_matches_truncated_svd():
+    # Test that the SVD engine reproduces TruncatedSVD(random_state=42) factors
+    matrix = block_ratings()
+    user_factors, quiz_factors = RandomizedSVDTrainer().fit(matrix, 3)
+    svd = TruncatedSVD(n_components=3, random_state=42)
+    assert np.allclose(user_factors, svd.fit_transform(matrix))
+    assert np.allclose(quiz_factors, svd.components_.T)
+
+def test_als_conjugate_gradient_matches_direct_solve():
+    # Test that the vectorized CG user step converges to the exact per-user ALS solution
+    matrix = block_ratings()
+    trainer = ImplicitALSTrainer(cg_steps=50, chunk_size=7)
+    quiz_factors = np.random.default_rng(1).normal(size=(matrix.shape[1], 4))
+    weights = matrix.copy()
+    weights.data *= trainer.alpha
+    with ThreadPoolExecutor(2) as pool:
+        solved = trainer._solve(weights, quiz_factors, np.zeros((matrix.shape[0], 4)), pool)
+    for user in range(matrix.shape[0]):
+        row = matrix.getrow(user)
+        expected = trainer.fold_in(quiz_factors, row.indices, row.data)
+        assert np.allclose(solved[user], expected, atol=1e-6)
+
+def test_als_ranks_unseen_quizzes_from_the_users_block_first():
+    # Test that implicit ALS recommends quizzes liked by similar users
+    matrix = block_ratings()
+    user_factors, quiz_factors = ImplicitALSTrainer(n_jobs=2).fit(matrix, 2)
+    scores = user_factors @ quiz_factors.T
+    for user in range(matrix.shape[0]):
+        scores[user, matrix.getrow(user).indices] = -np.inf
+        top = np.argsort(-scores[user])[:3]
+        assert all(quiz // 10 == user % 2 for quiz in top)
+
+def test_model_store_uses_configured_trainer_for_fold_in():
+    # Test that the store trains and folds in new users with the selected engine
+    history = {f"user{user}": [{"quiz_id": f"quiz{quiz}", "rating": 5}
+                               for quiz in range(user % 2 * 3, user % 2 * 3 + 3)]
+               for user in range(10)}
+    store = ModelStore(lambda: history, n_components=2, trainer=get_trainer('als'))
+    model = store.get_model()
+    assert store.status()['trainer'] == 'als'
+
+    vector = model.fold_in({"quiz0": 5, "quiz1": 4})
+    scores = vector @ model.quiz_factors.T
+    assert np.argmax(scores) in (model.quiz_index["quiz0"], model.quiz_index["quiz1"],
+                                 model.quiz_index["quiz2"])
+
+def test_get_trainer_rejects_unknown_engine():
+    # Test that an unknown trainer name is a configuration error
+    with pytest.raises(ValueError):
+        get_trainer('nmf')
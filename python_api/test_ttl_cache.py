@@ -0,0 +1,39 @@
+from ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_expires_entries():
+    # Test that entries older than the TTL are treated as misses
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+
+    clock.now = 6
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+def test_ttl_cache_evicts_least_recently_used():
+    # Test that the least recently used entry is evicted when the cache is full
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+def test_ttl_cache_invalidate_with_predicate():
+    # Test that only matching keys are removed
+    cache = TTLCache()
+    cache.set(('Tarih', 1), 'x')
+    cache.set(('Coğrafya', 1), 'y')
+    assert cache.invalidate(lambda key: key[0] == 'Tarih') == 1
+    assert cache.get(('Coğrafya', 1)) == 'y'
@@ -0,0 +1,142 @@
+"""
+Pluggable training engines for the factor model
+
+A trainer turns the sparse (user, quiz) rating matrix into user and quiz factor
+matrices whose product scores quizzes, and folds a new user's ratings into a
+user vector without retraining. Engines are selected by name (get_trainer) so
+the API and offline tools can switch them with configuration only.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class RandomizedSVDTrainer:
+    """
+    Seyrek matris üzerinde randomized truncated SVD (Halko vd.).
+
+    Varsayılan parametrelerle TruncatedSVD(random_state=42) ile aynı faktörleri
+    üretir; puanlanmamış hücreler 0 puan kabul edilir.
+    """
+
+    name = 'svd'
+
+    def __init__(self, n_iter=5, n_oversamples=10, random_state=42):
+        self.n_iter = n_iter
+        self.n_oversamples = n_oversamples
+        self.random_state = random_state
+
+    def fit(self, matrix, n_components):
+        from sklearn.utils.extmath import randomized_svd
+
+        _, _, components = randomized_svd(
+            matrix, n_components, n_iter=self.n_iter, n_oversamples=self.n_oversamples,
+            power_iteration_normalizer='auto', random_state=self.random_state)
+        quiz_factors = np.ascontiguousarray(components.T, dtype=np.float64)
+        user_factors = np.asarray(matrix @ quiz_factors, dtype=np.float64)
+        return user_factors, quiz_factors
+
+    def fold_in(self, quiz_factors, indices, values):
+        # r · V (TruncatedSVD.transform ile aynı)
+        return np.asarray(values, dtype=np.float64) @ quiz_factors[indices]
+
+
+class ImplicitALSTrainer:
+    """
+    Örtük geri bildirim için alternating least squares (Hu, Koren, Volinsky).
+
+    Puan r, tercih p = 1 ve güven c = 1 + alpha·r olarak yorumlanır; puanlanmamış
+    hücreler düşük güvenli negatiftir. Her yarım adımda kullanıcı (ya da quiz)
+    satırları parçalara bölünür ve her parça birkaç adımlık eşlenik gradyanla
+    vektörize çözülür; parçalar iş parçacığı havuzunda çalışır (NumPy/BLAS ve
+    scipy.sparse çekirdekleri GIL'i bırakır), böylece tüm çekirdekler kullanılır.
+    """
+
+    name = 'als'
+
+    def __init__(self, regularization=0.1, alpha=10.0, iterations=15, cg_steps=3, n_jobs=None,
+                 chunk_size=8192, random_state=42):
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.cg_steps = cg_steps
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def fit(self, matrix, n_components):
+        weights = matrix.tocsr().astype(np.float64)
+        # (c - 1) = alpha·r; tercih vektörü puanlanan hücrelerde 1
+        weights.data *= self.alpha
+        weights_t = weights.T.tocsr()
+
+        rng = np.random.default_rng(self.random_state)
+        user_factors = np.zeros((matrix.shape[0], n_components))
+        quiz_factors = rng.normal(scale=0.01, size=(matrix.shape[1], n_components))
+        with ThreadPoolExecutor(self.n_jobs) as pool:
+            for _ in range(self.iterations):
+                user_factors = self._solve(weights, quiz_factors, user_factors, pool)
+                quiz_factors = self._solve(weights_t, user_factors, quiz_factors, pool)
+        return user_factors, quiz_factors
+
+    def _solve(self, weights, fixed, current, pool):
+        """Her satır için (YᵀY + Yᵀ(C−I)Y + λI)·x = YᵀC·p sistemini parça parça çözer."""
+        from scipy.sparse import csr_matrix
+
+        gram = fixed.T @ fixed + self.regularization * np.eye(fixed.shape[1])
+
+        def solve_chunk(start):
+            stop = min(start + self.chunk_size, weights.shape[0])
+            chunk = weights[start:stop]
+            rows = np.repeat(np.arange(stop - start), np.diff(chunk.indptr))
+            neighbours = fixed[chunk.indices]
+
+            def apply(x):
+                # A·x = x·G + Σ (c−1)(yᵢ·x) yᵢ, yalnızca puanlanan hücreler üzerinden
+                dots = chunk.data * np.einsum('ij,ij->i', neighbours, x[rows])
+                return x @ gram + csr_matrix((dots, chunk.indices, chunk.indptr),
+                                             shape=chunk.shape) @ fixed
+
+            target = csr_matrix((chunk.data + 1.0, chunk.indices, chunk.indptr),
+                                shape=chunk.shape) @ fixed
+            # Önceki çözümden başlayan eşlenik gradyan
+            x = current[start:stop].copy()
+            residual = target - apply(x)
+            direction = residual.copy()
+            residual_norm = np.einsum('ij,ij->i', residual, residual)
+            for _ in range(self.cg_steps):
+                product = apply(direction)
+                curvature = np.einsum('ij,ij->i', direction, product)
+                step = np.divide(residual_norm, curvature, out=np.zeros_like(curvature),
+                                 where=curvature > 0)
+                x += step[:, None] * direction
+                residual -= step[:, None] * product
+                new_norm = np.einsum('ij,ij->i', residual, residual)
+                beta = np.divide(new_norm, residual_norm, out=np.zeros_like(new_norm),
+                                 where=residual_norm > 0)
+                direction = residual + beta[:, None] * direction
+                residual_norm = new_norm
+            return x
+
+        return np.vstack(list(pool.map(solve_chunk, range(0, weights.shape[0], self.chunk_size))))
+
+    def fold_in(self, quiz_factors, indices, values):
+        # Yeni kullanıcı için tek bir ALS kullanıcı adımı (doğrudan çözüm)
+        neighbours = quiz_factors[indices]
+        confidence = self.alpha * np.asarray(values, dtype=np.float64)
+        system = (quiz_factors.T @ quiz_factors
+                  + (neighbours * confidence[:, None]).T @ neighbours
+                  + self.regularization * np.eye(quiz_factors.shape[1]))
+        return np.linalg.solve(system, ((confidence + 1.0)[:, None] * neighbours).sum(axis=0))
+
+
+TRAINERS = {trainer.name: trainer for trainer in (RandomizedSVDTrainer, ImplicitALSTrainer)}
+
+
+def get_trainer(name='svd', **params):
+    trainer = TRAINERS.get(name)
+    if trainer is None:
+        raise ValueError(f"Unknown trainer '{name}', expected one of: {', '.join(TRAINERS)}")
+    return trainer(**params)